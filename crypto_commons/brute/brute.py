@@ -13,3 +13,78 @@ def brute(worker, data_list, processes=8):
     result = pool.map(worker, data_list)
     pool.close()
     return result
+
+
+def brute_threads(worker, data_list, threads=8):
+    """
+    Run thread workers, useful for I/O bound tasks like querying remote oracles.
+    Worker doesn't need to be picklable.
+    :param worker: worker function
+    :param data_list: data to distribute between workers, one entry per worker
+    :param threads: number of parallel threads
+    :return: list of worker return values
+    """
+    from concurrent.futures import ThreadPoolExecutor
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        return list(executor.map(worker, data_list))
+
+
+def brute_async(worker, data_list, concurrency=8):
+    """
+    Run asyncio coroutine workers, with limited number of coroutines running at the same time.
+    :param worker: coroutine function
+    :param data_list: data to distribute between workers, one entry per worker
+    :param concurrency: number of coroutines in-flight
+    :return: list of worker return values
+    """
+    import asyncio
+
+    async def run_all():
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def limited(data):
+            async with semaphore:
+                return await worker(data)
+
+        return await asyncio.gather(*[limited(data) for data in data_list])
+
+    return asyncio.run(run_all())
+
+
+def brute_concurrent(worker, data_list, concurrency=8):
+    """
+    Run I/O bound workers concurrently, using asyncio for coroutine functions and threads otherwise.
+    :param worker: worker function or coroutine function
+    :param data_list: data to distribute between workers, one entry per worker
+    :param concurrency: number of parallel workers
+    :return: list of worker return values
+    """
+    import asyncio
+    if asyncio.iscoroutinefunction(worker):
+        return brute_async(worker, data_list, concurrency)
+    return brute_threads(worker, data_list, concurrency)
+
+
+def brute_first(worker, data_list, processes=8):
+    """
+    Run multiprocess workers until one of them returns a result.
+    All other workers are terminated once the first result is found.
+    :param worker: worker function returning None if nothing was found
+    :param data_list: data to distribute between workers, one entry per worker, can be a lazy generator
+    :param processes: number of parallel processes
+    :return: first not-None worker return value, or None
+    """
+    if processes == 1:
+        for data in data_list:
+            result = worker(data)
+            if result is not None:
+                return result
+        return None
+    pool = multiprocessing.Pool(processes=processes)
+    try:
+        for result in pool.imap_unordered(worker, data_list):
+            if result is not None:
+                return result
+        return None
+    finally:
+        pool.terminate()
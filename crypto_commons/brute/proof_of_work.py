@@ -0,0 +1,207 @@
+"""
+Solver for hash proof of work challenges, eg. sha256(XXXX + "Fb9sVw7C") == "5f2d0b...", md5(X)[:6] == "abc123"
+or sha1("a1b2c3" + X) has 24 leading zero bits.
+Known data before the unknown part is hashed once and every candidate starts from a copy of this hash state.
+Candidates are enumerated lazily: every task is a single head (first characters) of the unknown part,
+and the worker checks all tails for it, so the whole candidate list is never materialized.
+"""
+
+import hashlib
+import itertools
+import re
+import string
+import time
+
+DEFAULT_ALPHABET = string.ascii_letters + string.digits
+UNKNOWN_NAMES = {"str", "s", "x", "input", "answer", "nonce", "your_input"}
+TASK_SIZE = 1 << 16
+
+
+class ProofOfWork(object):
+    def __init__(self, algorithm, prefix=b"", suffix=b"", mask=0, value=0, length=None, alphabet=DEFAULT_ALPHABET):
+        """
+        Challenge to find X such that hash(prefix + X + suffix) has bits selected by mask equal to value
+        :param algorithm: hashlib algorithm name
+        :param prefix: known bytes hashed before X
+        :param suffix: known bytes hashed after X
+        :param mask: integer mask of digest bits to check, digest is a big-endian integer
+        :param value: expected value of masked digest bits
+        :param length: length of X, None if any length is accepted
+        :param alphabet: characters allowed in X
+        """
+        self.algorithm = algorithm
+        self.prefix = prefix
+        self.suffix = suffix
+        self.mask = mask
+        self.value = value
+        self.length = length
+        self.alphabet = alphabet
+        self.digest_bits = 8 * hashlib.new(algorithm).digest_size
+
+    def check(self, candidate):
+        """
+        :param candidate: X bytes
+        :return: True if candidate solves the challenge
+        """
+        digest = hashlib.new(self.algorithm, self.prefix + candidate + self.suffix).digest()
+        return int.from_bytes(digest, 'big') & self.mask == self.value
+
+    def hex_prefix(self, target):
+        bits = 4 * len(target)
+        self.mask = ((1 << bits) - 1) << (self.digest_bits - bits)
+        self.value = int(target, 16) << (self.digest_bits - bits)
+        return self
+
+    def hex_suffix(self, target):
+        self.mask = (1 << (4 * len(target))) - 1
+        self.value = int(target, 16)
+        return self
+
+    def leading_zero_bits(self, bits):
+        self.mask = ((1 << bits) - 1) << (self.digest_bits - bits)
+        self.value = 0
+        return self
+
+    def trailing_zero_bits(self, bits):
+        self.mask = (1 << bits) - 1
+        self.value = 0
+        return self
+
+    def __repr__(self):
+        return "ProofOfWork(%s, prefix=%r, suffix=%r, mask=%x, value=%x, length=%s)" % (
+            self.algorithm, self.prefix, self.suffix, self.mask, self.value, self.length)
+
+
+def parse_challenge(text, alphabet=DEFAULT_ALPHABET):
+    """
+    Parse common proof of work challenge formats, eg.
+    sha256(XXXX+Fb9sVw7CZq2c3Ynf) == 5f2d0b..., md5(X)[:6] == 'abc123', sha256(X).hexdigest()[-5:] == "00000",
+    sha1("a1b2c3" + str) starts with 00000, sha256('prefix' + ?) has 20 leading zero bits
+    :param text: challenge text sent by the service
+    :param alphabet: characters allowed in X
+    :return: ProofOfWork
+    """
+    call = re.search(r"\b(sha3_(?:224|256|384|512)|sha-?(?:1|224|256|384|512)|md5|blake2[bs])\s*\(([^)]*)\)",
+                     text, re.IGNORECASE)
+    if call is None:
+        raise ValueError("Unknown proof of work format: %s" % text)
+    algorithm = call.group(1).lower().replace("-", "")
+    known = [b"", b""]
+    length = None
+    unknown_found = False
+    for part in re.split(r"\s*\+\s*", call.group(2).strip()):
+        quoted = re.match(r"^(?:b?'(.*)'|b?\"(.*)\")$", part)
+        if quoted is None and (part.lower() in UNKNOWN_NAMES or re.match(r"^(?:[Xx?*]+|\.\.\.)$", part)):
+            if unknown_found:
+                raise ValueError("More than one unknown part in: %s" % call.group(2))
+            unknown_found = True
+            if len(part) > 1 and len(set(part)) == 1 and part[0] in "Xx?*":
+                length = len(part)
+        else:
+            literal = part if quoted is None else quoted.group(1) if quoted.group(1) is not None else quoted.group(2)
+            known[unknown_found] += literal.encode("utf-8")
+    if not unknown_found:
+        raise ValueError("No unknown part in: %s" % call.group(2))
+    challenge = ProofOfWork(algorithm, known[0], known[1], length=length, alphabet=alphabet)
+    condition = text[call.end():]
+    bits = re.search(r"(\d+)\s+(leading\s+|trailing\s+)?zero\s+bits", condition, re.IGNORECASE)
+    if bits is not None:
+        if (bits.group(2) or "").strip().lower() == "trailing" or re.search(r"ends?\s+with\s+" + bits.group(1),
+                                                                          condition, re.IGNORECASE):
+            return challenge.trailing_zero_bits(int(bits.group(1)))
+        return challenge.leading_zero_bits(int(bits.group(1)))
+    target = r"\s*['\"]?([0-9a-fA-F]+)"
+    suffix = re.search(r"\[\s*-\s*\d+\s*:\s*\]\s*==?" + target + r"|ends?\s+with" + target, condition, re.IGNORECASE)
+    if suffix is not None:
+        return challenge.hex_suffix((suffix.group(1) or suffix.group(2)).lower())
+    prefix = re.search(r"(?:==?|starts?\s+with|begins?\s+with)" + target, condition, re.IGNORECASE)
+    if prefix is not None:
+        return challenge.hex_prefix(prefix.group(1).lower())
+    raise ValueError("Unknown proof of work condition: %s" % condition)
+
+
+def proof_of_work_worker(data):
+    """
+    Check all candidates starting with given head
+    :param data: tuple (challenge, head, tail_length)
+    :return: candidate bytes or None
+    """
+    challenge, head, tail_length = data
+    alphabet = [c.encode("utf-8") for c in challenge.alphabet]
+    last = [c + challenge.suffix for c in alphabet]
+    mask = challenge.mask
+    value = challenge.value
+    state = hashlib.new(challenge.algorithm, challenge.prefix + head)
+    for middle in itertools.product(alphabet, repeat=tail_length - 1):
+        middle = b"".join(middle)
+        middle_state = state.copy()
+        middle_state.update(middle)
+        for c in last:
+            h = middle_state.copy()
+            h.update(c)
+            if int.from_bytes(h.digest(), 'big') & mask == value:
+                return head + middle + c[:len(c) - len(challenge.suffix)]
+    return None
+
+
+def proof_of_work_tasks(challenge, max_length=8):
+    """
+    :return: generator of worker tasks, for every candidate length heads are enumerated lazily
+    """
+    alphabet = [c.encode("utf-8") for c in challenge.alphabet]
+    lengths = [challenge.length] if challenge.length is not None else range(1, max_length + 1)
+    tail_length = 1
+    while len(alphabet) ** tail_length < TASK_SIZE:
+        tail_length += 1
+    for length in lengths:
+        tail = min(length, tail_length)
+        for head in itertools.product(alphabet, repeat=length - tail):
+            yield challenge, b"".join(head), tail
+
+
+def solve_proof_of_work(challenge, processes=8, max_length=8, stats=None):
+    """
+    Find solution of proof of work challenge, using all processes until one of them finds it
+    :param challenge: ProofOfWork or challenge text to parse
+    :param processes: number of parallel processes
+    :param max_length: maximum length of X, if challenge doesn't specify it
+    :param stats: dict to fill with number of hashes, time in seconds and hashes per second.
+    If there is a solution, number of hashes is a lower-bound estimate: position of the solution in the order
+    of candidates, other processes could have checked more. Otherwise it's the number of all candidates.
+    :return: X bytes, or None if there is no solution up to max_length
+    """
+    from crypto_commons.brute.brute import brute_first
+    if not isinstance(challenge, ProofOfWork):
+        challenge = parse_challenge(challenge)
+    start = time.time()
+    result = brute_first(proof_of_work_worker, proof_of_work_tasks(challenge, max_length), processes)
+    if stats is not None:
+        seconds = time.time() - start
+        if result is not None:
+            hashes = candidate_index(challenge, result) + 1
+        else:
+            hashes = candidate_count(challenge, max_length)
+        stats.update(hashes=hashes, seconds=seconds, hashes_per_second=hashes / seconds if seconds else 0.0)
+    return result
+
+
+def candidate_count(challenge, max_length=8):
+    """
+    :return: number of all candidates enumerated for the challenge
+    """
+    lengths = [challenge.length] if challenge.length is not None else range(1, max_length + 1)
+    return sum(len(challenge.alphabet) ** length for length in lengths)
+
+
+def candidate_index(challenge, candidate):
+    """
+    :return: number of candidates enumerated before the given one
+    """
+    alphabet = challenge.alphabet.encode("utf-8")
+    index = 0
+    if challenge.length is None:
+        index = sum(len(alphabet) ** length for length in range(1, len(candidate)))
+    position = 0
+    for c in bytearray(candidate):
+        position = position * len(alphabet) + alphabet.index(c)
+    return index + position
@@ -0,0 +1,152 @@
+"""
+Local, offline factordb-like store of factorizations.
+It's disabled by default, enable it with enable_factor_cache(path) or by setting CRYPTO_COMMONS_FACTOR_CACHE env variable.
+Storage is a SQLite database, so it can be shared between many processes running at the same time.
+Factorizations found by methods splitting n only once (eg. gcd of moduli) can contain composite factors,
+so every entry records if all of its factors are prime.
+"""
+
+import os
+import sqlite3
+import threading
+import time
+
+from crypto_commons.generic import multiply, is_probable_prime
+
+FACTOR_CACHE_ENV = "CRYPTO_COMMONS_FACTOR_CACHE"
+DEFAULT_FACTOR_CACHE_PATH = os.path.join(os.path.expanduser("~"), ".crypto_commons", "factors.sqlite")
+
+
+class FactorCache(object):
+    def __init__(self, path=DEFAULT_FACTOR_CACHE_PATH, timeout=60):
+        """
+        :param path: path to SQLite database file, created if missing
+        :param timeout: how long to wait for lock held by another process, in seconds
+        """
+        self.path = path
+        self.timeout = timeout
+        self.local = threading.local()
+        directory = os.path.dirname(os.path.abspath(path))
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        with self.connection() as connection:
+            connection.execute("CREATE TABLE IF NOT EXISTS factors ("
+                               "n TEXT NOT NULL, "
+                               "factors TEXT NOT NULL, "
+                               "method TEXT NOT NULL, "
+                               "seconds REAL NOT NULL, "
+                               "created REAL NOT NULL, "
+                               "complete INTEGER NOT NULL DEFAULT 0, "
+                               "UNIQUE (n, factors, method))")
+            columns = [row[1] for row in connection.execute("PRAGMA table_info(factors)")]
+            if "complete" not in columns:
+                connection.execute("ALTER TABLE factors ADD COLUMN complete INTEGER NOT NULL DEFAULT 0")
+
+    def connection(self):
+        connection = getattr(self.local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=self.timeout)
+            connection.execute("PRAGMA journal_mode=WAL")
+            self.local.connection = connection
+        return connection
+
+    def store(self, n, factors, method, seconds):
+        """
+        Save factorization of n
+        :param n: factored number
+        :param factors: list of non-trivial factors, their product has to be equal to n, otherwise they are ignored
+        :param method: name of the method which found the factors
+        :param seconds: how long it took to find them
+        """
+        factors = sorted(int(f) for f in factors)
+        if len(factors) < 2 or any(f <= 1 or f == n for f in factors) or multiply(factors) != n:
+            return
+        complete = all(is_probable_prime(f) for f in factors)
+        with self.connection() as connection:
+            connection.execute("INSERT OR IGNORE INTO factors VALUES (?, ?, ?, ?, ?, ?)",
+                               (str(n), encode_factors(factors), method, seconds, time.time(), int(complete)))
+
+    def entries(self, n):
+        """
+        Get all stored factorizations of n
+        :param n: number
+        :return: list of tuples (factors, method, seconds, created, complete)
+        """
+        rows = self.connection().execute("SELECT factors, method, seconds, created, complete FROM factors "
+                                         "WHERE n = ?", (str(n),)).fetchall()
+        return [(decode_factors(factors), method, seconds, created, bool(complete))
+                for factors, method, seconds, created, complete in rows]
+
+    def lookup(self, n, complete=False):
+        """
+        Get the most detailed stored factorization of n
+        :param n: number
+        :param complete: return only factorization into primes
+        :return: sorted list of factors or None if n was never factored
+        """
+        factorizations = [factors for factors, _, _, _, is_complete in self.entries(n) if is_complete or not complete]
+        if not factorizations:
+            return None
+        return max(factorizations, key=len)
+
+
+def encode_factors(factors):
+    return ",".join(str(f) for f in factors)
+
+
+def decode_factors(data):
+    return [int(f) for f in data.split(",")]
+
+
+_factor_cache = None
+
+
+def enable_factor_cache(path=DEFAULT_FACTOR_CACHE_PATH):
+    """
+    Make all factoring functions consult and update on-disk cache
+    :param path: path to SQLite database file
+    :return: cache object
+    """
+    global _factor_cache
+    _factor_cache = FactorCache(path)
+    return _factor_cache
+
+
+def disable_factor_cache():
+    global _factor_cache
+    _factor_cache = None
+
+
+def get_factor_cache():
+    """
+    :return: currently enabled cache object, or None if cache is disabled
+    """
+    if _factor_cache is None and os.environ.get(FACTOR_CACHE_ENV):
+        enable_factor_cache(os.environ[FACTOR_CACHE_ENV])
+    return _factor_cache
+
+
+def cached_factors(n, complete=False):
+    """
+    Get factors of n from the cache, if it's enabled
+    :param n: number
+    :param complete: return only factorization into primes
+    :return: sorted list of factors or None
+    """
+    cache = get_factor_cache()
+    if cache is None:
+        return None
+    return cache.lookup(n, complete)
+
+
+def record_factors(n, factors, method, start_time):
+    """
+    Save factors of n in the cache, if it's enabled
+    :param n: number
+    :param factors: list of factors
+    :param method: name of the method which found the factors
+    :param start_time: time.time() from the moment factoring started
+    """
+    cache = get_factor_cache()
+    if cache is not None:
+        cache.store(n, factors, method, time.time() - start_time)
@@ -0,0 +1,173 @@
+"""
+Memoization of oracle queries, so that re-running a partially finished attack doesn't query the remote service again.
+Results are kept in memory (LRU) and optionally in a SQLite database, which survives restarts of the script.
+Identical queries sent at the same time from many threads are sent to the oracle only once.
+"""
+
+import collections
+import concurrent.futures
+import os
+import pickle
+import sqlite3
+import threading
+import time
+
+
+class OracleStore(object):
+    def __init__(self, path, namespace="oracle", timeout=60):
+        """
+        On-disk store of oracle results.
+        Results are pickled, and loading them can run arbitrary code, so only open database files you created.
+        :param path: path to SQLite database file, created if missing
+        :param namespace: name separating results of different oracles kept in the same file
+        :param timeout: how long to wait for lock held by another process, in seconds
+        """
+        self.path = path
+        self.namespace = namespace
+        self.timeout = timeout
+        self.local = threading.local()
+        directory = os.path.dirname(os.path.abspath(path))
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        with self.connection() as connection:
+            connection.execute("CREATE TABLE IF NOT EXISTS oracle_results ("
+                               "namespace TEXT NOT NULL, "
+                               "query BLOB NOT NULL, "
+                               "result BLOB NOT NULL, "
+                               "seconds REAL NOT NULL, "
+                               "created REAL NOT NULL, "
+                               "PRIMARY KEY (namespace, query))")
+
+    def connection(self):
+        connection = getattr(self.local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=self.timeout)
+            connection.execute("PRAGMA journal_mode=WAL")
+            self.local.connection = connection
+        return connection
+
+    def load(self, key):
+        """
+        :param key: serialized query
+        :return: tuple (found, result)
+        """
+        row = self.connection().execute("SELECT result FROM oracle_results WHERE namespace = ? AND query = ?",
+                                        (self.namespace, key)).fetchone()
+        if row is None:
+            return False, None
+        return True, pickle.loads(row[0])
+
+    def save(self, key, result, seconds):
+        with self.connection() as connection:
+            connection.execute("INSERT OR REPLACE INTO oracle_results VALUES (?, ?, ?, ?, ?)",
+                               (self.namespace, key, pickle.dumps(result), seconds, time.time()))
+
+    def __len__(self):
+        return self.connection().execute("SELECT COUNT(*) FROM oracle_results WHERE namespace = ?",
+                                         (self.namespace,)).fetchone()[0]
+
+
+class MemoizedOracle(object):
+    def __init__(self, oracle, path=None, namespace="oracle", max_size=1 << 20):
+        """
+        Thread-safe memoizing wrapper for oracle function
+        :param oracle: oracle function, queries have to be picklable, eg. bytes, str, int or tuples of them
+        :param path: optional path to SQLite database file keeping results between runs, results are unpickled
+        from it, so it has to be a trusted file
+        :param namespace: name separating results of different oracles kept in the same file
+        :param max_size: maximum number of results kept in memory
+        """
+        self.oracle = oracle
+        self.store = OracleStore(path, namespace) if path is not None else None
+        self.max_size = max_size
+        self.memory = collections.OrderedDict()
+        self.in_flight = {}
+        self.lock = threading.Lock()
+        self.queries = 0
+        self.memory_hits = 0
+        self.store_hits = 0
+        self.deduplicated = 0
+        self.oracle_calls = 0
+        self.oracle_seconds = 0.0
+
+    def __call__(self, query):
+        key = pickle.dumps(query, protocol=2)
+        with self.lock:
+            self.queries += 1
+            if key in self.memory:
+                self.memory.move_to_end(key)
+                self.memory_hits += 1
+                return self.memory[key]
+            pending = self.in_flight.get(key)
+            if pending is None:
+                pending = self.in_flight[key] = concurrent.futures.Future()
+                owner = True
+            else:
+                self.deduplicated += 1
+                owner = False
+        if not owner:
+            return pending.result()
+        try:
+            result = self.resolve(key, query)
+        except BaseException as e:
+            with self.lock:
+                del self.in_flight[key]
+            pending.set_exception(e)
+            raise
+        with self.lock:
+            self.remember(key, result)
+            del self.in_flight[key]
+        pending.set_result(result)
+        return result
+
+    def resolve(self, key, query):
+        if self.store is not None:
+            found, result = self.store.load(key)
+            if found:
+                with self.lock:
+                    self.store_hits += 1
+                return result
+        start = time.time()
+        result = self.oracle(query)
+        seconds = time.time() - start
+        with self.lock:
+            self.oracle_calls += 1
+            self.oracle_seconds += seconds
+        if self.store is not None:
+            self.store.save(key, result, seconds)
+        return result
+
+    def remember(self, key, result):
+        self.memory[key] = result
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.max_size:
+            self.memory.popitem(last=False)
+
+    def stats(self):
+        """
+        :return: dict with number of queries, cache hits, deduplicated queries, real oracle calls and their latency
+        """
+        with self.lock:
+            return {
+                "queries": self.queries,
+                "memory_hits": self.memory_hits,
+                "store_hits": self.store_hits,
+                "deduplicated": self.deduplicated,
+                "oracle_calls": self.oracle_calls,
+                "oracle_seconds": self.oracle_seconds,
+                "average_latency": self.oracle_seconds / self.oracle_calls if self.oracle_calls else 0.0,
+            }
+
+
+def memoize_oracle(oracle, path=None, namespace="oracle", max_size=1 << 20):
+    """
+    Wrap oracle function so that every distinct query is sent only once, also across runs if path is given.
+    The wrapper can be passed to any attack instead of the original oracle, eg. padding_oracle_decrypt.
+    :param oracle: oracle function, queries have to be picklable
+    :param path: optional path to SQLite database file keeping results between runs, results are unpickled
+    from it, so it has to be a trusted file
+    :param namespace: name separating results of different oracles kept in the same file
+    :param max_size: maximum number of results kept in memory
+    :return: MemoizedOracle
+    """
+    return MemoizedOracle(oracle, path, namespace, max_size)
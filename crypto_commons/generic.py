@@ -74,6 +74,23 @@ def chunk_with_remainder(input_data, size):
         return chunk(core, size) + [remainder]
 
 
+def iter_chunks(input_data, size):
+    """
+    Lazily split data into parts, last chunk can be not full.
+    Bytes-like objects are split into memoryview slices, so nothing is copied.
+    :param input_data: bytes-like object or string to split
+    :param size: size of a single chunk
+    :return: generator of chunks
+    """
+    if not isinstance(input_data, str):
+        try:
+            input_data = memoryview(input_data)
+        except TypeError:
+            pass
+    for i in range(0, len(input_data), size):
+        yield input_data[i:i + size]
+
+
 def multiply(values):
     """
     Multiply values on the list
@@ -132,6 +149,37 @@ def factor_p(n, primes, limit=1000000):
     return factors, n
 
 
+def is_probable_prime(n, rounds=32):
+    """
+    Miller-Rabin primality test
+    :param n: number to test
+    :param rounds: number of random bases to check
+    :return: True if n is prime with overwhelming probability
+    """
+    import random
+    if n < 2:
+        return False
+    for p in (2, 3, 5, 7, 11, 13, 17, 19, 23, 29, 31, 37):
+        if n % p == 0:
+            return n == p
+    d = n - 1
+    s = 0
+    while d % 2 == 0:
+        d //= 2
+        s += 1
+    for _ in range(rounds):
+        x = pow(random.randrange(2, n - 1), d, n)
+        if x == 1 or x == n - 1:
+            continue
+        for _ in range(s - 1):
+            x = x * x % n
+            if x == n - 1:
+                break
+        else:
+            return False
+    return True
+
+
 def factor(n, limit=1000000):
     """
     Factor given value using sieve up to a certain limit
@@ -139,18 +187,34 @@ def factor(n, limit=1000000):
     :param limit: sieve limit
     :return: list of factors and residue
     """
+    import time
+    from crypto_commons.cache.factor_cache import cached_factors, record_factors
+    cached = cached_factors(n, complete=True)
+    if cached is not None:
+        return cached, 1
+    start_time = time.time()
     limit = min(n, limit) # No point in checking factors larger than n
-    return factor_p(n, get_primes(limit), limit)
+    factors, residue = factor_p(n, get_primes(limit), limit)
+    if residue == 1:
+        record_factors(n, factors, "factor", start_time)
+    return factors, residue
 
 
-def fermat_factors(n):
+def fermat_factors(n, verbose=False):
     """
     Factor given number using Fermat approach, starting from sqrt(n)
     :param n: modulus to factor
+    :param verbose: print the result
     :return: p, q
     """
     assert n % 2 != 0
+    import time
+    from crypto_commons.cache.factor_cache import cached_factors, record_factors
+    cached = cached_factors(n)
+    if cached is not None and len(cached) == 2:
+        return cached[1], cached[0]
     import gmpy2
+    start_time = time.time()
     a = gmpy2.isqrt(n)
     b2 = gmpy2.square(a) - n
     while not gmpy2.is_square(b2):
@@ -158,10 +222,131 @@ def fermat_factors(n):
         b2 = gmpy2.square(a) - n
     factor1 = a + gmpy2.isqrt(b2)
     factor2 = a - gmpy2.isqrt(b2)
-    print(n, factor1, factor2)
+    if verbose:
+        print(n, factor1, factor2)
+    record_factors(n, [factor1, factor2], "fermat", start_time)
     return int(factor1), int(factor2)
 
 
+FERMAT_WHEEL_MODULI = (16, 9, 5, 7, 11)
+FERMAT_FILTER_MODULI = (13, 17, 19, 23, 29, 31, 37, 41, 43, 47, 53, 59, 61)
+
+
+def fermat_residue_table(n, m):
+    """
+    Find which values of a mod m can give a^2 - n which is a square mod m
+    :param n: modulus to factor
+    :param m: small modulus
+    :return: list of booleans indexed by a mod m
+    """
+    squares = set(x * x % m for x in range(m))
+    return [(a * a - n) % m in squares for a in range(m)]
+
+
+def fermat_wheel(n, moduli=FERMAT_WHEEL_MODULI):
+    """
+    Combine quadratic residue tables for small moduli into a single wheel.
+    :param n: modulus to factor
+    :param moduli: pairwise co-prime small moduli
+    :return: wheel size and sorted list of offsets a mod wheel size, for which a^2 - n can be a square
+    """
+    tables = [(m, fermat_residue_table(n, m)) for m in moduli]
+    wheel_size = multiply(moduli)
+    offsets = [a for a in range(wheel_size) if all(table[a % m] for m, table in tables)]
+    return wheel_size, offsets
+
+
+def fermat_sieve_worker(data):
+    """
+    Check range of a values for a^2 - n being a square, skipping values rejected by the residue tables
+    :param data: tuple (n, a_start, a_stop, wheel_size, wheel_offsets, filters)
+    :return: pair of factors or None
+    """
+    n, a_start, a_stop, wheel_size, wheel_offsets, filters = data
+    block_start = a_start - a_start % wheel_size
+    while block_start < a_stop:
+        block_residues = [(block_start % m, m, table) for m, table in filters]
+        for offset in wheel_offsets:
+            a = block_start + offset
+            if a < a_start:
+                continue
+            if a >= a_stop:
+                break
+            for residue, m, table in block_residues:
+                if not table[(residue + offset) % m]:
+                    break
+            else:
+                b, exact = integer_root(a * a - n, 2)
+                if exact:
+                    return a + b, a - b
+        block_start += wheel_size
+    return None
+
+
+def fermat_factors_sieved(n, iterations=None, processes=1, chunk_size=10000000):
+    """
+    Factor given number using Fermat approach, starting from sqrt(n).
+    Values of a for which a^2 - n can't be a square modulo some small moduli are skipped without any big number operations.
+    Search range can be split between many processes.
+    :param n: modulus to factor
+    :param iterations: how many values of a to check, None for no limit
+    :param processes: number of parallel processes
+    :param chunk_size: how many values of a single worker checks at once
+    :return: p, q or None if not found in given number of iterations
+    """
+    assert n % 2 != 0
+    import time
+    from crypto_commons.brute.brute import brute_first
+    from crypto_commons.cache.factor_cache import cached_factors, record_factors
+    cached = cached_factors(n)
+    if cached is not None and len(cached) == 2:
+        return cached[1], cached[0]
+    start_time = time.time()
+    a_start, exact = integer_root(n, 2)
+    if exact:
+        return a_start, a_start
+    a_start += 1
+    a_stop = (n + 1) // 2 + 1 if iterations is None else a_start + iterations
+    wheel_size, wheel_offsets = fermat_wheel(n)
+    filters = [(m, fermat_residue_table(n, m)) for m in FERMAT_FILTER_MODULI]
+    chunk_size = max(wheel_size, chunk_size - chunk_size % wheel_size)
+    chunks = ((n, start, min(start + chunk_size, a_stop), wheel_size, wheel_offsets, filters)
+              for start in long_range(a_start, a_stop, chunk_size))
+    result = brute_first(fermat_sieve_worker, chunks, processes)
+    if result is not None:
+        record_factors(n, result, "fermat_sieve", start_time)
+    return result
+
+
+def hart_factors(n, iterations=1000000):
+    """
+    Factor given number using Hart's one line factoring, a variant of Lehman method.
+    Works well also for unbalanced factors, if ratio of factors is close to a ratio of small integers.
+    :param n: modulus to factor
+    :param iterations: how many multipliers to check
+    :return: p, q or None if not found in given number of iterations
+    """
+    import time
+    from crypto_commons.cache.factor_cache import cached_factors, record_factors
+    from crypto_commons.rsa.rsa_commons import gcd
+    cached = cached_factors(n)
+    if cached is not None and len(cached) == 2:
+        return cached[1], cached[0]
+    start_time = time.time()
+    for i in range(1, iterations + 1):
+        s, exact = integer_root(n * i, 2)
+        if not exact:
+            s += 1
+        t, exact = integer_root(s * s % n, 2)
+        if exact:
+            p = gcd(s - t, n)
+            if 1 < p < n:
+                p, q = max(p, n // p), min(p, n // p)
+                record_factors(n, [p, q], "hart", start_time)
+                return p, q
+    return None
+
+
 def find_divisor(n, limit=1000000):
     """
     Use sieve to find first prime divisor of given number
@@ -195,6 +380,30 @@ def integer_log(x, xi, limit=1000):
             return
 
 
+def integer_root(x, k):
+    """
+    Computation of integer k-th root with Newton method, without gmpy2.
+    Initial estimate is taken from bit length of x, so it's always above the real root and iteration goes down.
+    :param x: non-negative integer
+    :param k: root degree
+    :return: pair (floor of k-th root of x, True if root is exact)
+    """
+    if x < 0:
+        raise ValueError("Can't calculate integer root of negative number")
+    if x < 2 or k == 1:
+        return x, True
+    if k == 2 and hasattr(math, "isqrt"):
+        root = math.isqrt(x)
+        return root, root * root == x
+    root = 1 << ((x.bit_length() + k - 1) // k)
+    while True:
+        next_root = ((k - 1) * root + x // pow(root, k - 1)) // k
+        if next_root >= root:
+            break
+        root = next_root
+    return root, pow(root, k) == x
+
+
 def discrete_log(x, xi, limit=1000):
     """
     Alias for integer_log added for backwards compability.
@@ -214,19 +423,86 @@ def xor(*t):
     :param *t: arrays 
     :return: list with xored values
     """
+    if t and all(isinstance(x, (bytes, bytearray, memoryview)) for x in t):
+        from functools import reduce
+        return list(reduce(xor_bytes, t))
     from functools import reduce
     from operator import xor
     return [reduce(xor, x, 0) for x in zip(*t)]
 
 
+XOR_NUMPY_THRESHOLD = 1 << 16
+XOR_CHUNK_SIZE = 1 << 20
+
+
+def xor_bytes(t1, t2, out=None):
+    """
+    XOR two byte buffers, result is as long as the shorter one.
+    Whole buffers are XORed at once as big integers, or using numpy for large buffers if it's available.
+    :param t1: bytes-like object 1
+    :param t2: bytes-like object 2
+    :param out: optional writable buffer (eg. bytearray) to store the result in
+    :return: xored bytes, or out if it was given
+    """
+    length = min(len(t1), len(t2))
+    t1 = memoryview(t1)[:length]
+    t2 = memoryview(t2)[:length]
+    if length >= XOR_NUMPY_THRESHOLD:
+        try:
+            import numpy
+        except ImportError:
+            numpy = None
+        if numpy is not None:
+            a = numpy.frombuffer(t1, dtype=numpy.uint8)
+            b = numpy.frombuffer(t2, dtype=numpy.uint8)
+            if out is None:
+                return numpy.bitwise_xor(a, b).tobytes()
+            numpy.bitwise_xor(a, b, out=numpy.frombuffer(out, dtype=numpy.uint8, count=length))
+            return out
+    result = (int.from_bytes(t1, 'big') ^ int.from_bytes(t2, 'big')).to_bytes(length, 'big')
+    if out is None:
+        return result
+    out[:length] = result
+    return out
+
+
+def xor_repeating(data, key, out=None, key_offset=0):
+    """
+    XOR data with repeating key, without expanding the key to the data length.
+    Data is processed in chunks of about XOR_CHUNK_SIZE bytes.
+    :param data: bytes-like object
+    :param key: bytes key
+    :param out: optional writable buffer (eg. bytearray) to store the result in
+    :param key_offset: index of key byte to use for the first byte of data
+    :return: xored bytes, or out if it was given
+    """
+    key = bytes(key)
+    key_offset %= len(key)
+    key = key[key_offset:] + key[:key_offset]
+    block_key = key * max(1, XOR_CHUNK_SIZE // len(key))
+    data = memoryview(data)
+    result = bytearray(len(data)) if out is None else out
+    result_view = memoryview(result)
+    for start in range(0, len(data), len(block_key)):
+        stop = min(start + len(block_key), len(data))
+        xor_bytes(data[start:stop], block_key, result_view[start:stop])
+    if out is None:
+        return bytes(result)
+    return out
+
+
 def xor_string(t1, t2):
     """
     XOR two strings
-    If both are Python3 bytes objects, use xor(t1, t2) instead.
+    If both are Python3 bytes objects, use xor_bytes(t1, t2) instead.
     :param t1: string 1
     :param t2: string 2
     :return: string with xored values
     """
+    try:
+        return xor_bytes(t1.encode("latin-1"), t2.encode("latin-1")).decode("latin-1")
+    except (AttributeError, UnicodeError):
+        pass
 
     t1 = map(ord, t1)
     t2 = map(ord, t2)
@@ -244,12 +520,7 @@ def xor_hex(t1, t2):
     import codecs
     t1 = codecs.decode(t1, "hex")
     t2 = codecs.decode(t2, "hex")
-
-    try:
-        xored = xor_string(t1, t2)
-    except TypeError:
-        xored = bytes(xor(t1, t2))
-    return codecs.encode(xored, "hex")
+    return codecs.encode(xor_bytes(t1, t2), "hex")
 
 
 def is_printable(data):
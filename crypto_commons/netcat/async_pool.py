@@ -0,0 +1,249 @@
+"""
+Pool of asyncio connections to a single service, so that many oracle queries are in progress at the same time.
+Every connection can run a handshake first (banner, proof of work, login), and broken connections are replaced.
+Queries are sessions: coroutine functions getting AsyncTube and arguments, eg.
+
+async def lsb(t, ciphertext):
+    await t.sendline(str(ciphertext).encode())
+    return int(await t.recvline(keepends=False)) & 1
+
+SyncConnectionPool runs the pool in a background thread, so it can be used by non-async attacks:
+
+with SyncConnectionPool(host, port, size=16, handshake=login) as pool:
+    plaintext = lsb_oracle_concurrent(ct, multiplicator, n, pool.oracle(lsb), threads=16)
+"""
+
+import asyncio
+import threading
+
+from crypto_commons.netcat.netcat_commons import CHUNK_SIZE, LOOKBEHIND, bytes_pattern, find_delimiters, find_regex
+
+RECONNECT_ERRORS = (OSError, EOFError, asyncio.IncompleteReadError, asyncio.TimeoutError)
+
+
+class AsyncTube(object):
+    def __init__(self, reader, writer, chunk_size=CHUNK_SIZE):
+        """
+        Buffered asyncio connection, with the same reading methods as netcat_commons.Tube
+        :param reader: asyncio.StreamReader
+        :param writer: asyncio.StreamWriter
+        :param chunk_size: maximum number of bytes read at once
+        """
+        self.reader = reader
+        self.writer = writer
+        self.chunk_size = chunk_size
+        self.buffer = bytearray()
+
+    async def fill(self):
+        data = await self.reader.read(self.chunk_size)
+        self.buffer += data
+        return len(data)
+
+    def take(self, size):
+        data = bytes(self.buffer[:size])
+        del self.buffer[:size]
+        return data
+
+    def unrecv(self, data):
+        self.buffer[:0] = data
+
+    async def recv(self, size=CHUNK_SIZE):
+        if not self.buffer:
+            await self.fill()
+        return self.take(size)
+
+    async def recvn(self, size):
+        while len(self.buffer) < size:
+            if not await self.fill():
+                raise EOFError("Connection closed after %d of %d bytes" % (len(self.buffer), size))
+        return self.take(size)
+
+    async def recvuntil(self, delimiters, drop=False):
+        if isinstance(delimiters, (bytes, bytearray)):
+            delimiters = [delimiters]
+        searched = 0
+        while True:
+            found = find_delimiters(self.buffer, delimiters, searched)
+            if found is not None:
+                data = self.take(found[1])
+                return data[:found[0]] if drop else data
+            searched = len(self.buffer)
+            if not await self.fill():
+                raise EOFError("Connection closed before delimiter")
+
+    async def recvline(self, keepends=True):
+        return await self.recvuntil(b"\n", drop=not keepends)
+
+    async def recvregex(self, regex, lookbehind=LOOKBEHIND):
+        pattern = bytes_pattern(regex)
+        searched = 0
+        while True:
+            found = find_regex(self.buffer, pattern, searched, lookbehind)
+            if found is not None:
+                return self.take(found[1])
+            searched = len(self.buffer)
+            if not await self.fill():
+                raise EOFError("Connection closed before match")
+
+    async def send(self, payload):
+        self.writer.write(payload)
+        await self.writer.drain()
+
+    async def sendline(self, payload):
+        await self.send(payload + b"\n")
+
+    def close(self):
+        self.writer.close()
+
+
+class ConnectionPool(object):
+    def __init__(self, host, port, size=16, handshake=None, retries=3, delay=0.5, timeout=None):
+        """
+        Pool of connections, opened when needed and reused by consecutive sessions
+        :param host: service host
+        :param port: service port
+        :param size: maximum number of open connections, and sessions running at the same time
+        :param handshake: coroutine function called with AsyncTube of every new connection
+        :param retries: how many times a session is repeated on a new connection, if the connection broke
+        :param delay: wait before reconnecting, in seconds, doubled after every failure
+        :param timeout: time limit for a single session, in seconds, None for no limit
+        """
+        self.host = host
+        self.port = port
+        self.size = size
+        self.handshake = handshake
+        self.retries = retries
+        self.delay = delay
+        self.timeout = timeout
+        self.idle = None
+        self.open = set()
+        self.closed = False
+        self.connections = 0
+        self.sessions = 0
+        self.reconnects = 0
+
+    def slots(self):
+        if self.idle is None:
+            self.idle = asyncio.Queue()
+            for _ in range(self.size):
+                self.idle.put_nowait(None)
+        return self.idle
+
+    async def connect(self):
+        reader, writer = await asyncio.open_connection(self.host, self.port)
+        t = AsyncTube(reader, writer)
+        self.open.add(t)
+        self.connections += 1
+        if self.handshake is not None:
+            try:
+                await self.handshake(t)
+            except BaseException:
+                self.discard(t)
+                raise
+        return t
+
+    def discard(self, t):
+        self.open.discard(t)
+        t.close()
+
+    async def run(self, session, *args):
+        """
+        Run session on a connection from the pool
+        :param session: coroutine function called with AsyncTube and args
+        :return: result of the session
+        """
+        slots = self.slots()
+        t = await slots.get()
+        try:
+            for attempt in range(self.retries + 1):
+                try:
+                    if t is None:
+                        t = await self.connect()
+                    result = await asyncio.wait_for(session(t, *args), self.timeout)
+                    self.sessions += 1
+                    return result
+                except RECONNECT_ERRORS:
+                    if t is not None:
+                        self.discard(t)
+                        t = None
+                    if attempt == self.retries or self.closed:
+                        raise
+                    self.reconnects += 1
+                    await asyncio.sleep(self.delay * 2 ** attempt)
+        except BaseException:
+            if t is not None:
+                self.discard(t)
+                t = None
+            raise
+        finally:
+            slots.put_nowait(t)
+
+    async def map(self, session, data):
+        """
+        :return: list of session results for every argument in data, in order
+        """
+        return await asyncio.gather(*[self.run(session, item) for item in data])
+
+    async def close(self):
+        """
+        Close all connections, also the ones used by sessions still running, which then fail without reconnecting
+        """
+        self.closed = True
+        while self.open:
+            self.open.pop().close()
+        self.idle = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+
+class SyncConnectionPool(object):
+    def __init__(self, host, port, size=16, handshake=None, retries=3, delay=0.5, timeout=None):
+        """
+        Synchronous facade of ConnectionPool, running its event loop in a background thread.
+        Methods can be called from many threads at once, eg. from oracle functions of concurrent attacks.
+        Parameters as in ConnectionPool.
+        """
+        self.pool = ConnectionPool(host, port, size, handshake, retries, delay, timeout)
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever)
+        self.thread.daemon = True
+        self.thread.start()
+
+    def call(self, coroutine):
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop).result()
+
+    def run(self, session, *args):
+        """
+        Run session on a connection from the pool, blocking until it's finished
+        :param session: coroutine function called with AsyncTube and args
+        :return: result of the session
+        """
+        return self.call(self.pool.run(session, *args))
+
+    def map(self, session, data):
+        return self.call(self.pool.map(session, data))
+
+    def oracle(self, session):
+        """
+        :param session: coroutine function called with AsyncTube and oracle query
+        :return: thread-safe oracle function
+        """
+        return lambda data: self.run(session, data)
+
+    def close(self):
+        if self.loop.is_closed():
+            return
+        self.call(self.pool.close())
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+        self.loop.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
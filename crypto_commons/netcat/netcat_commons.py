@@ -1,49 +1,359 @@
+"""
+Buffered connection for talking with CTF services.
+Data is received in large chunks into a buffer, and everything received after the delimiter (or regex match)
+stays in the buffer for the next read, so there is a single recv call per chunk instead of one per byte.
+Delimiters and regexes are searched only in the newly received data, plus a short lookbehind window.
+Functions below accept either a Tube or a socket. Plain sockets are not over-read: waiting data is peeked
+and only bytes up to the delimiter are consumed, so the socket can still be read directly afterwards.
+Buffering is opt-in, with remote, tube or batch_query, which give the socket a Tube shared by all calls,
+and then the socket should not be read directly anymore.
+"""
+
+import itertools
 import re
 import socket
+import sys
 import telnetlib
+import weakref
+
+CHUNK_SIZE = 4096
+LOOKBEHIND = 4096
+
+
+class Tube(object):
+    def __init__(self, sock, chunk_size=CHUNK_SIZE):
+        """
+        Buffered connection
+        :param sock: connected socket
+        :param chunk_size: maximum number of bytes read by a single recv call
+        """
+        self.sock = sock
+        self.buffer = bytearray()
+        self.chunk = bytearray(chunk_size)
+        self.view = memoryview(self.chunk)
+
+    def __getattr__(self, name):
+        return getattr(self.sock, name)
+
+    def fill(self):
+        """
+        Receive a single chunk of data into the buffer
+        :return: number of received bytes, 0 if connection was closed
+        """
+        received = self.sock.recv_into(self.chunk)
+        self.buffer += self.view[:received]
+        return received
+
+    def take(self, size):
+        data = bytes(self.buffer[:size])
+        del self.buffer[:size]
+        return data
+
+    def unrecv(self, data):
+        """
+        Put data back in front of the buffer, so it's returned by the next read
+        """
+        self.buffer[:0] = data
+
+    def buffered(self):
+        """
+        :return: all data received but not consumed yet, without waiting for more
+        """
+        return self.take(len(self.buffer))
+
+    def recv(self, size=CHUNK_SIZE):
+        """
+        Receive at most size bytes, like socket.recv
+        """
+        if not self.buffer:
+            self.fill()
+        return self.take(size)
+
+    def recvn(self, size):
+        """
+        Receive exactly size bytes
+        :raises EOFError: if connection was closed before, received data stays in the buffer
+        """
+        while len(self.buffer) < size:
+            if not self.fill():
+                raise EOFError("Connection closed after %d of %d bytes" % (len(self.buffer), size))
+        return self.take(size)
+
+    def recvuntil(self, delimiters, drop=False):
+        """
+        Receive data until any of delimiters
+        :param delimiters: delimiter bytes or list of them
+        :param drop: don't include the delimiter in the result
+        :return: received data
+        :raises EOFError: if connection was closed before, received data stays in the buffer
+        """
+        if isinstance(delimiters, (bytes, bytearray)):
+            delimiters = [delimiters]
+        searched = 0
+        while True:
+            found = find_delimiters(self.buffer, delimiters, searched)
+            if found is not None:
+                data = self.take(found[1])
+                return data[:found[0]] if drop else data
+            searched = len(self.buffer)
+            if not self.fill():
+                raise EOFError("Connection closed before delimiter")
+
+    def recvline(self, keepends=True):
+        return self.recvuntil(b"\n", drop=not keepends)
+
+    def recvregex(self, regex, lookbehind=LOOKBEHIND, limit=None):
+        """
+        Receive data until regular expression is matching
+        :param regex: regex to match, str or bytes, can be compiled
+        :param lookbehind: how many already searched bytes are searched again with new data,
+        has to be larger than the longest match
+        :param limit: maximum number of buffered bytes, None for no limit
+        :return: received data, up to the end of the match
+        :raises EOFError: if connection was closed before, received data stays in the buffer
+        :raises ValueError: if limit was reached, received data stays in the buffer
+        """
+        pattern = bytes_pattern(regex)
+        searched = 0
+        while True:
+            found = find_regex(self.buffer, pattern, searched, lookbehind)
+            if found is not None:
+                return self.take(found[1])
+            searched = len(self.buffer)
+            if limit is not None and searched >= limit:
+                raise ValueError("No match in %d bytes" % searched)
+            if not self.fill():
+                raise EOFError("Connection closed before match")
+
+    def sendline(self, payload):
+        self.sock.sendall(payload + b"\n")
+
+    def interactive(self):
+        if self.buffer:
+            sys.stdout.write(self.buffered().decode("utf-8", "replace"))
+            sys.stdout.flush()
+        t = telnetlib.Telnet()
+        t.sock = self.sock
+        t.interact()
 
 
-def nc(host, port):
-    s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-    s.connect((host, port))
-    return s
+def find_delimiters(data, delimiters, searched=0):
+    """
+    Find the delimiter ending first, searching only where a delimiter could end after the already searched part
+    :param data: received data
+    :param delimiters: list of delimiters
+    :param searched: length of data searched before
+    :return: tuple (start, end) of the delimiter, or None
+    """
+    start = max(0, searched - max(len(delimiter) for delimiter in delimiters) + 1)
+    found = None
+    for delimiter in delimiters:
+        index = data.find(delimiter, start)
+        if index != -1 and (found is None or index + len(delimiter) < found[1]):
+            found = index, index + len(delimiter)
+    return found
+
+
+def find_regex(data, pattern, searched=0, lookbehind=LOOKBEHIND):
+    """
+    :param data: received data
+    :param pattern: compiled bytes regex
+    :param searched: length of data searched before
+    :param lookbehind: how many already searched bytes are searched again
+    :return: tuple (start, end) of the match, or None
+    """
+    match = pattern.search(data, max(0, searched - lookbehind))
+    return None if match is None else match.span()
+
+
+def bytes_pattern(regex):
+    if isinstance(regex, str):
+        return re.compile(regex.encode("utf-8"))
+    if isinstance(regex, (bytes, bytearray)):
+        return re.compile(bytes(regex))
+    if isinstance(regex.pattern, str):
+        return re.compile(regex.pattern.encode("utf-8"), regex.flags & ~re.UNICODE)
+    return regex
+
+
+TUBES = weakref.WeakKeyDictionary()
+
+
+def tube(s):
+    """
+    :param s: Tube or socket
+    :return: Tube reading from the socket, the same for every call with this socket
+    """
+    if isinstance(s, Tube):
+        return s
+    if s not in TUBES:
+        TUBES[s] = Tube(s)
+    return TUBES[s]
+
+
+def buffered_tube(s):
+    """
+    :param s: Tube or socket
+    :return: Tube if s is a Tube or a socket which already has one, None for a plain socket
+    """
+    if isinstance(s, Tube):
+        return s
+    return TUBES.get(s)
+
+
+def peek(s, size):
+    """
+    :param s: socket
+    :param size: maximum number of bytes
+    :return: data waiting in the socket, without consuming it, or None if the socket doesn't support MSG_PEEK,
+    eg. ssl.SSLSocket, or socket-like object with recv taking only the size
+    """
+    try:
+        return s.recv(size, socket.MSG_PEEK)
+    except (ValueError, TypeError):
+        return None
+
+
+def receive_exactly_until(s, find, data, limit=None):
+    """
+    Receive data from plain socket until find reports a match, without reading anything after the match.
+    Waiting data is peeked and only bytes up to the end of the match are consumed,
+    or it's read byte by byte if the socket doesn't support MSG_PEEK.
+    :param s: socket
+    :param find: function taking data and length of data searched before, returning (start, end) or None
+    :param data: bytearray receiving the data, so that data received so far is kept if an exception is raised
+    :param limit: maximum number of bytes to read, None for no limit
+    :return: True if there was a match, False if connection was closed or limit was reached
+    """
+    while limit is None or len(data) < limit:
+        peeked = peek(s, CHUNK_SIZE if limit is None else min(CHUNK_SIZE, limit - len(data)))
+        if peeked is None:
+            peeked = s.recv(1)
+            if not peeked:
+                return False
+            data += peeked
+            if find(data, len(data) - 1) is not None:
+                return True
+            continue
+        if not peeked:
+            return False
+        searched = len(data)
+        found = find(data + peeked, searched)
+        remaining = len(peeked) if found is None else found[1] - searched
+        while remaining:
+            received = s.recv(remaining)
+            data += received
+            remaining -= len(received)
+        if found is not None:
+            return True
+    return False
 
 
 def receive_until(s, delimiters, break_on_empty=False):
-    all_data = b""
-    data = s.recv(1)
-    while data not in delimiters:
-        all_data += data
-        data = s.recv(1)
-        if not data and break_on_empty:
-            return all_data
-    return all_data + data
+    """
+    Receive data from socket until any of delimiters.
+    Plain socket is not read past the delimiter, Tube (or socket which already has one) is read in chunks.
+    :param s: Tube or socket
+    :param delimiters: bytes or list of single byte delimiters
+    :param break_on_empty: kept for compatibility, data received so far is always returned if connection was closed
+    :return: read data, with delimiter
+    """
+    if isinstance(delimiters, (bytes, bytearray)):
+        delimiters = [delimiters[i:i + 1] for i in range(len(delimiters))]
+    t = buffered_tube(s)
+    if t is None:
+        data = bytearray()
+        receive_exactly_until(s, lambda received, searched: find_delimiters(received, delimiters, searched), data)
+        return bytes(data)
+    try:
+        return t.recvuntil(delimiters)
+    except EOFError:
+        return t.buffered()
 
 
 def receive_until_match(s, regex, timeout=None, limit=-1, break_on_empty=False):
     """
-    Receive data from socket until regular expression is matching
-    :param s: socket
+    Receive data from socket until regular expression is matching.
+    Plain socket is not read past the match, Tube (or socket which already has one) is read in chunks.
+    :param s: Tube or socket
     :param regex: regex to match
     :param timeout: read timeout, None for no timeout
-    :param limit: data read attempts limit
+    :param limit: maximum number of bytes to read, -1 for no limit
+    :param break_on_empty: kept for compatibility, data received so far is always returned if connection was closed
     :return: read data
     """
+    t = buffered_tube(s)
+    if t is None:
+        return receive_exactly_until_match(s, bytes_pattern(regex), timeout, None if limit == -1 else limit + 1)
+    t.settimeout(timeout)
+    try:
+        return t.recvregex(regex, limit=None if limit == -1 else limit + 1)
+    except EOFError:
+        return t.buffered()
+    except Exception as e:
+        print('error', e)
+        data = t.buffered()
+        print(data)
+        return data
+    finally:
+        t.settimeout(None)
+
+
+def receive_exactly_until_match(s, pattern, timeout, limit):
     s.settimeout(timeout)
-    all_data = b""
-    i = 0
+    data = bytearray()
     try:
-        while re.search(regex, all_data.decode("utf-8")) is None:
-            new_char = s.recv(1)
-            all_data += new_char
-            if (limit != -1 and i > limit) or (not new_char and break_on_empty):
-                break
-            i += 1
+        receive_exactly_until(s, lambda received, searched: find_regex(received, pattern, searched), data, limit)
     except Exception as e:
         print('error', e)
-        print(all_data)
-    s.settimeout(None)
-    return all_data
+        print(bytes(data))
+    finally:
+        s.settimeout(None)
+    return bytes(data)
+
+
+def batch_query(s, queries, parse, window=64):
+    """
+    Pipelined queries for services answering line-oriented queries in order.
+    Up to window queries are sent with a single sendall, and more are sent when half of responses was parsed,
+    so there is one round-trip per window instead of one per query.
+    If the generator is closed early, responses to queries already sent are parsed and dropped.
+    :param s: Tube or socket
+    :param queries: iterable of payloads, each is sent with a trailing newline like in send
+    :param parse: function reading a single response from the Tube and returning the result, eg. Tube.recvline
+    :param window: maximum number of queries sent but not parsed yet
+    :return: generator of results, in order of queries
+    """
+    t = tube(s)
+    queries = iter(queries)
+    pending = 0
+    try:
+        while True:
+            if pending <= window // 2:
+                batch = list(itertools.islice(queries, window - pending))
+                if batch:
+                    t.sendall(b"".join(payload + b"\n" for payload in batch))
+                    pending += len(batch)
+            if not pending:
+                return
+            result = parse(t)
+            pending -= 1
+            yield result
+    except GeneratorExit:
+        for _ in range(pending):
+            parse(t)
+        raise
+
+
+def batch_oracle(s, encode, parse, window=64):
+    """
+    :param s: Tube or socket
+    :param encode: function making payload for the oracle query, eg. lambda ct: str(ct).encode()
+    :param parse: function reading a single response from the Tube and returning the result
+    :param window: maximum number of queries sent but not parsed yet
+    :return: batch oracle function, taking iterable of queries and returning iterable of results, see batch_query
+    """
+    return lambda queries: batch_query(s, (encode(query) for query in queries), parse, window)
 
 
 def send(s, payload):
@@ -51,6 +361,4 @@ def send(s, payload):
 
 
 def interactive(s):
-    t = telnetlib.Telnet()
-    t.sock = s
-    t.interact()
+    tube(s).interactive()
@@ -1,39 +1,110 @@
-from crypto_commons.brute.brute import brute
-from crypto_commons.generic import long_to_bytes
-
-
 def lsb_oracle_distributed(encrypted_data, multiplicator, upper_bound, oracle_fun, processes=8):
     """
     LSB oracle attack implementation, recovering bits in parallel.
-    CPython has issues with pickling functions, so use PyPy instead in case of trouble.
-    Keep in mind the progress will be visible only once all bits are collected!
-    To see progress right away use the serial version.
+    Oracle is queried from a pool of threads, see lsb_oracle_concurrent.
     :param encrypted_data: initial encrypted data
     :param multiplicator: function to multiply ciphertext in a way such that plaintext after decoding is multiplied by 2
     :param upper_bound: upper bound for the plaintext, most likely modulus
     :param oracle_fun: lsb oracle function returning LSB of plaintext for given ciphertext
-    :param processes: number of parallel processes
+    :param processes: number of parallel queries
     :return: plaintext value
     """
+    return lsb_oracle_concurrent(encrypted_data, multiplicator, upper_bound, oracle_fun, processes)
 
-    def distributed_bits_collector(encrypted_data, multiplicator, upper_bound, oracle_fun, processes):
-        def worker(data):
-            index, ct = data
-            bit = oracle_fun(ct)
-            print("Recovered bit %d -> %d" % (index, bit))
-            return index, bit
 
-        ciphertext = encrypted_data
-        data_set = []
-        for i in range(len(bin(upper_bound)) - 2):
-            ciphertext = multiplicator(ciphertext)
-            data_set.append((i, ciphertext))
-        results = brute(worker, data_set, processes)
-        sorted(results, key=lambda x: x[0])
-        return [bit for index, bit in results]
+def lsb_ciphertexts(encrypted_data, multiplicator, upper_bound):
+    """
+    :return: generator of ciphertexts for consecutive bits, as many as bits of upper bound
+    """
+    ciphertext = encrypted_data
+    for _ in range(upper_bound.bit_length()):
+        ciphertext = multiplicator(ciphertext)
+        yield ciphertext
+
+
+def lsb_oracle_concurrent(encrypted_data, multiplicator, upper_bound, oracle_fun, threads=16, in_flight=None,
+                          retries=0, queries_per_second=None):
+    """
+    LSB oracle attack implementation for remote oracles, with many queries in progress at the same time.
+    Bits are passed to the solver in order, as soon as they arrive.
+    :param encrypted_data: initial encrypted data
+    :param multiplicator: function to multiply ciphertext in a way such that plaintext after decoding is multiplied by 2
+    :param upper_bound: upper bound for the plaintext, most likely modulus
+    :param oracle_fun: lsb oracle function returning LSB of plaintext for given ciphertext, has to be thread-safe
+    :param threads: number of threads querying the oracle, eg. each with its own connection
+    :param in_flight: maximum number of queries sent ahead of the solver, by default number of threads
+    :param retries: how many times a query raising an exception is repeated
+    :param queries_per_second: rate limit for all threads together
+    :return: plaintext value
+    """
+    from crypto_commons.oracle.oracle_tools import concurrent_imap, retrying, rate_limited
+    if queries_per_second is not None:
+        oracle_fun = rate_limited(oracle_fun, queries_per_second)
+    if retries:
+        oracle_fun = retrying(oracle_fun, retries)
+    bits = concurrent_imap(oracle_fun, lsb_ciphertexts(encrypted_data, multiplicator, upper_bound), threads, in_flight)
+    try:
+        return lsb_oracle_from_bits(upper_bound, bits)
+    finally:
+        bits.close()
+
+
+async def lsb_oracle_async(encrypted_data, multiplicator, upper_bound, oracle_fun, concurrency=16, retries=0,
+                           queries_per_second=None):
+    """
+    LSB oracle attack implementation for asynchronous oracles, with many queries in progress at the same time.
+    Bits are passed to the solver in order, as soon as they arrive, and queries not needed anymore are cancelled.
+    :param encrypted_data: initial encrypted data
+    :param multiplicator: function to multiply ciphertext in a way such that plaintext after decoding is multiplied by 2
+    :param upper_bound: upper bound for the plaintext, most likely modulus
+    :param oracle_fun: coroutine function returning LSB of plaintext for given ciphertext
+    :param concurrency: maximum number of queries in progress
+    :param retries: how many times a query raising an exception is repeated, with backoff as in oracle_tools.retrying
+    :param queries_per_second: rate limit for all queries together
+    :return: plaintext value
+    """
+    import asyncio
+    from crypto_commons.oracle.oracle_tools import async_retrying, async_rate_limited
+    if queries_per_second is not None:
+        oracle_fun = async_rate_limited(oracle_fun, queries_per_second)
+    if retries:
+        oracle_fun = async_retrying(oracle_fun, retries)
+    semaphore = asyncio.Semaphore(concurrency)
 
-    bits = distributed_bits_collector(encrypted_data, multiplicator, upper_bound, oracle_fun, processes)
-    return lsb_oracle_from_bits(upper_bound, iter(bits))
+    async def query(ciphertext):
+        async with semaphore:
+            return await oracle_fun(ciphertext)
+
+    tasks = [asyncio.ensure_future(query(ct)) for ct in lsb_ciphertexts(encrypted_data, multiplicator, upper_bound)]
+    try:
+        interval = LSBInterval(upper_bound)
+        for task in tasks:
+            interval.add(await task)
+            if interval.solved():
+                return interval.lower()
+        return interval.upper()
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+def lsb_oracle_batched(encrypted_data, multiplicator, upper_bound, batch_oracle):
+    """
+    LSB oracle attack implementation for pipelined oracles, eg. many queries sent at once over a single connection.
+    All ciphertexts are known upfront, so they are passed to the oracle as a single lazy iterable.
+    :param encrypted_data: initial encrypted data
+    :param multiplicator: function to multiply ciphertext in a way such that plaintext after decoding is multiplied by 2
+    :param upper_bound: upper bound for the plaintext, most likely modulus
+    :param batch_oracle: function taking iterable of ciphertexts and returning iterable of their LSBs in order,
+    eg. netcat_commons.batch_oracle
+    :return: plaintext value
+    """
+    bits = iter(batch_oracle(lsb_ciphertexts(encrypted_data, multiplicator, upper_bound)))
+    try:
+        return lsb_oracle_from_bits(upper_bound, bits)
+    finally:
+        if hasattr(bits, "close"):
+            bits.close()
 
 
 def lsb_oracle(encrypted_data, multiplicator, upper_bound, oracle_fun):
@@ -56,34 +127,69 @@ def lsb_oracle(encrypted_data, multiplicator, upper_bound, oracle_fun):
     return lsb_oracle_from_bits(upper_bound, bits_provider())
 
 
-def lsb_oracle_from_bits(upper_bound, bits):
+def lsb_oracle_from_bits(upper_bound, bits, progress=None):
     """
     Use binary search to recover plaintext from LSB bits.
+    Bits are binary digits of plaintext / upper_bound, so after i bits plaintext is in
+    [upper_bound * k / 2^i, upper_bound * (k + 1) / 2^i) where k is the integer made of these bits.
+    Interval is calculated with exact integers, updated with every bit, see LSBInterval.
     :param upper_bound: upper bound for the plaintext, most likely modulus
-    :param bits: list of LSB bits
-    :return: recovered plaintext
+    :param bits: iterable of LSB bits, if it's a complete list plaintext is recovered in a single step
+    :param progress: function called after every bit with (bit index, bit, lower bound, upper bound)
+    :return: recovered plaintext, or upper bound of the interval if there were not enough bits
     """
-    flag_count = n_count = 1
-    data_lower_bound = 0
-    data_upper_bound = upper_bound
-    mult = 1
+    length = upper_bound.bit_length()
+    if progress is None and isinstance(bits, (list, tuple)) and len(bits) >= length:
+        return lsb_interval(upper_bound, bits[:length])[0]
+    interval = LSBInterval(upper_bound)
     for bit in bits:
-        flag_count *= 2
-        n_count = n_count * 2 - 1
-        print("bit value = %d" % bit)
-        print("upper = %d" % data_upper_bound)
-        print("upper flag = %s" % long_to_bytes(data_upper_bound))
-        print("lower = %d" % data_lower_bound)
-        print("lower flag = %s" % long_to_bytes(data_lower_bound))
-        print("bit = %d" % mult)
-        print("flag_cnt = %d" % flag_count)
-        print("n_cnt = %d" % n_count)
-        mult += 1
-        if bit == 0:
-            data_upper_bound = upper_bound * n_count / flag_count
-        else:
-            data_lower_bound = upper_bound * n_count / flag_count
-            n_count += 1
-        if data_upper_bound <= data_lower_bound + 1:
-            break
-    return data_upper_bound
+        interval.add(bit)
+        if progress is not None:
+            progress(interval.count, bit, interval.lower(), interval.upper())
+        if interval.solved():
+            return interval.lower()
+    return interval.upper()
+
+
+class LSBInterval(object):
+    def __init__(self, upper_bound):
+        """
+        Interval of possible plaintexts, updated bit by bit.
+        Numerator upper_bound * k is kept instead of k, so a new bit costs a shift and an addition.
+        :param upper_bound: upper bound for the plaintext, most likely modulus
+        """
+        self.upper_bound = upper_bound
+        self.length = upper_bound.bit_length()
+        self.numerator = 0
+        self.count = 0
+
+    def add(self, bit):
+        self.numerator <<= 1
+        if bit:
+            self.numerator += self.upper_bound
+        self.count += 1
+
+    def lower(self):
+        return -((-self.numerator) >> self.count)
+
+    def upper(self):
+        return -((-self.numerator - self.upper_bound) >> self.count)
+
+    def solved(self):
+        """
+        :return: True if the interval contains a single integer
+        """
+        return self.count >= self.length - 1 and self.upper() - self.lower() <= 1
+
+
+def lsb_interval(upper_bound, bits):
+    """
+    :param upper_bound: upper bound for the plaintext, most likely modulus
+    :param bits: list of LSB bits
+    :return: integer interval (lower, upper) such that lower <= plaintext < upper
+    """
+    count = len(bits)
+    k = int("".join("1" if bit else "0" for bit in bits) or "0", 2)
+    lower = -((-upper_bound * k) >> count)
+    upper = -((-upper_bound * (k + 1)) >> count)
+    return lower, upper
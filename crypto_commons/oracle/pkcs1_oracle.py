@@ -0,0 +1,281 @@
+"""
+RSA padding oracle attacks:
+ - Bleichenbacher's attack on PKCS#1 v1.5 encryption padding, with trimmers from
+   "Efficient Padding Oracle Attacks on Cryptographic Hardware" by Bardou et al.
+ - Manger's attack on OAEP, with oracle telling if the first byte of plaintext is zero.
+Searches for the next multiplier test consecutive candidates on many oracle workers at once,
+and intervals of possible plaintexts are kept as exact integers.
+"""
+
+import itertools
+import os
+import threading
+
+from crypto_commons.rsa.rsa_commons import rsa, modinv, gcd
+
+
+class LocalPKCS1Oracle(object):
+    def __init__(self, n, d, strict=False):
+        """
+        Local PKCS#1 v1.5 oracle for testing and benchmarks
+        :param n: modulus
+        :param d: private exponent
+        :param strict: check the whole padding, not only 00 02 prefix
+        """
+        self.n = n
+        self.d = d
+        self.k = (n.bit_length() + 7) // 8
+        self.strict = strict
+        self.queries = 0
+        self.lock = threading.Lock()
+
+    def __call__(self, ciphertext):
+        with self.lock:
+            self.queries += 1
+        plaintext = rsa(ciphertext, self.d, self.n).to_bytes(self.k, 'big')
+        if plaintext[:2] != b"\x00\x02":
+            return False
+        if not self.strict:
+            return True
+        separator = plaintext.find(b"\x00", 2)
+        return separator >= 10
+
+
+class LocalMangerOracle(object):
+    def __init__(self, n, d):
+        """
+        Local OAEP oracle for testing and benchmarks, telling if the first byte of plaintext is zero
+        :param n: modulus
+        :param d: private exponent
+        """
+        self.n = n
+        self.d = d
+        self.bound = 1 << (8 * ((n.bit_length() + 7) // 8 - 1))
+        self.queries = 0
+        self.lock = threading.Lock()
+
+    def __call__(self, ciphertext):
+        with self.lock:
+            self.queries += 1
+        return rsa(ciphertext, self.d, self.n) < self.bound
+
+
+def pkcs1_v15_pad(message, k):
+    """
+    :param message: message bytes
+    :param k: modulus length in bytes
+    :return: padded message as integer
+    """
+    assert len(message) <= k - 11, "Message too long"
+    padding = bytes(bytearray(b or 1 for b in bytearray(os.urandom(k - 3 - len(message)))))
+    return int.from_bytes(b"\x00\x02" + padding + b"\x00" + message, 'big')
+
+
+def pkcs1_v15_unpad(plaintext, k):
+    """
+    :param plaintext: padded message as integer
+    :param k: modulus length in bytes
+    :return: message bytes
+    """
+    data = plaintext.to_bytes(k, 'big')
+    return data[data.index(b"\x00", 2) + 1:]
+
+
+def first_accepted(query, candidates, threads=1):
+    """
+    Find the first candidate accepted by the oracle query, testing many consecutive candidates at once
+    :param query: function returning True for accepted candidate
+    :param candidates: iterable of candidates, can be infinite
+    :param threads: number of oracle queries running at the same time
+    :return: the first accepted candidate, in order of candidates, or None
+    """
+    if threads == 1:
+        for candidate in candidates:
+            if query(candidate):
+                return candidate
+        return None
+    from crypto_commons.oracle.oracle_tools import concurrent_imap
+    candidates = iter(candidates)
+    sent = []
+
+    def remembered():
+        for candidate in candidates:
+            sent.append(candidate)
+            yield candidate
+
+    results = concurrent_imap(query, remembered(), threads)
+    try:
+        for i, accepted in enumerate(results):
+            if accepted:
+                return sent[i]
+    finally:
+        results.close()
+    return None
+
+
+def multiplier_query(oracle, ciphertext, e, n):
+    """
+    :return: function checking if ciphertext multiplied by s^e is accepted by the oracle
+    """
+    return lambda s: oracle(ciphertext * rsa(s, e, n) % n)
+
+
+def ceil_div(a, b):
+    return -(-a // b)
+
+
+def merge_intervals(intervals):
+    result = []
+    for a, b in sorted(intervals):
+        if result and a <= result[-1][1] + 1:
+            result[-1] = (result[-1][0], max(result[-1][1], b))
+        else:
+            result.append((a, b))
+    return result
+
+
+def bleichenbacher_trimmers(oracle, ciphertext, e, n, max_denominator=50, max_queries=2000, max_lcm=4096, threads=1):
+    """
+    Shrink initial interval for a conforming plaintext m using trimmers: if m * u / t is conforming,
+    then m is divisible by t and 2B * t / u <= m < 3B * t / u.
+    :param max_denominator: largest denominator t to check
+    :param max_queries: maximum number of trimmers to check
+    :param max_lcm: limit for the least common multiple of found denominators
+    :return: interval (a, b) of possible plaintexts
+    """
+    k = (n.bit_length() + 7) // 8
+    B = 1 << (8 * (k - 2))
+
+    def trimmer_query(fraction):
+        u, t = fraction
+        return oracle(ciphertext * rsa(u * modinv(t, n) % n, e, n) % n)
+
+    fractions = [(u, t) for t in range(3, max_denominator + 1) for u in range(2 * t // 3 + 1, 3 * t // 2 + 1)
+                 if u != t and gcd(u, t) == 1][:max_queries]
+    denominators = []
+    batch_size = 16 * threads
+    for i in range(0, len(fractions), batch_size):
+        batch = fractions[i:i + batch_size]
+        if threads == 1:
+            results = [trimmer_query(fraction) for fraction in batch]
+        else:
+            from crypto_commons.brute.brute import brute_threads
+            results = brute_threads(trimmer_query, batch, threads)
+        denominators.extend(t for (u, t), accepted in zip(batch, results) if accepted)
+    t = 1
+    for denominator in denominators:
+        common = t * denominator // gcd(t, denominator)
+        if common <= max_lcm:
+            t = common
+    if t == 1:
+        return 2 * B, 3 * B - 1
+    u_min = first_accepted(lambda u: trimmer_query((u, t)),
+                           (u for u in range(2 * t // 3, t) if gcd(u, t) == 1), threads) or t
+    u_max = first_accepted(lambda u: trimmer_query((u, t)),
+                           (u for u in range(3 * t // 2, t, -1) if gcd(u, t) == 1), threads) or t
+    return max(2 * B, ceil_div(2 * B * t, u_min)), min(3 * B - 1, (3 * B * t - 1) // u_max)
+
+
+def bleichenbacher(ciphertext, oracle, e, n, threads=1, trimmers=True, progress=None):
+    """
+    Bleichenbacher's attack on PKCS#1 v1.5 encryption padding
+    :param ciphertext: ciphertext as integer
+    :param oracle: function returning True if given ciphertext (as integer) decrypts to PKCS#1 conforming plaintext
+    :param e: public exponent
+    :param n: modulus
+    :param threads: number of oracle queries running at the same time, oracle has to be thread-safe if more than 1
+    :param trimmers: use trimmers to shrink initial interval before the search
+    :param progress: function called with (step name, intervals) after every step
+    :return: plaintext as integer, with padding
+    """
+    k = (n.bit_length() + 7) // 8
+    B = 1 << (8 * (k - 2))
+    # step 1: blinding, unless ciphertext is already conforming
+    s0 = 1
+    if not oracle(ciphertext):
+        s0 = first_accepted(multiplier_query(oracle, ciphertext, e, n),
+                            (int.from_bytes(os.urandom(k), 'big') % n for _ in itertools.count()), threads)
+    c0 = ciphertext * rsa(s0, e, n) % n
+    query = multiplier_query(oracle, c0, e, n)
+    if trimmers:
+        intervals = [bleichenbacher_trimmers(oracle, c0, e, n, threads=threads)]
+    else:
+        intervals = [(2 * B, 3 * B - 1)]
+    if progress is not None:
+        progress("trimmers", intervals)
+    # step 2a: the smallest s giving conforming plaintext
+    s = first_accepted(query, itertools.count(ceil_div(n + 2 * B, intervals[0][1] + 1)), threads)
+    while True:
+        intervals = narrow_intervals(intervals, s, n, B)
+        if progress is not None:
+            progress("step 3", intervals)
+        if len(intervals) == 1 and intervals[0][0] == intervals[0][1]:
+            return intervals[0][0] * modinv(s0, n) % n
+        if len(intervals) > 1:
+            # step 2b: search with more than one interval left
+            s = first_accepted(query, itertools.count(s + 1), threads)
+        else:
+            # step 2c: search with a single interval left
+            a, b = intervals[0]
+            s = first_accepted(query, step_2c_candidates(a, b, s, n, B), threads)
+
+
+def step_2c_candidates(a, b, s, n, B):
+    r = ceil_div(2 * (b * s - 2 * B), n)
+    while True:
+        for candidate in range(ceil_div(2 * B + r * n, b), (3 * B - 1 + r * n) // a + 1):
+            yield candidate
+        r += 1
+
+
+def narrow_intervals(intervals, s, n, B):
+    """
+    Step 3 of the attack: intervals of plaintexts m such that m * s mod n is conforming
+    """
+    result = []
+    for a, b in intervals:
+        for r in range(ceil_div(a * s - 3 * B + 1, n), (b * s - 2 * B) // n + 1):
+            low = max(a, ceil_div(2 * B + r * n, s))
+            high = min(b, (3 * B - 1 + r * n) // s)
+            if low <= high:
+                result.append((low, high))
+    return merge_intervals(result)
+
+
+def manger(ciphertext, oracle, e, n, threads=1):
+    """
+    Manger's attack on OAEP
+    :param ciphertext: ciphertext as integer, its plaintext has to be smaller than B = 2^(8*(k-1))
+    :param oracle: function returning True if plaintext of given ciphertext (as integer) is smaller than B,
+    eg. the first byte is zero
+    :param e: public exponent
+    :param n: modulus
+    :param threads: number of oracle queries running at the same time in step 2, oracle has to be thread-safe
+    :return: plaintext as integer
+    """
+    k = (n.bit_length() + 7) // 8
+    B = 1 << (8 * (k - 1))
+    assert 2 * B < n, "Modulus too small for Manger's attack"
+
+    below = multiplier_query(oracle, ciphertext, e, n)
+
+    # step 1: f1 * m in [B, 2B)
+    f1 = 2
+    while below(f1):
+        f1 *= 2
+    # step 2: f2 * m in [n, n + B)
+    half = f1 // 2
+    start = (n + B) // B
+    f2 = first_accepted(below, (half * i for i in itertools.count(start)), threads)
+    # step 3: binary search
+    m_min = ceil_div(n, f2)
+    m_max = (n + B) // f2
+    while m_min < m_max:
+        f_tmp = (2 * B) // (m_max - m_min)
+        i = f_tmp * m_min // n
+        f3 = ceil_div(i * n, m_min)
+        if below(f3):
+            m_max = (i * n + B) // f3
+        else:
+            m_min = ceil_div(i * n + B, f3)
+    return m_min
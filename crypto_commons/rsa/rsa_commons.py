@@ -35,7 +35,13 @@ def recover_factors_from_phi(n, phi):
     :param phi: int
     :return: result pair of ints (p, q), sorted
     """
+    import time
+    from crypto_commons.cache.factor_cache import cached_factors, record_factors
+    cached = cached_factors(n)
+    if cached is not None and len(cached) == 2 and (cached[0] - 1) * (cached[1] - 1) == phi:
+        return tuple(cached)
     from gmpy2 import isqrt
+    start_time = time.time()
     p_plus_q = n - phi + 1
     delta = p_plus_q ** 2 - 4 * n
     p = int((p_plus_q + isqrt(delta)) // 2)
@@ -45,6 +51,7 @@ def recover_factors_from_phi(n, phi):
         raise ValueError("n is not a product of two primes"
                          ", or phi is not it's totient")
 
+    record_factors(n, [p, q], "phi", start_time)
     return tuple(sorted((p, q)))
 
 
@@ -241,19 +248,64 @@ def hensel_lifting(f, df, p, k, base_solution):
     return solution
 
 
-def hastad_broadcast(residue_and_moduli):
+def kth_power_filter_primes(k, count=8):
+    """
+    Find small primes p = 1 mod k, which are good for testing if given number is a k-th power.
+    Only 1/k of residues mod such p are k-th powers, so each prime rejects most of non-powers.
+    :param k: power
+    :param count: how many primes to return
+    :return: list of primes
+    """
+    primes = []
+    p = k + 1
+    while len(primes) < count:
+        if p > 2 and all(p % d != 0 for d in range(2, int(p ** 0.5) + 1)):
+            primes.append(p)
+        p += k
+    return primes
+
+
+def is_kth_power_residue(x, k, primes):
+    """
+    Fast check if x can be a k-th power of some integer, by verifying it's a k-th power residue modulo small primes.
+    False positives are possible, false negatives are not.
+    :param x: number to check
+    :param k: power
+    :param primes: small primes to test, preferably p = 1 mod k
+    :return: False if x is for sure not a k-th power
+    """
+    for p in primes:
+        r = x % p
+        if r != 0 and pow(r, (p - 1) // gcd(k, p - 1), p) != 1:
+            return False
+    return True
+
+
+def hastad_broadcast(residue_and_moduli, e=None):
     """
     Hastad RSA attack for the same message encrypted with the same public exponent e and different modulus.
-    Requires exactly 'e' pairs as input
-    Depends on gmpy2 because I don't know how to write a fast k-th integer root.
+    Requires at least 'e' pairs as input.
+    If there are more pairs, subsets of 'e' or more pairs are tried, until one of them gives exact e-th root.
+    This way some broken pairs (eg. different message) don't spoil the result.
+    Each CRT result is first checked modulo some small primes, so the root is calculated only for real candidates.
     :param residue_and_moduli: list of pairs (residue, modulus)
-    :return: decrypted message
-    """
-    import gmpy2
-    k = len(residue_and_moduli)
-    solution, _ = gmpy2.iroot(solve_crt(residue_and_moduli), k)
-    assert residue_and_moduli[0][0] == pow(int(solution), k, residue_and_moduli[0][1])
-    return solution
+    :param e: public exponent, by default number of pairs
+    :return: decrypted message or None if no subset gave exact root
+    """
+    from crypto_commons.generic import integer_root
+    if e is None:
+        e = len(residue_and_moduli)
+    filter_primes = kth_power_filter_primes(e)
+    pairs = sorted(residue_and_moduli, key=lambda pair: pair[1], reverse=True)
+    for subset_size in range(e, len(pairs) + 1):
+        for subset in itertools.combinations(pairs, subset_size):
+            crt = solve_crt(subset)
+            if not is_kth_power_residue(crt, e, filter_primes):
+                continue
+            solution, exact = integer_root(crt, e)
+            if exact and all(pow(solution, e, n) == c % n for c, n in subset):
+                return solution
+    return None
 
 
 def combine_signatures(signatures, N):
@@ -282,6 +334,35 @@ def homomorphic_blinding_rsa(payload, get_signature, N, splits=2):
     return result_sig
 
 
+def homomorphic_blinding_rsa_random(payload, get_signature, N, e=None, concurrency=2):
+    """
+    Perform blinding RSA attack on non-padded homomorphic implementations, using random blinding factor r.
+    No factoring of the payload is needed, so it works also for prime payloads.
+    If e is known, only m*r^e is signed and r is removed locally: (m*r^e)^d * r^-1 = m^d.
+    Otherwise m*r and r^-1 are signed: (m*r)^d * (r^-1)^d = m^d.
+    All signature requests are sent concurrently in a single round.
+    :param payload: data to sign
+    :param get_signature: function returning signature, can be also a coroutine function
+    :param N: modulus
+    :param e: public exponent, if known
+    :param concurrency: number of signature requests in-flight
+    :return: signed data
+    """
+    import random
+    from crypto_commons.brute.brute import brute_concurrent
+    data = ensure_long(payload) % N
+    while True:
+        r = random.randint(2, N - 1)
+        if gcd(r, N) == 1:
+            break
+    r_inv = modinv(r, N)
+    if e is not None:
+        signature = brute_concurrent(get_signature, [data * rsa(r, e, N) % N], concurrency)[0]
+        return signature * r_inv % N
+    signatures = brute_concurrent(get_signature, [data * r % N, r_inv], concurrency)
+    return combine_signatures(signatures, N)
+
+
 def modular_sqrt_composite(c, factors):
     """
     Calculates modular square root of composite value for given all modulus factors
@@ -352,8 +433,19 @@ def legendre_symbol(a, p):
 def common_factor_factorization(ns):
     """
     Try to factor given list of moduli by calculating gcd for each pair, hoping that some share the same prime
+    Factors found this way are saved in the factor cache, if it's enabled.
     :param ns: list of moduli
     :return: list of triplets (modulus1, modulus2, shared prime)
     """
+    import time
     from itertools import combinations
-    return [(n1, n2, gcd(n1, n2)) for n1, n2 in combinations(ns, 2) if gcd(n1, n2) != 1]
+    from crypto_commons.cache.factor_cache import record_factors
+    start_time = time.time()
+    results = []
+    for n1, n2 in combinations(ns, 2):
+        shared = gcd(n1, n2)
+        if shared != 1:
+            results.append((n1, n2, shared))
+            record_factors(n1, [shared, n1 // shared], "common_factor", start_time)
+            record_factors(n2, [shared, n2 // shared], "common_factor", start_time)
+    return results
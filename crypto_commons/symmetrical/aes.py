@@ -22,8 +22,14 @@ Large part of this code is based on another piece of code, so we include the dis
 """
 
 
+import struct
+
+
 def xor(a, b):
-    return ''.join(chr(ord(ac) ^ ord(bc)) for ac, bc in zip(a, b))
+    try:
+        return ''.join(chr(ord(ac) ^ ord(bc)) for ac, bc in zip(a, b))
+    except TypeError:
+        return bytes(bytearray(ac ^ bc for ac, bc in zip(bytearray(a), bytearray(b))))
 
 
 Sbox = (
@@ -74,71 +80,151 @@ Rcon = (
 )
 
 
+def gf_mul(a, b):
+    result = 0
+    while b:
+        if b & 1:
+            result ^= a
+        a = xtime(a)
+        b >>= 1
+    return result
+
+
+def rotate_word(word, bits):
+    return ((word >> bits) | (word << (32 - bits))) & 0xFFFFFFFF
+
+
+def make_tables(box, coefficients):
+    """
+    Prepare 32-bit lookup tables combining S-box with (Inv)MixColumns.
+    Table i gives contribution of i-th byte of the column to the whole output column.
+    """
+    table0 = tuple((gf_mul(box[x], coefficients[0]) << 24) | (gf_mul(box[x], coefficients[1]) << 16) |
+                   (gf_mul(box[x], coefficients[2]) << 8) | gf_mul(box[x], coefficients[3]) for x in range(256))
+    return (table0,) + tuple(tuple(rotate_word(word, 8 * i) for word in table0) for i in range(1, 4))
+
+
+XTIME = tuple(xtime(a) for a in range(256))
+Te0, Te1, Te2, Te3 = make_tables(Sbox, (2, 1, 1, 3))
+Td0, Td1, Td2, Td3 = make_tables(InvSbox, (14, 9, 13, 11))
+
+
+def to_byte_values(text):
+    if not isinstance(text, (bytes, bytearray)):
+        text = text.encode('latin-1')
+    return bytearray(text)
+
+
 def text2matrix(text):
-    matrix = []
-    for i in range(16):
-        byte = ord(text[i])
-        if i % 4 == 0:
-            matrix.append([byte])
-        else:
-            matrix[i / 4].append(byte)
-    return matrix
+    data = to_byte_values(text)
+    return [list(data[i:i + 4]) for i in range(0, 16, 4)]
 
 
 def matrix2text(matrix):
-    text = ''
-    for i in range(4):
-        for j in range(4):
-            text = text + chr(matrix[i][j])
-    return text
+    return bytes(bytearray(byte for column in matrix for byte in column))
+
+
+def block2words(block):
+    return struct.unpack(">4I", bytes(to_byte_values(block)))
+
+
+def words2block(words):
+    return struct.pack(">4I", *words)
+
+
+def inv_mix_column_word(word):
+    """
+    InvMixColumns of a single column, using decryption tables on S-box output to cancel InvSbox
+    """
+    return Td0[Sbox[word >> 24]] ^ Td1[Sbox[(word >> 16) & 0xFF]] ^ Td2[Sbox[(word >> 8) & 0xFF]] ^ Td3[Sbox[word & 0xFF]]
 
 
 class AES:
+    """
+    Table-driven AES implementation working on bytes, for 128, 192 and 256 bit keys.
+    Full encryption and decryption use 32-bit T-tables, while the single-step functions working on state matrices
+    (round_encrypt, sub_bytes, x_* etc.) are kept for reduced-round and fault attacks.
+    """
+
+    def __init__(self, master_key=None):
+        self.init(master_key)
+
     def init(self, master_key=None):
         if master_key:
             self.change_key(master_key)
 
     def change_key(self, master_key):
-        self.round_keys = text2matrix(master_key)
-
-        for i in range(4, 4 * 11):
-            self.round_keys.append([])
-            if i % 4 == 0:
-                byte = self.round_keys[i - 4][0] \
-                       ^ Sbox[self.round_keys[i - 1][1]] \
-                       ^ Rcon[i / 4]
-                self.round_keys[i].append(byte)
-
-                for j in range(1, 4):
-                    byte = self.round_keys[i - 4][j] \
-                           ^ Sbox[self.round_keys[i - 1][(j + 1) % 4]]
-                    self.round_keys[i].append(byte)
-            else:
-                for j in range(4):
-                    byte = self.round_keys[i - 4][j] \
-                           ^ self.round_keys[i - 1][j]
-                    self.round_keys[i].append(byte)
-
-    def encrypt(self, plaintext):
-        self.plain_state = text2matrix(plaintext)
-        self.add_round_key(self.plain_state, self.round_keys[:4])
-        for i in range(1, 10):
-            self.round_encrypt(self.plain_state, self.round_keys[4 * i: 4 * (i + 1)])
-        self.sub_bytes(self.plain_state)
-        self.shift_rows(self.plain_state)
-        self.add_round_key(self.plain_state, self.round_keys[40:])
-
-        return matrix2text(self.plain_state)
-
-    def decrypt(self, ciphertext):
-        self.cipher_state = text2matrix(ciphertext)
-        self.add_round_key(self.cipher_state, self.round_keys[40:])
-        self.inv_shift_rows(self.cipher_state)
-        self.inv_sub_bytes(self.cipher_state)
-        for i in range(9, 0, -1):
-            self.round_decrypt(self.cipher_state, self.round_keys[4 * i: 4 * (i + 1)])
-        self.add_round_key(self.cipher_state, self.round_keys[:4])
-        return matrix2text(self.cipher_state)
+        """
+        Set key, expanded schedules are cached by master key
+        :param master_key: 16, 24 or 32 bytes
+        """
+        from crypto_commons.symmetrical.aes_key_schedule import expand_key_words
+        words, decryption_words = expand_key_words(master_key)
+        self.round_keys = [[word >> 24, (word >> 16) & 0xFF, (word >> 8) & 0xFF, word & 0xFF] for word in words]
+        self.round_key_words = list(words)
+        self.decryption_key_words = list(decryption_words)
+        self.rounds = len(words) // 4 - 1
+
+    def encrypt(self, plaintext, rounds=None):
+        """
+        Encrypt single block
+        :param plaintext: 16 bytes
+        :param rounds: number of rounds, for reduced-round variants, last round is always without MixColumns
+        :return: ciphertext bytes
+        """
+        rounds = self.rounds if rounds is None else rounds
+        rk = self.round_key_words
+        s0, s1, s2, s3 = block2words(plaintext)
+        s0 ^= rk[0]
+        s1 ^= rk[1]
+        s2 ^= rk[2]
+        s3 ^= rk[3]
+        for r in range(1, rounds):
+            k = 4 * r
+            s0, s1, s2, s3 = (
+                Te0[s0 >> 24] ^ Te1[(s1 >> 16) & 0xFF] ^ Te2[(s2 >> 8) & 0xFF] ^ Te3[s3 & 0xFF] ^ rk[k],
+                Te0[s1 >> 24] ^ Te1[(s2 >> 16) & 0xFF] ^ Te2[(s3 >> 8) & 0xFF] ^ Te3[s0 & 0xFF] ^ rk[k + 1],
+                Te0[s2 >> 24] ^ Te1[(s3 >> 16) & 0xFF] ^ Te2[(s0 >> 8) & 0xFF] ^ Te3[s1 & 0xFF] ^ rk[k + 2],
+                Te0[s3 >> 24] ^ Te1[(s0 >> 16) & 0xFF] ^ Te2[(s1 >> 8) & 0xFF] ^ Te3[s2 & 0xFF] ^ rk[k + 3],
+            )
+        k = 4 * rounds
+        return words2block((
+            ((Sbox[s0 >> 24] << 24) | (Sbox[(s1 >> 16) & 0xFF] << 16) | (Sbox[(s2 >> 8) & 0xFF] << 8) | Sbox[s3 & 0xFF]) ^ rk[k],
+            ((Sbox[s1 >> 24] << 24) | (Sbox[(s2 >> 16) & 0xFF] << 16) | (Sbox[(s3 >> 8) & 0xFF] << 8) | Sbox[s0 & 0xFF]) ^ rk[k + 1],
+            ((Sbox[s2 >> 24] << 24) | (Sbox[(s3 >> 16) & 0xFF] << 16) | (Sbox[(s0 >> 8) & 0xFF] << 8) | Sbox[s1 & 0xFF]) ^ rk[k + 2],
+            ((Sbox[s3 >> 24] << 24) | (Sbox[(s0 >> 16) & 0xFF] << 16) | (Sbox[(s1 >> 8) & 0xFF] << 8) | Sbox[s2 & 0xFF]) ^ rk[k + 3],
+        ))
+
+    def decrypt(self, ciphertext, rounds=None):
+        """
+        Decrypt single block
+        :param ciphertext: 16 bytes
+        :param rounds: number of rounds, for reduced-round variants, last round is always without MixColumns
+        :return: plaintext bytes
+        """
+        rounds = self.rounds if rounds is None else rounds
+        rk = self.round_key_words
+        dk = self.decryption_key_words
+        k = 4 * rounds
+        s0, s1, s2, s3 = block2words(ciphertext)
+        s0 ^= rk[k]
+        s1 ^= rk[k + 1]
+        s2 ^= rk[k + 2]
+        s3 ^= rk[k + 3]
+        for r in range(rounds - 1, 0, -1):
+            k = 4 * r
+            s0, s1, s2, s3 = (
+                Td0[s0 >> 24] ^ Td1[(s3 >> 16) & 0xFF] ^ Td2[(s2 >> 8) & 0xFF] ^ Td3[s1 & 0xFF] ^ dk[k],
+                Td0[s1 >> 24] ^ Td1[(s0 >> 16) & 0xFF] ^ Td2[(s3 >> 8) & 0xFF] ^ Td3[s2 & 0xFF] ^ dk[k + 1],
+                Td0[s2 >> 24] ^ Td1[(s1 >> 16) & 0xFF] ^ Td2[(s0 >> 8) & 0xFF] ^ Td3[s3 & 0xFF] ^ dk[k + 2],
+                Td0[s3 >> 24] ^ Td1[(s2 >> 16) & 0xFF] ^ Td2[(s1 >> 8) & 0xFF] ^ Td3[s0 & 0xFF] ^ dk[k + 3],
+            )
+        return words2block((
+            ((InvSbox[s0 >> 24] << 24) | (InvSbox[(s3 >> 16) & 0xFF] << 16) | (InvSbox[(s2 >> 8) & 0xFF] << 8) | InvSbox[s1 & 0xFF]) ^ rk[0],
+            ((InvSbox[s1 >> 24] << 24) | (InvSbox[(s0 >> 16) & 0xFF] << 16) | (InvSbox[(s3 >> 8) & 0xFF] << 8) | InvSbox[s2 & 0xFF]) ^ rk[1],
+            ((InvSbox[s2 >> 24] << 24) | (InvSbox[(s1 >> 16) & 0xFF] << 16) | (InvSbox[(s0 >> 8) & 0xFF] << 8) | InvSbox[s3 & 0xFF]) ^ rk[2],
+            ((InvSbox[s3 >> 24] << 24) | (InvSbox[(s2 >> 16) & 0xFF] << 16) | (InvSbox[(s1 >> 8) & 0xFF] << 8) | InvSbox[s0 & 0xFF]) ^ rk[3],
+        ))
 
     def add_round_key(self, s, k):
         for i in range(4):
@@ -182,9 +268,8 @@ class AES:
         self.inv_sub_bytes(state_matrix)
 
     def sub_bytes(self, s):
-        for i in range(4):
-            for j in range(4):
-                s[i][j] = Sbox[s[i][j]]
+        for column in s:
+            column[:] = [Sbox[byte] for byte in column]
 
     def x_sub_bytes(self, s):
         s = text2matrix(s)
@@ -217,9 +302,8 @@ class AES:
         return matrix2text(s)
 
     def inv_sub_bytes(self, s):
-        for i in range(4):
-            for j in range(4):
-                s[i][j] = InvSbox[s[i][j]]
+        for column in s:
+            column[:] = [InvSbox[byte] for byte in column]
 
     def shift_rows(self, s):
         s[0][1], s[1][1], s[2][1], s[3][1] = s[1][1], s[2][1], s[3][1], s[0][1]
@@ -235,10 +319,10 @@ class AES:
         # please see Sec 4.1.2 in The Design of Rijndael
         t = a[0] ^ a[1] ^ a[2] ^ a[3]
         u = a[0]
-        a[0] ^= t ^ xtime(a[0] ^ a[1])
-        a[1] ^= t ^ xtime(a[1] ^ a[2])
-        a[2] ^= t ^ xtime(a[2] ^ a[3])
-        a[3] ^= t ^ xtime(a[3] ^ u)
+        a[0] ^= t ^ XTIME[a[0] ^ a[1]]
+        a[1] ^= t ^ XTIME[a[1] ^ a[2]]
+        a[2] ^= t ^ XTIME[a[2] ^ a[3]]
+        a[3] ^= t ^ XTIME[a[3] ^ u]
 
     def mix_columns(self, s):
         for i in range(4):
@@ -247,8 +331,8 @@ class AES:
     def inv_mix_columns(self, s):
         # see Sec 4.1.3 in The Design of Rijndael
         for i in range(4):
-            u = xtime(xtime(s[i][0] ^ s[i][2]))
-            v = xtime(xtime(s[i][1] ^ s[i][3]))
+            u = XTIME[XTIME[s[i][0] ^ s[i][2]]]
+            v = XTIME[XTIME[s[i][1] ^ s[i][3]]]
             s[i][0] ^= u
             s[i][1] ^= v
             s[i][2] ^= u
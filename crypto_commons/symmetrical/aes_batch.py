@@ -0,0 +1,144 @@
+"""
+AES round functions applied to many blocks at once with numpy.
+States are (N, 16) uint8 arrays, with bytes in the standard AES order (column by column),
+so a single call processes all blocks in C instead of millions of Python-level calls.
+Useful for integral/square attacks, differential fault analysis or checking many key candidates.
+Round functions follow the same semantics as the single block AES class methods.
+numpy is an optional dependency (crypto-commons[numpy]), the module can be imported without it,
+but creating blocks or round keys raises ImportError.
+"""
+
+from crypto_commons.symmetrical.aes import AES, Sbox, InvSbox, XTIME
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+if numpy is not None:
+    SBOX = numpy.array(Sbox, dtype=numpy.uint8)
+    INV_SBOX = numpy.array(InvSbox, dtype=numpy.uint8)
+    XTIME_TABLE = numpy.array(XTIME, dtype=numpy.uint8)
+    SHIFT_ROWS = numpy.array([4 * ((column + row) % 4) + row for column in range(4) for row in range(4)])
+    INV_SHIFT_ROWS = numpy.array([4 * ((column - row) % 4) + row for column in range(4) for row in range(4)])
+
+
+def require_numpy():
+    if numpy is None:
+        raise ImportError("aes_batch requires numpy, install it with pip install crypto-commons[numpy]")
+
+
+def blocks_from_bytes(data):
+    """
+    :param data: bytes, length has to be a multiple of 16
+    :return: (N, 16) uint8 array of blocks
+    """
+    require_numpy()
+    return numpy.frombuffer(data, dtype=numpy.uint8).reshape(-1, 16).copy()
+
+
+def blocks_to_bytes(states):
+    """
+    :param states: (N, 16) uint8 array of blocks
+    :return: bytes
+    """
+    return numpy.ascontiguousarray(states, dtype=numpy.uint8).tobytes()
+
+
+def round_keys_array(master_key):
+    """
+    Expand AES key into round keys array
+    :param master_key: 16, 24 or 32 bytes key
+    :return: (rounds + 1, 16) uint8 array of round keys
+    """
+    require_numpy()
+    aes = AES(master_key)
+    return numpy.array(aes.round_keys, dtype=numpy.uint8).reshape(-1, 16)
+
+
+def add_round_key(states, key):
+    """
+    :param states: (N, 16) array
+    :param key: 16 bytes round key as array, or (N, 16) array with a separate key for every block
+    :return: new states
+    """
+    return states ^ numpy.asarray(key, dtype=numpy.uint8)
+
+
+def sub_bytes(states):
+    return SBOX[states]
+
+
+def inv_sub_bytes(states):
+    return INV_SBOX[states]
+
+
+def shift_rows(states):
+    return states[:, SHIFT_ROWS]
+
+
+def inv_shift_rows(states):
+    return states[:, INV_SHIFT_ROWS]
+
+
+def mix_columns(states):
+    # please see Sec 4.1.2 in The Design of Rijndael
+    columns = states.reshape(-1, 4, 4)
+    a0, a1, a2, a3 = columns[:, :, 0], columns[:, :, 1], columns[:, :, 2], columns[:, :, 3]
+    t = a0 ^ a1 ^ a2 ^ a3
+    result = numpy.empty_like(columns)
+    result[:, :, 0] = a0 ^ t ^ XTIME_TABLE[a0 ^ a1]
+    result[:, :, 1] = a1 ^ t ^ XTIME_TABLE[a1 ^ a2]
+    result[:, :, 2] = a2 ^ t ^ XTIME_TABLE[a2 ^ a3]
+    result[:, :, 3] = a3 ^ t ^ XTIME_TABLE[a3 ^ a0]
+    return result.reshape(-1, 16)
+
+
+def inv_mix_columns(states):
+    # see Sec 4.1.3 in The Design of Rijndael
+    columns = states.reshape(-1, 4, 4).copy()
+    u = XTIME_TABLE[XTIME_TABLE[columns[:, :, 0] ^ columns[:, :, 2]]]
+    v = XTIME_TABLE[XTIME_TABLE[columns[:, :, 1] ^ columns[:, :, 3]]]
+    columns[:, :, 0] ^= u
+    columns[:, :, 1] ^= v
+    columns[:, :, 2] ^= u
+    columns[:, :, 3] ^= v
+    return mix_columns(columns.reshape(-1, 16))
+
+
+def round_encrypt(states, key):
+    return add_round_key(mix_columns(shift_rows(sub_bytes(states))), key)
+
+
+def round_decrypt(states, key):
+    return inv_sub_bytes(inv_shift_rows(inv_mix_columns(add_round_key(states, key))))
+
+
+def encrypt_blocks(states, round_keys, rounds=None):
+    """
+    Encrypt many blocks at once
+    :param states: (N, 16) uint8 array of plaintext blocks
+    :param round_keys: (rounds + 1, 16) array of round keys, eg. from round_keys_array
+    :param rounds: number of rounds, by default all round keys are used, last round is always without MixColumns
+    :return: (N, 16) uint8 array of ciphertext blocks
+    """
+    rounds = len(round_keys) - 1 if rounds is None else rounds
+    states = add_round_key(states, round_keys[0])
+    for i in range(1, rounds):
+        states = round_encrypt(states, round_keys[i])
+    return add_round_key(shift_rows(sub_bytes(states)), round_keys[rounds])
+
+
+def decrypt_blocks(states, round_keys, rounds=None):
+    """
+    Decrypt many blocks at once
+    :param states: (N, 16) uint8 array of ciphertext blocks
+    :param round_keys: (rounds + 1, 16) array of round keys, eg. from round_keys_array
+    :param rounds: number of rounds, by default all round keys are used, last round is always without MixColumns
+    :return: (N, 16) uint8 array of plaintext blocks
+    """
+    rounds = len(round_keys) - 1 if rounds is None else rounds
+    states = inv_sub_bytes(inv_shift_rows(add_round_key(states, round_keys[rounds])))
+    for i in range(rounds - 1, 0, -1):
+        states = round_decrypt(states, round_keys[i])
+    return add_round_key(states, round_keys[0])
@@ -0,0 +1,437 @@
+"""
+Bitsliced AES, encrypting the same block under many keys in parallel.
+Every bit of the state and of the key is stored in a separate "plane", where bit i of the plane belongs to lane i,
+so a single XOR/AND of planes evaluates the gate for all lanes at once.
+Planes can be Python ints (any number of lanes) or numpy uint64 arrays (multiple of 64 lanes).
+S-box is the 113-gate circuit by Boyar and Peralta, key schedule is bitsliced as well,
+so no per-key Python work is needed, which makes searching for partially known keys fast.
+Bytes are lists of 8 planes, most significant bit first, states and round keys are lists of 16 bytes in AES order.
+"""
+
+from crypto_commons.symmetrical.aes import Rcon
+
+ROUNDS = {16: 10, 24: 12, 32: 14}
+SHIFT_ROWS = [4 * ((column + row) % 4) + row for column in range(4) for row in range(4)]
+BIT_CHARS = [bytes(bytearray(ord('1') if (value >> (7 - j)) & 1 else ord('0') for value in range(256)))
+             for j in range(8)]
+
+
+class IntLanes(object):
+    def __init__(self, count):
+        """
+        Planes stored as Python ints
+        :param count: number of lanes
+        """
+        self.count = count
+        self.ones = (1 << count) - 1
+
+    def plane(self, value):
+        """
+        :param value: int with bit i set for lanes i where the plane is 1
+        :return: plane
+        """
+        return value
+
+    def value(self, plane):
+        """
+        :param plane: plane
+        :return: int with bit i set for lanes i where the plane is 1
+        """
+        return plane
+
+
+class NumpyLanes(object):
+    def __init__(self, count):
+        """
+        Planes stored as numpy uint64 arrays
+        :param count: number of lanes, rounded up to a multiple of 64
+        """
+        import numpy
+        self.numpy = numpy
+        self.count = -(-count // 64) * 64
+        self.ones = numpy.full(self.count // 64, 0xFFFFFFFFFFFFFFFF, dtype=numpy.uint64)
+
+    def plane(self, value):
+        return self.numpy.frombuffer(value.to_bytes(self.count // 8, 'little'), dtype='<u8').astype(self.numpy.uint64)
+
+    def value(self, plane):
+        plane = self.numpy.broadcast_to(plane, self.ones.shape).astype('<u8')
+        return int.from_bytes(plane.tobytes(), 'little')
+
+
+def make_lanes(count, use_numpy=False):
+    return NumpyLanes(count) if use_numpy else IntLanes(count)
+
+
+def sbox_planes(u, ones):
+    """
+    Bitsliced AES S-box, circuit from "A depth-16 circuit for the AES S-box" by Boyar and Peralta
+    :param u: byte as 8 planes, most significant bit first
+    :param ones: plane with all lanes set, used for NOT
+    :return: S-box output as 8 planes
+    """
+    u0, u1, u2, u3, u4, u5, u6, u7 = u
+    t1 = u0 ^ u3
+    t2 = u0 ^ u5
+    t3 = u0 ^ u6
+    t4 = u3 ^ u5
+    t5 = u4 ^ u6
+    t6 = t1 ^ t5
+    t7 = u1 ^ u2
+    t8 = u7 ^ t6
+    t9 = u7 ^ t7
+    t10 = t6 ^ t7
+    t11 = u1 ^ u5
+    t12 = u2 ^ u5
+    t13 = t3 ^ t4
+    t14 = t6 ^ t11
+    t15 = t5 ^ t11
+    t16 = t5 ^ t12
+    t17 = t9 ^ t16
+    t18 = u3 ^ u7
+    t19 = t7 ^ t18
+    t20 = t1 ^ t19
+    t21 = u6 ^ u7
+    t22 = t7 ^ t21
+    t23 = t2 ^ t22
+    t24 = t2 ^ t10
+    t25 = t20 ^ t17
+    t26 = t3 ^ t16
+    t27 = t1 ^ t12
+    m1 = t13 & t6
+    m2 = t23 & t8
+    m3 = t14 ^ m1
+    m4 = t19 & u7
+    m5 = m4 ^ m1
+    m6 = t3 & t16
+    m7 = t22 & t9
+    m8 = t26 ^ m6
+    m9 = t20 & t17
+    m10 = m9 ^ m6
+    m11 = t1 & t15
+    m12 = t4 & t27
+    m13 = m12 ^ m11
+    m14 = t2 & t10
+    m15 = m14 ^ m11
+    m16 = m3 ^ m2
+    m17 = m5 ^ t24
+    m18 = m8 ^ m7
+    m19 = m10 ^ m15
+    m20 = m16 ^ m13
+    m21 = m17 ^ m15
+    m22 = m18 ^ m13
+    m23 = m19 ^ t25
+    m24 = m22 ^ m23
+    m25 = m22 & m20
+    m26 = m21 ^ m25
+    m27 = m20 ^ m21
+    m28 = m23 ^ m25
+    m29 = m28 & m27
+    m30 = m26 & m24
+    m31 = m20 & m23
+    m32 = m27 & m31
+    m33 = m27 ^ m25
+    m34 = m21 & m22
+    m35 = m24 & m34
+    m36 = m24 ^ m25
+    m37 = m21 ^ m29
+    m38 = m32 ^ m33
+    m39 = m23 ^ m30
+    m40 = m35 ^ m36
+    m41 = m38 ^ m40
+    m42 = m37 ^ m39
+    m43 = m37 ^ m38
+    m44 = m39 ^ m40
+    m45 = m42 ^ m41
+    m46 = m44 & t6
+    m47 = m40 & t8
+    m48 = m39 & u7
+    m49 = m43 & t16
+    m50 = m38 & t9
+    m51 = m37 & t17
+    m52 = m42 & t15
+    m53 = m45 & t27
+    m54 = m41 & t10
+    m55 = m44 & t13
+    m56 = m40 & t23
+    m57 = m39 & t19
+    m58 = m43 & t3
+    m59 = m38 & t22
+    m60 = m37 & t20
+    m61 = m42 & t1
+    m62 = m45 & t4
+    m63 = m41 & t2
+    l0 = m61 ^ m62
+    l1 = m50 ^ m56
+    l2 = m46 ^ m48
+    l3 = m47 ^ m55
+    l4 = m54 ^ m58
+    l5 = m49 ^ m61
+    l6 = m62 ^ l5
+    l7 = m46 ^ l3
+    l8 = m51 ^ m59
+    l9 = m52 ^ m53
+    l10 = m53 ^ l4
+    l11 = m60 ^ l2
+    l12 = m48 ^ m51
+    l13 = m50 ^ l0
+    l14 = m52 ^ m61
+    l15 = m55 ^ l1
+    l16 = m56 ^ l0
+    l17 = m57 ^ l1
+    l18 = m58 ^ l8
+    l19 = m63 ^ l4
+    l20 = l0 ^ l1
+    l21 = l1 ^ l7
+    l22 = l3 ^ l12
+    l23 = l18 ^ l2
+    l24 = l15 ^ l9
+    l25 = l6 ^ l10
+    l26 = l7 ^ l9
+    l27 = l8 ^ l10
+    l28 = l11 ^ l14
+    l29 = l11 ^ l17
+    return [l6 ^ l24, l16 ^ l26 ^ ones, l19 ^ l28 ^ ones, l6 ^ l21, l20 ^ l22, l25 ^ l29, l13 ^ l27 ^ ones,
+            l6 ^ l23 ^ ones]
+
+
+def xtime_planes(b):
+    return [b[1], b[2], b[3], b[4] ^ b[0], b[5] ^ b[0], b[6], b[7] ^ b[0], b[0]]
+
+
+def xor_byte_planes(a, b):
+    return [x ^ y for x, y in zip(a, b)]
+
+
+def constant_byte(value, ones):
+    """
+    :param value: byte value, same in all lanes
+    :param ones: plane with all lanes set
+    :return: byte as 8 planes
+    """
+    return [ones if (value >> (7 - j)) & 1 else 0 for j in range(8)]
+
+
+def xor_constant(byte, value, ones):
+    return [plane ^ ones if (value >> (7 - j)) & 1 else plane for j, plane in enumerate(byte)]
+
+
+def constant_block(data, ones):
+    return [constant_byte(value, ones) for value in bytearray(data)]
+
+
+def add_round_key(state, key):
+    return [xor_byte_planes(a, b) for a, b in zip(state, key)]
+
+
+def sub_bytes(state, ones):
+    return [sbox_planes(byte, ones) for byte in state]
+
+
+def shift_rows(state):
+    return [state[i] for i in SHIFT_ROWS]
+
+
+def mix_columns(state):
+    # please see Sec 4.1.2 in The Design of Rijndael
+    result = []
+    for c in range(0, 16, 4):
+        a0, a1, a2, a3 = state[c:c + 4]
+        t = xor_byte_planes(xor_byte_planes(a0, a1), xor_byte_planes(a2, a3))
+        for a, b in ((a0, a1), (a1, a2), (a2, a3), (a3, a0)):
+            result.append(xor_byte_planes(xor_byte_planes(a, t), xtime_planes(xor_byte_planes(a, b))))
+    return result
+
+
+def expand_key(key, ones):
+    """
+    Bitsliced key schedule
+    :param key: list of 16, 24 or 32 bytes as planes, eg. from constant_block or key search counter
+    :param ones: plane with all lanes set
+    :return: list of round keys, each a list of 16 bytes as planes
+    """
+    nk = len(key) // 4
+    words = [key[4 * i:4 * i + 4] for i in range(nk)]
+    for i in range(nk, 4 * (ROUNDS[len(key)] + 1)):
+        temp = words[i - 1]
+        if i % nk == 0:
+            temp = [sbox_planes(byte, ones) for byte in temp[1:] + temp[:1]]
+            temp[0] = xor_constant(temp[0], Rcon[i // nk], ones)
+        elif nk > 6 and i % nk == 4:
+            temp = [sbox_planes(byte, ones) for byte in temp]
+        words.append([xor_byte_planes(a, b) for a, b in zip(words[i - nk], temp)])
+    return [sum(words[i:i + 4], []) for i in range(0, len(words), 4)]
+
+
+def encrypt(state, round_keys, ones, rounds=None):
+    """
+    Bitsliced encryption
+    :param state: block as a list of 16 bytes as planes
+    :param round_keys: round keys from expand_key
+    :param ones: plane with all lanes set
+    :param rounds: number of rounds, by default all round keys are used, last round is always without MixColumns
+    :return: encrypted state
+    """
+    rounds = len(round_keys) - 1 if rounds is None else rounds
+    state = add_round_key(state, round_keys[0])
+    for i in range(1, rounds):
+        state = add_round_key(mix_columns(shift_rows(sub_bytes(state, ones))), round_keys[i])
+    return add_round_key(shift_rows(sub_bytes(state, ones)), round_keys[rounds])
+
+
+def pack_blocks(blocks, lanes):
+    """
+    Transpose blocks into planes, block i goes to lane i
+    :param blocks: list of equal length bytes, at most lanes.count
+    :param lanes: IntLanes or NumpyLanes
+    :return: list of bytes as planes
+    """
+    result = []
+    for position in range(len(blocks[0])):
+        column = bytes(bytearray(block[position] for block in blocks))[::-1]
+        result.append([lanes.plane(int(column.translate(BIT_CHARS[j]), 2)) for j in range(8)])
+    return result
+
+
+def unpack_blocks(state, lanes, count=None):
+    """
+    Transpose planes back into blocks
+    :param state: list of bytes as planes
+    :param lanes: IntLanes or NumpyLanes
+    :param count: number of blocks to return, by default all lanes
+    :return: list of bytes, one per lane
+    """
+    count = lanes.count if count is None else count
+    columns = []
+    for byte in state:
+        # every lane becomes a single byte of the column, with bits added in place
+        column = 0
+        for j, plane in enumerate(byte):
+            bits = bin((lanes.value(plane) & ((1 << count) - 1)) | (1 << count))[3:][::-1][:count].encode('ascii')
+            column += (int.from_bytes(bits, 'little') - int.from_bytes(b'0' * count, 'little')) << (7 - j)
+        columns.append(column.to_bytes(count, 'little'))
+    return [bytes(bytearray(column[i] for column in columns)) for i in range(count)]
+
+
+def encrypt_many(keys, plaintext, use_numpy=False, rounds=None):
+    """
+    Encrypt single block under many keys
+    :param keys: list of keys, all of the same length
+    :param plaintext: 16 bytes
+    :param use_numpy: store planes in numpy arrays
+    :param rounds: number of rounds, for reduced-round variants
+    :return: list of ciphertexts, one per key
+    """
+    lanes = make_lanes(len(keys), use_numpy)
+    round_keys = expand_key(pack_blocks(keys, lanes), lanes.ones)
+    state = encrypt(constant_block(plaintext, lanes.ones), round_keys, lanes.ones, rounds)
+    return unpack_blocks(state, lanes, len(keys))
+
+
+def matching_lanes(state, expected, ones, lanes):
+    """
+    :param state: list of bytes as planes
+    :param expected: expected bytes, same in all lanes
+    :param ones: plane with all lanes set
+    :param lanes: IntLanes or NumpyLanes
+    :return: int with bit i set for lanes i where state is equal to expected
+    """
+    match = ones
+    for byte, value in zip(state, bytearray(expected)):
+        for j, plane in enumerate(byte):
+            match = match & (plane if (value >> (7 - j)) & 1 else plane ^ ones)
+        if not lanes.value(match):
+            return 0
+    return lanes.value(match)
+
+
+def find_key(keys, plaintext, ciphertext, use_numpy=False):
+    """
+    Find key encrypting plaintext to ciphertext among given keys, eg. derived from weak seeds
+    :param keys: list of keys, all of the same length
+    :param plaintext: 16 bytes
+    :param ciphertext: 16 bytes
+    :param use_numpy: store planes in numpy arrays
+    :return: matching key or None
+    """
+    lanes = make_lanes(len(keys), use_numpy)
+    round_keys = expand_key(pack_blocks(keys, lanes), lanes.ones)
+    state = encrypt(constant_block(plaintext, lanes.ones), round_keys, lanes.ones)
+    match = matching_lanes(state, ciphertext, lanes.ones, lanes) & ((1 << len(keys)) - 1)
+    return keys[(match & -match).bit_length() - 1] if match else None
+
+
+def counter_pattern(bit, count):
+    """
+    :return: int with bit i set for lanes i where bit of i is set
+    """
+    period = 2 << bit
+    block = ((1 << (1 << bit)) - 1) << (1 << bit)
+    return block * ((1 << count) - 1) // ((1 << period) - 1)
+
+
+def key_candidate(key_template, unknown_positions, value):
+    """
+    :param key_template: key with any values at unknown positions
+    :param unknown_positions: indices of unknown key bytes
+    :param value: candidate number, unknown_positions[i] gets byte i of the number
+    :return: key bytes
+    """
+    key = bytearray(key_template)
+    for i, position in enumerate(unknown_positions):
+        key[position] = (value >> (8 * i)) & 0xFF
+    return bytes(key)
+
+
+def bitsliced_key_search_worker(data):
+    """
+    Check candidate numbers from start to stop, lanes at a time
+    :param data: tuple (plaintext, ciphertext, key_template, unknown_positions, start, stop, lanes, use_numpy),
+    start has to be a multiple of lanes and lanes a power of two
+    :return: matching key or None
+    """
+    plaintext, ciphertext, key_template, unknown_positions, start, stop, count, use_numpy = data
+    lanes = make_lanes(count, use_numpy)
+    ones = lanes.ones
+    lane_bits = count.bit_length() - 1
+    patterns = [lanes.plane(counter_pattern(bit, count)) for bit in range(lane_bits)]
+    plaintext_planes = constant_block(plaintext, ones)
+    for base in range(start, stop, count):
+        counter = patterns + [ones if (base >> bit) & 1 else 0 for bit in range(lane_bits, 8 * len(unknown_positions))]
+        key = constant_block(key_template, ones)
+        for i, position in enumerate(unknown_positions):
+            key[position] = counter[8 * i:8 * i + 8][::-1]
+        state = encrypt(plaintext_planes, expand_key(key, ones), ones)
+        match = matching_lanes(state, ciphertext, ones, lanes)
+        if match:
+            return key_candidate(key_template, unknown_positions, base + (match & -match).bit_length() - 1)
+    return None
+
+
+def brute_aes_key(plaintext, ciphertext, key_template, unknown_positions, processes=8, lanes=1 << 16,
+                  batches_per_task=4, use_numpy=False):
+    """
+    Recover AES key with some unknown bytes from a known plaintext-ciphertext pair.
+    Key space is split into chunks checked in parallel by multiple processes.
+    :param plaintext: 16 bytes
+    :param ciphertext: 16 bytes
+    :param key_template: key with any values at unknown positions
+    :param unknown_positions: indices of unknown key bytes
+    :param processes: number of parallel processes
+    :param lanes: number of keys checked at once, power of two
+    :param batches_per_task: number of batches of lanes keys given to a process at once
+    :param use_numpy: store planes in numpy arrays instead of Python ints
+    :return: key or None
+    :raises ValueError: if lanes is not a power of two
+    """
+    from crypto_commons.brute.brute import brute_first
+    if lanes < 1 or lanes & (lanes - 1):
+        raise ValueError("Number of lanes has to be a power of two, got %d" % lanes)
+    keyspace = 256 ** len(unknown_positions)
+    lanes = min(lanes, keyspace)
+    if use_numpy and lanes < 64:
+        use_numpy = False
+    chunk = lanes * batches_per_task
+    data_list = ((plaintext, ciphertext, key_template, unknown_positions, start, min(start + chunk, keyspace), lanes,
+                  use_numpy) for start in range(0, keyspace, chunk))
+    return brute_first(bitsliced_key_search_worker, data_list, processes)
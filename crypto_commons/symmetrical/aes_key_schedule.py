@@ -0,0 +1,103 @@
+"""
+AES key schedule for all key sizes, working on 32-bit words.
+Schedule can be expanded forward and backward from any consecutive key words,
+so master key can be recovered from the last round keys found with reduced-round or fault attacks.
+Expanded schedules are cached by master key, so checking the same key candidates again is cheap.
+"""
+
+import functools
+import struct
+
+from crypto_commons.symmetrical.aes import Sbox, Rcon, inv_mix_column_word, to_byte_values
+
+ROUNDS = {16: 10, 24: 12, 32: 14}
+
+
+def sub_word(word):
+    return (Sbox[word >> 24] << 24) | (Sbox[(word >> 16) & 0xFF] << 16) | (Sbox[(word >> 8) & 0xFF] << 8) | Sbox[word & 0xFF]
+
+
+def rot_word(word):
+    return ((word << 8) & 0xFFFFFFFF) | (word >> 24)
+
+
+def schedule_core(previous_word, i, nk):
+    """
+    Transformation of word w[i-1] used to calculate w[i] = w[i-nk] ^ schedule_core(w[i-1], i, nk)
+    """
+    if i % nk == 0:
+        return sub_word(rot_word(previous_word)) ^ (Rcon[i // nk] << 24)
+    if nk > 6 and i % nk == 4:
+        return sub_word(previous_word)
+    return previous_word
+
+
+def expand_words(words, start, key_size=16):
+    """
+    Expand full key schedule from any consecutive key words.
+    :param words: list of key_size/4 consecutive schedule words
+    :param start: index of the first given word in the schedule, eg. 4 * round number
+    :param key_size: AES key size in bytes, 16, 24 or 32
+    :return: list of all schedule words, first key_size/4 words are the master key
+    """
+    nk = key_size // 4
+    total = 4 * (ROUNDS[key_size] + 1)
+    if len(words) != nk:
+        raise ValueError("Expected %d consecutive words for %d bytes key, got %d" % (nk, key_size, len(words)))
+    if start < 0 or start + nk > total:
+        raise ValueError("Words %d..%d are outside of the key schedule of %d words" % (start, start + nk - 1, total))
+    schedule = [None] * total
+    schedule[start:start + nk] = words
+    for i in range(start + nk, total):
+        schedule[i] = schedule[i - nk] ^ schedule_core(schedule[i - 1], i, nk)
+    for i in range(start + nk - 1, nk - 1, -1):
+        schedule[i - nk] = schedule[i] ^ schedule_core(schedule[i - 1], i, nk)
+    return schedule
+
+
+def bytes_to_words(data):
+    data = bytes(to_byte_values(data))
+    return list(struct.unpack(">%dI" % (len(data) // 4), data))
+
+
+def words_to_bytes(words):
+    return struct.pack(">%dI" % len(words), *words)
+
+
+@functools.lru_cache(maxsize=4096)
+def cached_expand_key(master_key):
+    words = expand_words(bytes_to_words(master_key), 0, len(master_key))
+    return tuple(words), tuple(inv_mix_column_word(word) for word in words)
+
+
+def expand_key_words(master_key):
+    """
+    Expand key schedule, results are cached by master key
+    :param master_key: 16, 24 or 32 bytes
+    :return: pair of tuples (encryption round key words, decryption round key words with InvMixColumns applied)
+    """
+    return cached_expand_key(bytes(to_byte_values(master_key)))
+
+
+def expand_key(master_key):
+    """
+    Expand key schedule
+    :param master_key: 16, 24 or 32 bytes
+    :return: list of round keys, 16 bytes each
+    """
+    words = expand_key_words(master_key)[0]
+    return [words_to_bytes(words[i:i + 4]) for i in range(0, len(words), 4)]
+
+
+def master_key_from_round_keys(round_keys, first_round, key_size=16):
+    """
+    Recover master key from consecutive round keys.
+    For AES-128 single round key is enough, for AES-192 and AES-256 two consecutive round keys are needed.
+    :param round_keys: bytes of consecutive round keys, at least key_size bytes
+    :param first_round: number of the first given round key, eg. 10 for the last round key of AES-128
+    :param key_size: AES key size in bytes, 16, 24 or 32
+    :return: master key bytes
+    """
+    words = bytes_to_words(round_keys)[:key_size // 4]
+    schedule = expand_words(words, 4 * first_round, key_size)
+    return words_to_bytes(schedule[:key_size // 4])
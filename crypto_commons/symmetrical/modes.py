@@ -0,0 +1,166 @@
+"""
+Block cipher modes of operation working on bytes, bytearray and memoryview.
+Cipher can be the built-in AES, or any object with encrypt(block) and decrypt(block) methods, eg. from pycrypto.
+Results are assembled in a single preallocated bytearray and blocks are taken as memoryview slices,
+and CBC bit-flipping modifies ciphertext in place, so forging a payload costs O(payload).
+"""
+
+from crypto_commons.generic import xor_bytes, iter_chunks
+
+
+def make_cipher(cipher):
+    """
+    :param cipher: key for the built-in AES, or object with encrypt(block) and decrypt(block) methods
+    :return: block cipher object
+    """
+    if isinstance(cipher, (bytes, bytearray, memoryview)):
+        from crypto_commons.symmetrical.aes import AES
+        return AES(bytes(cipher))
+    return cipher
+
+
+def iter_blocks(data, block_size=16):
+    """
+    Lazily split data into blocks, without copying
+    :param data: bytes-like object
+    :param block_size: size of a single block
+    :return: generator of memoryview blocks
+    """
+    assert len(data) % block_size == 0, "data length is not a multiple of the block size, pad the data"
+    return iter_chunks(data, block_size)
+
+
+def pkcs7_pad(data, block_size=16):
+    padding = block_size - len(data) % block_size
+    return bytes(data) + bytes(bytearray([padding] * padding))
+
+
+def pkcs7_unpad(data, block_size=16):
+    """
+    :param data: padded bytes
+    :param block_size: size of a single block
+    :return: data without padding
+    :raises ValueError: if padding is not correct
+    """
+    data = bytes(data)
+    padding = bytearray(data[-1:])
+    if not padding or not 0 < padding[0] <= min(block_size, len(data)) or \
+            data[-padding[0]:] != bytes(padding * padding[0]):
+        raise ValueError("Invalid padding")
+    return data[:-padding[0]]
+
+
+def ecb_encrypt(cipher, data, block_size=16):
+    """
+    :param cipher: key or block cipher object
+    :param data: bytes, length has to be a multiple of the block size
+    :param block_size: size of a single block
+    :return: ciphertext bytes
+    """
+    cipher = make_cipher(cipher)
+    result = bytearray(len(data))
+    for i, block in enumerate(iter_blocks(data, block_size)):
+        result[i * block_size:(i + 1) * block_size] = cipher.encrypt(bytes(block))
+    return bytes(result)
+
+
+def ecb_decrypt(cipher, data, block_size=16):
+    cipher = make_cipher(cipher)
+    result = bytearray(len(data))
+    for i, block in enumerate(iter_blocks(data, block_size)):
+        result[i * block_size:(i + 1) * block_size] = cipher.decrypt(bytes(block))
+    return bytes(result)
+
+
+def cbc_encrypt(cipher, iv, data, block_size=16):
+    """
+    :param cipher: key or block cipher object
+    :param iv: initialization vector
+    :param data: bytes, length has to be a multiple of the block size
+    :param block_size: size of a single block
+    :return: ciphertext bytes, without iv
+    """
+    cipher = make_cipher(cipher)
+    result = bytearray(len(data))
+    previous = bytes(iv)
+    for i, block in enumerate(iter_blocks(data, block_size)):
+        previous = cipher.encrypt(xor_bytes(block, previous))
+        result[i * block_size:(i + 1) * block_size] = previous
+    return bytes(result)
+
+
+def cbc_decrypt(cipher, iv, data, block_size=16):
+    """
+    :param cipher: key or block cipher object
+    :param iv: initialization vector
+    :param data: ciphertext bytes without iv, length has to be a multiple of the block size
+    :param block_size: size of a single block
+    :return: plaintext bytes
+    """
+    cipher = make_cipher(cipher)
+    result = bytearray(len(data))
+    view = memoryview(result)
+    previous = memoryview(bytes(iv))
+    for i, block in enumerate(iter_blocks(data, block_size)):
+        xor_bytes(cipher.decrypt(bytes(block)), previous, view[i * block_size:(i + 1) * block_size])
+        previous = block
+    return bytes(result)
+
+
+def ctr_keystream(cipher, nonce, initial_counter=0, block_size=16):
+    """
+    Infinite CTR keystream, counter block is nonce followed by big-endian counter
+    :param cipher: key or block cipher object
+    :param nonce: nonce bytes, shorter than the block size
+    :param initial_counter: value of the counter for the first block
+    :param block_size: size of a single block
+    :return: generator of keystream blocks
+    """
+    cipher = make_cipher(cipher)
+    nonce = bytes(nonce)
+    counter_size = block_size - len(nonce)
+    counter = initial_counter
+    while True:
+        yield cipher.encrypt(nonce + (counter % (1 << (8 * counter_size))).to_bytes(counter_size, 'big'))
+        counter += 1
+
+
+def ctr_encrypt(cipher, nonce, data, initial_counter=0, block_size=16):
+    """
+    CTR encryption, which is the same as decryption
+    :param cipher: key or block cipher object
+    :param nonce: nonce bytes, shorter than the block size
+    :param data: bytes of any length
+    :param initial_counter: value of the counter for the first block
+    :param block_size: size of a single block
+    :return: encrypted bytes
+    """
+    result = bytearray(len(data))
+    view = memoryview(result)
+    for i, (block, key) in enumerate(zip(iter_chunks(data, block_size), ctr_keystream(cipher, nonce, initial_counter,
+                                                                                       block_size))):
+        xor_bytes(block, key, view[i * block_size:i * block_size + len(block)])
+    return bytes(result)
+
+
+ctr_decrypt = ctr_encrypt
+
+
+def cbc_flip(ciphertext, plaintext, payload, position, block_size=16):
+    """
+    CBC bit-flipping in place: change ciphertext so that plaintext at given position decrypts to payload.
+    Ciphertext and plaintext are aligned, so plaintext block k is decrypted from ciphertext block k xored with block k-1,
+    eg. ciphertext starts with the iv and plaintext with a dummy block.
+    Payload can span many blocks, but every modified ciphertext block garbles its own plaintext,
+    so usually payload should be placed in every second block.
+    :param ciphertext: bytearray, modified in place
+    :param plaintext: known plaintext
+    :param payload: bytes to put in the plaintext
+    :param position: position of payload in the plaintext, at least block_size
+    :param block_size: size of a single block
+    :return: ciphertext
+    """
+    assert position >= block_size, "Can't change the first block, there is no previous block to modify"
+    view = memoryview(ciphertext)[position - block_size:position - block_size + len(payload)]
+    xor_bytes(view, xor_bytes(memoryview(plaintext)[position:position + len(payload)], payload), view)
+    return ciphertext
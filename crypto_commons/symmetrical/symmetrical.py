@@ -1,13 +1,11 @@
-import re
 import string
-import sys
 
-from crypto_commons.generic import chunk, xor_hex, chunk_with_remainder
+from crypto_commons.generic import chunk
 
 
 def brute_ecb_suffix(encrypt_function, block_size=16, expected_suffix_len=32, pad_char='A'):
     suffix = ""
-    recovery_block = expected_suffix_len / block_size - 1
+    recovery_block = expected_suffix_len // block_size - 1
     for i in range(expected_suffix_len - len(suffix) - 1, -1, -1):
         data = pad_char * i
         correct = chunk(encrypt_function(data), block_size)[recovery_block]
@@ -25,105 +23,166 @@ def brute_ecb_suffix(encrypt_function, block_size=16, expected_suffix_len=32, pa
     return suffix
 
 
-def create_byte_search_block(size_block, i, pos, l):
-    hex_char = chr(pos).encode("hex")
-    return "00" * (size_block - (i + 1)) + hex_char + ''.join(l)
+def detect_block_size(encrypt_function, max_block_size=64):
+    """
+    Detect block size of ECB/CBC encryption oracle using PKCS7 padding, by extending input until a new block appears
+    :param encrypt_function: function encrypting given bytes, possibly with some prefix and suffix
+    :param max_block_size: maximum block size to check
+    :return: pair (block size, total length of prefix and suffix added by the oracle)
+    """
+    base = len(encrypt_function(b""))
+    for i in range(1, max_block_size + 1):
+        length = len(encrypt_function(b"A" * i))
+        if length > base:
+            return length - base, base - i
+    raise ValueError("Block size not detected")
+
+
+def detect_prefix_length(encrypt_function, block_size=16):
+    """
+    Detect length of constant prefix added by ECB encryption oracle
+    :param encrypt_function: function encrypting given bytes
+    :param block_size: size of a single block
+    :return: prefix length
+    :raises ValueError: if changing the input doesn't change any block
+    """
+
+    def first_different_block(data1, data2):
+        pairs = zip(chunk(encrypt_function(data1), block_size), chunk(encrypt_function(data2), block_size))
+        index = next((i for i, (block1, block2) in enumerate(pairs) if block1 != block2), None)
+        if index is None:
+            raise ValueError("Prefix not detected")
+        return index
+
+    prefix_blocks = first_different_block(b"A", b"B")
+    for i in range(1, block_size + 1):
+        if first_different_block(b"A" * i + b"X", b"A" * i + b"Y") != prefix_blocks:
+            return prefix_blocks * block_size + block_size - i
+    return prefix_blocks * block_size
+
+
+def brute_ecb_suffix_batched(encrypt_function, block_size=None, prefix_length=None, suffix_length=None,
+                             charset=None):
+    """
+    Recover secret suffix appended by ECB encryption oracle to our data, with a single oracle call per byte.
+    Every query contains dictionary blocks with all candidates for the next byte, followed by padding
+    which puts the unknown byte at the end of a block, so the matching candidate is found by a dict lookup.
+    Block size, prefix length and suffix length are detected if not given.
+    :param encrypt_function: function encrypting given bytes as ECB(prefix + data + suffix)
+    :param block_size: size of a single block
+    :param prefix_length: length of the constant prefix
+    :param suffix_length: length of the suffix to recover
+    :param charset: possible suffix bytes, all 256 by default
+    :return: recovered suffix bytes, shorter than suffix_length if some byte was not in the charset
+    """
+    total_length = None
+    if block_size is None:
+        block_size, total_length = detect_block_size(encrypt_function)
+    if prefix_length is None:
+        prefix_length = detect_prefix_length(encrypt_function, block_size)
+    if suffix_length is None:
+        if total_length is None:
+            total_length = detect_block_size(encrypt_function)[1]
+        suffix_length = total_length - prefix_length
+    candidates = bytearray(range(256)) if charset is None else bytearray(charset)
+    alignment = b"A" * (-prefix_length % block_size)
+    first_block = (prefix_length + len(alignment)) // block_size
+    suffix = b""
+    for k in range(suffix_length):
+        shift = block_size - 1 - k % block_size
+        known = (b"A" * shift + suffix)[-(block_size - 1):]
+        dictionary = b"".join(known + bytes(bytearray([c])) for c in candidates)
+        ciphertext = encrypt_function(alignment + dictionary + b"A" * shift)
+
+        def block(index):
+            return ciphertext[index * block_size:(index + 1) * block_size]
+
+        lookup = {block(first_block + i): c for i, c in enumerate(candidates)}
+        target = block(first_block + len(candidates) + (shift + k) // block_size)
+        if target not in lookup:
+            break
+        suffix += bytes(bytearray([lookup[target]]))
+    return suffix
+
+
+def padding_oracle_decrypt_hex(ciphertext, oracle_fun, size_block=16, search_charset=string.printable, threads=1,
+                               two_blocks=False):
+    """
+    Wrapper of oracle.padding_oracle.padding_oracle_decrypt for hex encoded data.
+    :param ciphertext: hex encoded ciphertext, first block is iv
+    :param oracle_fun: function returning True for correct padding of given hex encoded (uppercase) ciphertext
+    :param size_block: size of a single block
+    :param search_charset: expected plaintext characters, ranked above other bytes by the model
+    :param threads: number of concurrent oracle queries, oracle_fun has to be thread-safe if more than 1,
+    eg. it can't share a single socket between calls
+    :param two_blocks: send only the forged block and the attacked block to the oracle,
+    by default all ciphertext blocks before the attacked one are sent, with the last of them forged
+    :return: decrypted bytes, with padding
+    :raises ValueError: if there is only one block or ciphertext length is not a multiple of size_block
+    """
+    import binascii
+    from crypto_commons.oracle.padding_oracle import padding_oracle_decrypt
+    data = binascii.unhexlify(ciphertext)
+    if len(data) <= size_block:
+        raise ValueError("there is only one block")
+    if len(data) % size_block != 0:
+        raise ValueError("block length doesn't match the size_block")
 
+    def oracle(forged):
+        return oracle_fun(binascii.hexlify(forged).decode('ascii').upper())
 
-def create_block_padding(size_block, i):
-    l = [chr(i + 1).encode("hex") for _t in range(0, i + 1)]
-    return "00" * (size_block - (i + 1)) + ''.join(l)
+    return padding_oracle_decrypt(data, oracle, size_block, threads, candidates=search_charset.encode('latin-1'),
+                                  keep_prefix=not two_blocks)
 
 
-def oracle_padding_recovery(ciphertext, oracle_fun, size_block=16, search_charset=string.printable):
+def oracle_padding_recovery(ciphertext, oracle_fun, size_block=16, search_charset=string.printable, threads=1,
+                            two_blocks=False):
     """
     Orale padding attack based on https://github.com/mpgn/Padding-oracle-attack/blob/master/exploit.py
-    :param ciphertext: 
-    :param oracle_fun: 
-    :param size_block: 
-    :param search_charset: 
-    :return: 
+    Prints the result, see padding_oracle_decrypt_hex for parameters.
+    :return: decrypted bytes, without padding
     """
-    ciphertext = ciphertext.upper()
-    result = []
-    len_block = size_block * 2
-    cipher_block = chunk_with_remainder(ciphertext, len_block)
-    if len(cipher_block) == 1:
-        print("[-] Abort, there is only one block")
+    import binascii
+    try:
+        result = padding_oracle_decrypt_hex(ciphertext, oracle_fun, size_block, search_charset, threads, two_blocks)
+    except ValueError as e:
+        print("[-] Abort, %s" % e)
         return
-    for block in reversed(range(1, len(cipher_block))):
-        if len(cipher_block[block]) != len_block:
-            print("[-] Abort, block length doesn't match the size_block")
-            break
-        recovered_block = recover_block(block, cipher_block, oracle_fun, size_block, search_charset)
-        result.insert(0, recovered_block)
-        print("[+] Decrypted current value (ASCII):", "".join(result).decode("hex"))
-    print()
-    hex_result = ''.join(result).upper()
-    print("[+] Decrypted value (HEX):", hex_result)
-    padding_length = int(hex_result[len(hex_result) - 2:len(hex_result)], 16)
-    print("[+] Decrypted value (ASCII):", hex_result[0:-(padding_length * 2)].decode("hex"))
-
-
-def recover_block(block, cipher_block, oracle_fun, size_block, search_charset):
-    valid_value = []
-    print("[+] Search value of block:", block, "\n")
-    for i in range(0, size_block):
-        found = False
-        for index, ct_pos in enumerate((map(ord, search_charset))):
-            if ct_pos != i + 1 or (
-                    len(valid_value) > 0 and int(valid_value[len(valid_value) - 1], 16) == ct_pos):
-                bk = create_byte_search_block(size_block, i, ct_pos, valid_value)
-                bp = cipher_block[block - 1]
-                bc = create_block_padding(size_block, i)
-                tmp = xor_hex(bk, bp)
-                cb = xor_hex(tmp, bc).upper()
-                up_cipher = "".join(cipher_block[:block - 1]) + cb + cipher_block[block]
-                response = oracle_fun(up_cipher)
-                exe = re.findall('..', cb)
-                discover = ''.join(exe[size_block - i:size_block])
-                current = ''.join(exe[size_block - i - 1:size_block - i])
-                find_me = ''.join(exe[:-i - 1])
-                sys.stdout.write(
-                    "\r[+] Test [Byte (0x%02x) %03i/%03i - Block %d ]: \033[31m%s\033[33m%s\033[36m%s\033[0m" % (
-                        ct_pos, index, len(search_charset), block, find_me, current, discover))
-                sys.stdout.flush()
-                if response:
-                    found = True
-                    value = re.findall('..', bk)
-                    valid_value.insert(0, value[size_block - (i + 1)])
-                    print()
-                    print("[+] Block M_Byte : %s" % bk)
-                    print("[+] Block C_{i-1}: %s" % bp)
-                    print("[+] Block Padding: %s" % bc)
-                    print()
-                    bytes_found = ''.join(valid_value)
-                    print('\033[36m' + '\033[1m' + "[+]" + '\033[0m' + " Found", i + 1, "bytes :", bytes_found)
-                    print('\033[36m' + '\033[1m' + "[+]" + '\033[0m' + " Found", i + 1, "bytes (ascii) :", bytes_found.decode("hex"))
-                    print()
-                    break
-        if not found:
-            print("\n[-] Error, decryption failed for byte %d" % i)
-            valid_value.insert(0, '3f')
-            print()
-            bytes_found = ''.join(valid_value)
-            print('\033[36m' + '\033[1m' + "[+]" + '\033[0m' + " Found", i + 1, "bytes :", bytes_found)
-            print('\033[36m' + '\033[1m' + "[+]" + '\033[0m' + " Found", i + 1, "bytes :", bytes_found.decode("hex"))
-            print()
-    return ''.join(valid_value)
+    print("[+] Decrypted value (HEX):", binascii.hexlify(result).decode('ascii').upper())
+    plaintext = result[:-bytearray(result)[-1]]
+    print("[+] Decrypted value (ASCII):", plaintext)
+    return plaintext
+
+
+def to_cbc_bytes(data):
+    return bytearray(data.encode('latin-1') if isinstance(data, str) else data)
+
+
+def from_cbc_bytes(data, original):
+    return bytes(data).decode('latin-1') if isinstance(original, str) else type(original)(data)
 
 
 def set_byte_cbc(ct_bytes, pt_bytes, byte_number, new_value, block_size=16):
-    decrypted_byte = pt_bytes[byte_number]
-    bytes_list = list(ct_bytes)
-    bytes_list[byte_number - block_size] = chr(
-        ord(ct_bytes[byte_number - block_size]) ^ ord(decrypted_byte) ^ ord(new_value))
-    return "".join(bytes_list)
+    return set_cbc_payload(ct_bytes, pt_bytes, new_value, byte_number, block_size)
 
 
 def set_cbc_payload_for_block(ct, pt, payload, block_number, block_size=16):
     assert len(payload) <= block_size, "Payload can't be longer than a single block size!"
-    new_ct = ct
-    for i, c in enumerate(payload):
-        new_ct = set_byte_cbc(new_ct, pt, block_number * block_size + i, c)
-    return new_ct
+    return set_cbc_payload(ct, pt, payload, block_number * block_size, block_size)
+
+
+def set_cbc_payload(ct, pt, payload, position, block_size=16):
+    """
+    CBC bit-flipping, payload can span many blocks.
+    Ciphertext is copied once and modified in place, so the cost is O(len(ct) + len(payload)).
+    For in-place modification of a bytearray use modes.cbc_flip.
+    :param ct: ciphertext, str or bytes
+    :param pt: plaintext aligned with ciphertext, so pt block k is decrypted from ct block k xored with block k-1
+    :param payload: data to put in the plaintext
+    :param position: position of payload in the plaintext
+    :param block_size: size of a single block
+    :return: new ciphertext, of the same type as ct
+    """
+    from crypto_commons.symmetrical.modes import cbc_flip
+    result = cbc_flip(to_cbc_bytes(ct), to_cbc_bytes(pt), to_cbc_bytes(payload), position, block_size)
+    return from_cbc_bytes(result, ct)
@@ -0,0 +1,47 @@
+import hashlib
+import unittest
+
+from crypto_commons.brute.proof_of_work import ProofOfWork, parse_challenge, solve_proof_of_work
+
+
+class TestProofOfWork(unittest.TestCase):
+    def test_parse_formats(self):
+        challenge = parse_challenge("sha256(XXXX+Fb9sVw7CZq2c3Ynf) == " + "ab" * 32)
+        self.assertEqual((challenge.algorithm, challenge.prefix, challenge.suffix, challenge.length),
+                         ("sha256", b"", b"Fb9sVw7CZq2c3Ynf", 4))
+        self.assertEqual(challenge.mask, (1 << 256) - 1)
+        challenge = parse_challenge("Send X such that md5(X)[:6] == 'abc123'")
+        self.assertEqual((challenge.mask, challenge.value), (0xffffff << 104, 0xabc123 << 104))
+        challenge = parse_challenge('sha256(X).hexdigest()[-5:] == "a0f00"')
+        self.assertEqual((challenge.mask, challenge.value), (0xfffff, 0xa0f00))
+        challenge = parse_challenge('sha1("a1b2c3" + str) starts with 00000')
+        self.assertEqual((challenge.algorithm, challenge.prefix, challenge.length), ("sha1", b"a1b2c3", None))
+        challenge = parse_challenge("Give me ? such that SHA-256('prefix' + ?) has 20 leading zero bits")
+        self.assertEqual((challenge.prefix, challenge.mask, challenge.value), (b"prefix", 0xfffff << 236, 0))
+        self.assertRaises(ValueError, parse_challenge, "solve the captcha")
+
+    def test_solve_exact_hash(self):
+        suffix = b"Fb9sVw7CZq2c3Ynf"
+        text = "sha256(XX+%s) == %s" % (suffix.decode(), hashlib.sha256(b"q7" + suffix).hexdigest())
+        stats = {}
+        self.assertEqual(solve_proof_of_work(text, processes=1, stats=stats), b"q7")
+        self.assertEqual(stats["hashes"], 16 * 62 + 59 + 1)
+
+    def test_no_solution(self):
+        target = hashlib.md5(b"zz").hexdigest()
+        stats = {}
+        challenge = ProofOfWork("md5", length=2, alphabet="ab").hex_prefix(target)
+        self.assertIsNone(solve_proof_of_work(challenge, processes=1, stats=stats))
+        self.assertEqual(stats["hashes"], 4)
+        challenge = ProofOfWork("md5", alphabet="ab").hex_prefix(target)
+        self.assertIsNone(solve_proof_of_work(challenge, processes=2, max_length=3, stats=stats))
+        self.assertEqual(stats["hashes"], 2 + 4 + 8)
+
+    def test_solve_prefix_and_zero_bits(self):
+        challenge = parse_challenge("sha256('salt' + X + 'pepper') has 16 leading zero bits")
+        result = solve_proof_of_work(challenge, processes=2)
+        self.assertTrue(challenge.check(result))
+        self.assertTrue(hashlib.sha256(b"salt" + result + b"pepper").hexdigest().startswith("0000"))
+        challenge = parse_challenge("md5(X)[-4:] == 'beef'")
+        result = solve_proof_of_work(challenge, processes=1)
+        self.assertTrue(hashlib.md5(result).hexdigest().endswith("beef"))
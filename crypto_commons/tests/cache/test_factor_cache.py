@@ -0,0 +1,50 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from crypto_commons.cache.factor_cache import FactorCache, enable_factor_cache, disable_factor_cache
+from crypto_commons.generic import factor, fermat_factors
+from crypto_commons.rsa.rsa_commons import common_factor_factorization, recover_factors_from_phi
+
+
+class TestFactorCache(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "factors.sqlite")
+
+    def tearDown(self):
+        disable_factor_cache()
+        shutil.rmtree(self.directory)
+
+    def test_store_and_lookup(self):
+        cache = FactorCache(self.path)
+        self.assertIsNone(cache.lookup(30))
+        cache.store(30, [5, 6], "test", 0.5)
+        cache.store(30, [2, 3, 5], "test", 1.5)
+        cache.store(30, [2, 3], "invalid", 1.0)
+        cache.store(30, [1, 30], "trivial", 1.0)
+        self.assertEqual(cache.lookup(30), [2, 3, 5])
+        self.assertEqual(sorted(method for _, method, _, _, _ in FactorCache(self.path).entries(30)), ["test", "test"])
+
+    def test_factoring_functions_use_cache(self):
+        cache = enable_factor_cache(self.path)
+        p, q = 1009, 1013
+        self.assertEqual(factor(p * q, 2000), ([p, q], 1))
+        self.assertEqual(cache.entries(p * q)[0][1], "factor")
+        self.assertEqual(fermat_factors(p * q), (q, p))
+        self.assertEqual(recover_factors_from_phi(p * q, (p - 1) * (q - 1)), (p, q))
+        r = 1019
+        self.assertEqual(common_factor_factorization([p * q, p * r]), [(p * q, p * r, p)])
+        self.assertEqual(cache.lookup(p * r), [p, r])
+
+    def test_factor_ignores_incomplete_entries(self):
+        cache = enable_factor_cache(self.path)
+        p, q, r, s = 1009, 1013, 1019, 1021
+        common_factor_factorization([p * q, p * q])
+        common_factor_factorization([p * q * r, p * s])
+        self.assertEqual(cache.lookup(p * q), None)
+        self.assertEqual(cache.lookup(p * q * r), [p, q * r])
+        self.assertIsNone(cache.lookup(p * q * r, complete=True))
+        self.assertEqual(factor(p * q * r, 2000), ([p, q, r], 1))
+        self.assertEqual(cache.lookup(p * q * r, complete=True), [p, q, r])
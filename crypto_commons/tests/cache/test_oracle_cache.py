@@ -0,0 +1,67 @@
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+
+from crypto_commons.brute.brute import brute_threads
+from crypto_commons.cache.oracle_cache import memoize_oracle
+
+
+class CountingOracle(object):
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.calls = []
+        self.lock = threading.Lock()
+
+    def __call__(self, query):
+        with self.lock:
+            self.calls.append(query)
+        time.sleep(self.delay)
+        if query == b"error":
+            raise IOError("connection reset")
+        return len(query) % 2 == 0
+
+
+class TestOracleCache(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "oracle.sqlite")
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_concurrent_queries_are_deduplicated(self):
+        oracle = CountingOracle(delay=0.05)
+        memoized = memoize_oracle(oracle)
+        queries = [b"a" * (i % 4) for i in range(32)]
+        self.assertEqual(brute_threads(memoized, queries, 16), [len(q) % 2 == 0 for q in queries])
+        self.assertEqual(sorted(oracle.calls), sorted(set(queries)))
+        stats = memoized.stats()
+        self.assertEqual(stats["queries"], 32)
+        self.assertEqual(stats["oracle_calls"], 4)
+        self.assertEqual(stats["memory_hits"] + stats["deduplicated"], 28)
+
+    def test_lru_and_errors(self):
+        oracle = CountingOracle()
+        memoized = memoize_oracle(oracle, max_size=2)
+        for query in (b"a", b"bb", b"a", b"ccc", b"bb"):
+            memoized(query)
+        self.assertEqual(oracle.calls, [b"a", b"bb", b"ccc", b"bb"])
+        self.assertRaises(IOError, memoized, b"error")
+        self.assertRaises(IOError, memoized, b"error")
+        self.assertEqual(oracle.calls.count(b"error"), 2)
+
+    def test_persistent_store(self):
+        queries = [os.urandom(i) for i in range(20)]
+        first = CountingOracle()
+        results = [memoize_oracle(first, self.path, "padding")(q) for q in queries[:10]]
+        second = CountingOracle()
+        memoized = memoize_oracle(second, self.path, "padding")
+        self.assertEqual([memoized(q) for q in queries], results + [len(q) % 2 == 0 for q in queries[10:]])
+        self.assertEqual(second.calls, queries[10:])
+        self.assertEqual(memoized.stats()["store_hits"], 10)
+        other = CountingOracle()
+        memoize_oracle(other, self.path, "lsb")(queries[0])
+        self.assertEqual(other.calls, [queries[0]])
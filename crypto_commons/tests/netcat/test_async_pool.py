@@ -0,0 +1,116 @@
+import asyncio
+import threading
+import time
+import unittest
+
+from crypto_commons.netcat.async_pool import ConnectionPool, SyncConnectionPool
+from crypto_commons.oracle.oracle_tools import concurrent_imap
+
+LATENCY = 0.05
+
+
+class SquareServer(object):
+    def __init__(self, queries_per_connection=None):
+        """
+        Service answering squares of numbers after login, optionally dropping connections after some queries
+        """
+        self.queries_per_connection = queries_per_connection
+        self.connections = 0
+        self.loop = asyncio.new_event_loop()
+        self.server = self.loop.run_until_complete(asyncio.start_server(self.handle, "127.0.0.1", 0))
+        self.port = self.server.sockets[0].getsockname()[1]
+        self.thread = threading.Thread(target=self.loop.run_forever)
+        self.thread.daemon = True
+        self.thread.start()
+
+    async def handle(self, reader, writer):
+        self.connections += 1
+        writer.write(b"welcome\nlogin: ")
+        if await reader.readline() == b"guest\n":
+            queries = 0
+            while self.queries_per_connection is None or queries < self.queries_per_connection:
+                line = await reader.readline()
+                if not line:
+                    break
+                await asyncio.sleep(LATENCY)
+                writer.write(b"%d\n" % int(line) ** 2)
+                queries += 1
+        writer.close()
+
+    async def shutdown(self):
+        self.server.close()
+        handlers = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+        for task in handlers:
+            task.cancel()
+        await asyncio.gather(*handlers, return_exceptions=True)
+
+    def close(self):
+        asyncio.run_coroutine_threadsafe(self.shutdown(), self.loop).result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+
+
+async def login(t):
+    await t.recvuntil(b"login: ")
+    await t.sendline(b"guest")
+
+
+async def square(t, number):
+    await t.sendline(b"%d" % number)
+    return int(await t.recvline())
+
+
+class TestConnectionPool(unittest.TestCase):
+    def test_pool_scales_with_size(self):
+        server = SquareServer()
+
+        async def attack():
+            async with ConnectionPool("127.0.0.1", server.port, size=8, handshake=login) as pool:
+                return await pool.map(square, range(64))
+
+        start = time.time()
+        self.assertEqual(asyncio.run(attack()), [i * i for i in range(64)])
+        self.assertLess(time.time() - start, 64 * LATENCY / 3)
+        self.assertEqual(server.connections, 8)
+        server.close()
+
+    def test_reconnect(self):
+        server = SquareServer(queries_per_connection=5)
+
+        async def attack():
+            async with ConnectionPool("127.0.0.1", server.port, size=4, handshake=login, delay=0) as pool:
+                results = await pool.map(square, range(40))
+                return results, pool.reconnects
+
+        results, reconnects = asyncio.run(attack())
+        self.assertEqual(results, [i * i for i in range(40)])
+        self.assertGreater(reconnects, 0)
+        server.close()
+
+    def test_sync_facade(self):
+        server = SquareServer()
+        with SyncConnectionPool("127.0.0.1", server.port, size=8, handshake=login) as pool:
+            oracle = pool.oracle(square)
+            self.assertEqual(list(concurrent_imap(oracle, range(32), threads=8)), [i * i for i in range(32)])
+            self.assertEqual(pool.map(square, [3, 4]), [9, 16])
+        server.close()
+
+    def test_close_running_sessions(self):
+        server = SquareServer()
+
+        async def stuck(t, number):
+            await t.recvuntil([b"never", b"\x00"])
+
+        async def attack():
+            pool = ConnectionPool("127.0.0.1", server.port, size=4, handshake=login)
+            tasks = [asyncio.ensure_future(pool.run(stuck, i)) for i in range(4)]
+            while len(pool.open) < 4:
+                await asyncio.sleep(0.01)
+            tubes = list(pool.open)
+            await pool.close()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            return tubes
+
+        for t in asyncio.run(attack()):
+            self.assertTrue(t.writer.is_closing())
+        server.close()
@@ -0,0 +1,152 @@
+import re
+import socket
+import threading
+import time
+import unittest
+
+from crypto_commons.netcat.netcat_commons import Tube, receive_until, receive_until_match, send, batch_query, \
+    batch_oracle
+from crypto_commons.oracle.lsb_oracle import lsb_oracle_batched
+from crypto_commons.rsa.rsa_commons import modinv
+
+
+class CountingSocket(object):
+    def __init__(self, sock):
+        self.sock = sock
+        self.calls = 0
+
+    def recv_into(self, buffer):
+        self.calls += 1
+        return self.sock.recv_into(buffer)
+
+    def __getattr__(self, name):
+        return getattr(self.sock, name)
+
+
+class NoPeekSocket(object):
+    def __init__(self, sock):
+        """
+        Socket-like object without MSG_PEEK support, like ssl.SSLSocket
+        """
+        self.sock = sock
+
+    def recv(self, size, flags=0):
+        if flags:
+            raise ValueError("non-zero flags not allowed in calls to recv() on %s" % self.__class__)
+        return self.sock.recv(size)
+
+    def __getattr__(self, name):
+        return getattr(self.sock, name)
+
+
+class TestTube(unittest.TestCase):
+    def setUp(self):
+        self.server, self.client = socket.socketpair()
+
+    def tearDown(self):
+        self.server.close()
+        self.client.close()
+
+    def test_buffered_reads(self):
+        self.server.sendall(b"first line\nsecond line\r\nprompt> 0123456789rest")
+        self.server.close()
+        sock = CountingSocket(self.client)
+        t = Tube(sock)
+        self.assertEqual(t.recvline(), b"first line\n")
+        self.assertEqual(t.recvuntil([b"\r\n", b"\n"], drop=True), b"second line")
+        self.assertEqual(t.recvuntil(b"> "), b"prompt> ")
+        self.assertEqual(t.recvn(4), b"0123")
+        t.unrecv(b"0123")
+        self.assertEqual(t.recvregex(re.compile(r"\d{10}")), b"0123456789")
+        self.assertRaises(EOFError, t.recvline)
+        self.assertEqual(t.recv(), b"rest")
+        self.assertEqual(sock.calls, 2)
+
+    def test_match_across_chunks(self):
+        t = Tube(self.client, chunk_size=7)
+        self.server.sendall(b"x" * 100 + b"flag{split_over_many_chunks}" + b"tail")
+        self.assertEqual(t.recvregex(b"flag\\{[a-z_]+\\}", lookbehind=64), b"x" * 100 + b"flag{split_over_many_chunks}")
+        self.assertEqual(t.recvuntil(b"il"), b"tail")
+
+    def test_many_lines(self):
+        lines = 20000
+
+        def serve():
+            self.server.sendall(b"".join(b"%d\n" % i for i in range(lines)))
+
+        thread = threading.Thread(target=serve)
+        thread.start()
+        t = Tube(self.client)
+        self.assertEqual([int(t.recvline()) for _ in range(lines)], list(range(lines)))
+        thread.join()
+
+    def test_socket_functions(self):
+        send(self.server, b"hello")
+        self.server.sendall(b"password: ")
+        self.assertEqual(receive_until(self.client, b"\n"), b"hello\n")
+        self.assertEqual(receive_until_match(self.client, r"word: $"), b"password: ")
+        self.server.sendall(b"partial")
+        self.server.close()
+        self.assertEqual(receive_until(self.client, [b"\n"], break_on_empty=True), b"partial")
+
+    def test_socket_not_over_read(self):
+        self.server.sendall(b"first\nsecond\nflag{abc} third")
+        self.assertEqual(receive_until(self.client, b"\n"), b"first\n")
+        self.assertEqual(self.client.recv(7), b"second\n")
+        self.assertEqual(receive_until_match(self.client, r"flag\{\w+\}"), b"flag{abc}")
+        self.assertEqual(self.client.recv(100), b" third")
+
+    def test_socket_without_peek(self):
+        sock = NoPeekSocket(self.client)
+        self.server.sendall(b"first\nflag{abc} third")
+        self.assertEqual(receive_until(sock, b"\n"), b"first\n")
+        self.assertEqual(receive_until_match(sock, r"flag\{\w+\}"), b"flag{abc}")
+        self.assertEqual(self.client.recv(100), b" third")
+
+
+class TestBatchQuery(unittest.TestCase):
+    def setUp(self):
+        self.server, self.client = socket.socketpair()
+        self.thread = threading.Thread(target=self.serve)
+        self.thread.start()
+
+    def tearDown(self):
+        self.client.close()
+        self.thread.join()
+        self.server.close()
+
+    def serve(self):
+        # every read from the socket takes a round-trip, answers to all queries read at once are sent together
+        t = Tube(self.server)
+        while True:
+            time.sleep(0.01)
+            if not t.fill():
+                return
+            answers = []
+            while b"\n" in t.buffer:
+                answers.append(b"%d\n" % (int(t.recvline()) ** 2))
+            self.server.sendall(b"".join(answers))
+
+    def test_pipelined_queries(self):
+        start = time.time()
+        results = batch_query(self.client, (b"%d" % i for i in range(500)), lambda t: int(t.recvline()), window=64)
+        self.assertEqual(list(results), [i * i for i in range(500)])
+        self.assertLess(time.time() - start, 500 * 0.01 / 4)
+
+    def test_close_early(self):
+        results = batch_query(self.client, (b"%d" % i for i in range(10)), lambda t: int(t.recvline()), window=8)
+        self.assertEqual([next(results) for _ in range(3)], [0, 1, 4])
+        results.close()
+        send(self.client, b"100")
+        self.assertEqual(receive_until(self.client, b"\n"), b"10000\n")
+
+    def test_lsb_oracle_batched(self):
+        p = 17324573639174612641
+        q = 16789950873655392269
+        n = p * q
+        d = modinv(65537, (p - 1) * (q - 1))
+        message = 0xdeadbeefcafebabe
+        # squaring server plays the oracle: LSB of plaintext is the LSB of its square
+        oracle = batch_oracle(self.client, lambda ct: b"%d" % pow(ct, d, n), lambda t: int(t.recvline()) & 1)
+        multiplicator = lambda ct: ct * pow(2, 65537, n) % n
+        self.assertEqual(lsb_oracle_batched(pow(message, 65537, n), multiplicator, n, oracle), message)
@@ -0,0 +1,59 @@
+import asyncio
+import random
+import unittest
+
+from crypto_commons.oracle.lsb_oracle import lsb_oracle, lsb_oracle_concurrent, lsb_oracle_async, \
+    lsb_oracle_batched, lsb_oracle_from_bits
+from crypto_commons.rsa.rsa_commons import modinv
+
+
+class TestLSBOracle(unittest.TestCase):
+    def setUp(self):
+        p = 17324573639174612641
+        q = 16789950873655392269
+        self.n = p * q
+        self.e = 65537
+        self.d = modinv(self.e, (p - 1) * (q - 1))
+        self.message = random.randrange(self.n)
+        self.ciphertext = pow(self.message, self.e, self.n)
+
+    def multiplicator(self, ciphertext):
+        return ciphertext * pow(2, self.e, self.n) % self.n
+
+    def oracle(self, ciphertext):
+        return pow(ciphertext, self.d, self.n) & 1
+
+    def test_lsb_oracle(self):
+        self.assertEqual(lsb_oracle(self.ciphertext, self.multiplicator, self.n, self.oracle), self.message)
+
+    def test_lsb_oracle_concurrent(self):
+        result = lsb_oracle_concurrent(self.ciphertext, self.multiplicator, self.n, self.oracle, threads=8)
+        self.assertEqual(result, self.message)
+
+    def test_lsb_oracle_async(self):
+        async def oracle(ciphertext):
+            await asyncio.sleep(0)
+            return self.oracle(ciphertext)
+
+        result = asyncio.run(lsb_oracle_async(self.ciphertext, self.multiplicator, self.n, oracle))
+        self.assertEqual(result, self.message)
+
+    def test_lsb_oracle_batched(self):
+        def batch_oracle(ciphertexts):
+            for ciphertext in ciphertexts:
+                yield self.oracle(ciphertext)
+
+        result = lsb_oracle_batched(self.ciphertext, self.multiplicator, self.n, batch_oracle)
+        self.assertEqual(result, self.message)
+
+    def test_complete_bits_and_progress(self):
+        bits = []
+        ciphertext = self.ciphertext
+        for _ in range(self.n.bit_length()):
+            ciphertext = self.multiplicator(ciphertext)
+            bits.append(self.oracle(ciphertext))
+        self.assertEqual(lsb_oracle_from_bits(self.n, bits), self.message)
+        reports = []
+        self.assertEqual(lsb_oracle_from_bits(self.n, iter(bits), lambda *args: reports.append(args)), self.message)
+        for index, bit, lower, upper in reports:
+            self.assertTrue(lower <= self.message < upper)
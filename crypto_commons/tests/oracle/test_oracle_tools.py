@@ -0,0 +1,66 @@
+import asyncio
+import random
+import threading
+import time
+import unittest
+
+from crypto_commons.oracle.oracle_tools import concurrent_imap, retrying, rate_limited, async_retrying
+
+
+class TestOracleTools(unittest.TestCase):
+    def test_concurrent_imap_is_ordered_and_bounded(self):
+        lock = threading.Lock()
+        running = [0, 0]
+
+        def oracle(x):
+            with lock:
+                running[0] += 1
+                running[1] = max(running)
+            time.sleep(random.random() * 0.01)
+            with lock:
+                running[0] -= 1
+            return x * x
+
+        self.assertEqual(list(concurrent_imap(oracle, range(100), threads=8)), [x * x for x in range(100)])
+        self.assertLessEqual(running[1], 8)
+
+    def test_concurrent_imap_stops_early(self):
+        calls = []
+        results = concurrent_imap(lambda x: calls.append(x) or x, iter(range(10 ** 9)), threads=4)
+        self.assertEqual([next(results) for _ in range(10)], list(range(10)))
+        results.close()
+        self.assertLess(len(calls), 20)
+
+    def test_retrying(self):
+        failures = [2]
+
+        def oracle(x):
+            if failures[0]:
+                failures[0] -= 1
+                raise IOError("connection reset")
+            return x
+
+        self.assertEqual(retrying(oracle, retries=2, delay=0)(5), 5)
+        failures[0] = 3
+        self.assertRaises(IOError, retrying(oracle, retries=2, delay=0), 5)
+
+    def test_async_retrying(self):
+        failures = [2]
+
+        async def oracle(x):
+            if failures[0]:
+                failures[0] -= 1
+                raise IOError("connection reset")
+            return x
+
+        start = time.time()
+        self.assertEqual(asyncio.run(async_retrying(oracle, retries=2, delay=0.02)(5)), 5)
+        self.assertGreaterEqual(time.time() - start, 0.02 + 0.04 - 0.01)
+        failures[0] = 3
+        self.assertRaises(IOError, asyncio.run, async_retrying(oracle, retries=2, delay=0)(5))
+
+    def test_rate_limited(self):
+        oracle = rate_limited(lambda x: x, 200)
+        start = time.time()
+        self.assertEqual(list(concurrent_imap(oracle, range(20), threads=8)), list(range(20)))
+        self.assertGreaterEqual(time.time() - start, 19 / 200.0 - 0.01)
@@ -0,0 +1,93 @@
+import asyncio
+import binascii
+import os
+import time
+import unittest
+
+from crypto_commons.oracle.padding_oracle import padding_oracle_decrypt, padding_oracle_decrypt_async, \
+    padding_oracle_decrypt_batched
+from crypto_commons.symmetrical.aes import AES
+from crypto_commons.symmetrical.modes import cbc_encrypt, cbc_decrypt, pkcs7_pad, pkcs7_unpad
+from crypto_commons.symmetrical.symmetrical import oracle_padding_recovery
+
+
+class TestPaddingOracle(unittest.TestCase):
+    def setUp(self):
+        self.cipher = AES(os.urandom(16))
+
+    def oracle(self, data):
+        try:
+            pkcs7_unpad(cbc_decrypt(self.cipher, data[:16], data[16:]))
+            return True
+        except ValueError:
+            return False
+
+    def encrypt(self, iv, plaintext):
+        return iv + cbc_encrypt(self.cipher, iv, pkcs7_pad(plaintext))
+
+    def test_decrypt_binary_plaintext(self):
+        plaintext = b"padding oracle \x00\xff" + os.urandom(20)
+        ciphertext = self.encrypt(os.urandom(16), plaintext)
+        self.assertEqual(padding_oracle_decrypt(ciphertext, self.oracle), pkcs7_pad(plaintext))
+
+    def test_candidate_ordering_and_stats(self):
+        plaintext = b"Simple is better than complex. Complex is better than complicated. Flat is better than nested."
+        ciphertext = self.encrypt(os.urandom(16), plaintext)
+        stats = []
+        self.assertEqual(padding_oracle_decrypt(ciphertext, self.oracle, threads=2, window=1, stats=stats),
+                         pkcs7_pad(plaintext))
+        self.assertEqual([block_stats.index for block_stats in stats], list(range(1, 7)))
+        self.assertTrue(all(block_stats.hits >= 16 for block_stats in stats))
+        self.assertLess(sum(block_stats.queries for block_stats in stats), 20 * len(ciphertext))
+
+    def test_last_byte_false_positive(self):
+        iv = bytearray(os.urandom(16))
+        plaintext = bytearray(b"A" * 16)
+        # with forged bytes set to zero, byte before the last one decrypts to 02, so 02 02 padding is valid too
+        plaintext[14] = iv[14] ^ 2
+        ciphertext = self.encrypt(bytes(iv), bytes(plaintext))
+        self.assertEqual(padding_oracle_decrypt(ciphertext[:32], self.oracle), bytes(plaintext))
+
+    def test_decrypt_async(self):
+        async def oracle(data):
+            await asyncio.sleep(0)
+            return self.oracle(data)
+
+        plaintext = b"asynchronous padding oracle"
+        ciphertext = self.encrypt(os.urandom(16), plaintext)
+        result = asyncio.run(padding_oracle_decrypt_async(ciphertext, oracle, concurrency=32))
+        self.assertEqual(result, pkcs7_pad(plaintext))
+
+    def test_decrypt_batched(self):
+        batches = []
+
+        def batch_oracle(queries):
+            batches.append(len(queries))
+            return [self.oracle(query) for query in queries]
+
+        plaintext = b"Readability counts. Special cases aren't special enough to break the rules."
+        ciphertext = self.encrypt(os.urandom(16), plaintext)
+        stats = []
+        start = time.time()
+        self.assertEqual(padding_oracle_decrypt_batched(ciphertext, batch_oracle, stats=stats), pkcs7_pad(plaintext))
+        self.assertEqual(len(stats), 5)
+        self.assertLessEqual(sum(block.seconds for block in stats), time.time() - start)
+        self.assertLess(len(batches), 2 * 16 + 8)
+        self.assertNotIn(0, batches)
+
+    def test_oracle_padding_recovery_hex(self):
+        plaintext = b"Simple is better than complex. Complex is better than complicated. Flat is better than nested."
+        ciphertext = binascii.hexlify(self.encrypt(os.urandom(16), plaintext)).decode('ascii')
+        queries = []
+
+        def oracle(data):
+            queries.append(data)
+            return self.oracle(binascii.unhexlify(data))
+
+        self.assertEqual(oracle_padding_recovery(ciphertext, oracle), plaintext)
+        self.assertLess(len(queries), 16 * len(ciphertext) // 2)
+        self.assertTrue(all(ciphertext.upper().startswith(query[:-64]) for query in queries))
+        self.assertEqual(max(map(len, queries)), len(ciphertext))
+        del queries[:]
+        self.assertEqual(oracle_padding_recovery(ciphertext, oracle, two_blocks=True), plaintext)
+        self.assertEqual(set(map(len, queries)), {64})
@@ -0,0 +1,40 @@
+import random
+import unittest
+
+from crypto_commons.oracle.pkcs1_oracle import LocalPKCS1Oracle, LocalMangerOracle, bleichenbacher, manger, \
+    pkcs1_v15_pad, pkcs1_v15_unpad
+from crypto_commons.rsa.rsa_commons import modinv
+
+
+class TestPKCS1Oracle(unittest.TestCase):
+    def setUp(self):
+        # modulus just above a byte boundary, so that a random plaintext is PKCS#1 conforming with probability ~2^-8
+        self.n, self.d = self.key([17324573639174612641, 16789950873655392269, 39880684669347986297])
+        self.e = 65537
+        self.k = (self.n.bit_length() + 7) // 8
+
+    def key(self, primes):
+        n = 1
+        phi = 1
+        for p in primes:
+            n *= p
+            phi *= p - 1
+        return n, modinv(65537, phi)
+
+    def test_bleichenbacher(self):
+        for threads, trimmers in ((1, True), (4, False)):
+            plaintext = pkcs1_v15_pad(b"attack at dawn", self.k)
+            oracle = LocalPKCS1Oracle(self.n, self.d)
+            result = bleichenbacher(pow(plaintext, self.e, self.n), oracle, self.e, self.n, threads, trimmers)
+            self.assertEqual(result, plaintext)
+            self.assertEqual(pkcs1_v15_unpad(result, self.k), b"attack at dawn")
+
+    def test_manger(self):
+        # Manger's attack needs 2B < n, so the modulus can't be just above a byte boundary
+        n, d = self.key([17324573639174612641, 16789950873655392269, 15632896013307799313, 10159659862873454491])
+        k = (n.bit_length() + 7) // 8
+        for threads in (1, 4):
+            plaintext = random.randrange(1 << (8 * (k - 1)))
+            oracle = LocalMangerOracle(n, d)
+            self.assertEqual(manger(pow(plaintext, self.e, n), oracle, self.e, n, threads), plaintext)
+            self.assertLess(oracle.queries, 2 * n.bit_length())
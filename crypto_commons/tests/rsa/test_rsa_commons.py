@@ -1,6 +1,6 @@
 import unittest
-from crypto_commons.generic import factor
-from crypto_commons.rsa.rsa_commons import get_fi
+from crypto_commons.generic import factor, bytes_to_long
+from crypto_commons.rsa.rsa_commons import get_fi, hastad_broadcast, homomorphic_blinding_rsa_random, modinv
 
 
 class TestRsaCommons(unittest.TestCase):
@@ -51,3 +51,27 @@ class TestRsaCommons(unittest.TestCase):
         }
         for n, phi_n in test_cases.items():
             self.assertEqual(get_fi(factor(n)[0]), phi_n)
+
+    def test_hastad_broadcast(self):
+        primes = [17324573639174612641, 16789950873655392269, 15632896013307799313,
+                  10159659862873454491, 13931278444523239403, 18382063508292285731]
+        moduli = [primes[0] * primes[1], primes[2] * primes[3], primes[4] * primes[5]]
+        m = bytes_to_long(b"alamakota")
+        pairs = [(pow(m, 3, n), n) for n in moduli]
+        self.assertEqual(hastad_broadcast(pairs), m)
+        broken_pair = (pow(m + 1, 3, primes[0] * primes[5]), primes[0] * primes[5])
+        self.assertEqual(hastad_broadcast([broken_pair] + pairs, 3), m)
+        self.assertIsNone(hastad_broadcast(pairs[:2] + [broken_pair]))
+
+    def test_homomorphic_blinding_rsa_random(self):
+        p, q = 17324573639174612641, 16789950873655392269
+        n, e = p * q, 65537
+        d = modinv(e, (p - 1) * (q - 1))
+        payload = 1000000007
+
+        def get_signature(x):
+            self.assertNotEqual(x, payload)
+            return pow(x, d, n)
+
+        self.assertEqual(homomorphic_blinding_rsa_random(payload, get_signature, n), pow(payload, d, n))
+        self.assertEqual(homomorphic_blinding_rsa_random(payload, get_signature, n, e), pow(payload, d, n))
@@ -0,0 +1,34 @@
+import codecs
+import os
+import unittest
+
+from crypto_commons.symmetrical.aes import AES, text2matrix, matrix2text
+
+
+class TestAES(unittest.TestCase):
+    def test_fips_197_vector(self):
+        aes = AES(bytes(bytearray(range(16))))
+        plaintext = codecs.decode("00112233445566778899aabbccddeeff", "hex")
+        ciphertext = aes.encrypt(plaintext)
+        self.assertEqual(codecs.encode(ciphertext, "hex"), b"69c4e0d86a7b0430d8cdb78070b4c55a")
+        self.assertEqual(aes.decrypt(ciphertext), plaintext)
+
+    def test_reduced_rounds_match_round_functions(self):
+        for _ in range(20):
+            aes = AES(os.urandom(16))
+            plaintext = os.urandom(16)
+            for rounds in (1, 2, 4):
+                state = text2matrix(plaintext)
+                aes.add_round_key(state, aes.round_keys[:4])
+                for i in range(1, rounds):
+                    aes.round_encrypt(state, aes.round_keys[4 * i:4 * (i + 1)])
+                aes.sub_bytes(state)
+                aes.shift_rows(state)
+                aes.add_round_key(state, aes.round_keys[4 * rounds:4 * (rounds + 1)])
+                ciphertext = aes.encrypt(plaintext, rounds)
+                self.assertEqual(ciphertext, matrix2text(state))
+                self.assertEqual(aes.decrypt(ciphertext, rounds), plaintext)
+
+    def test_mix_columns(self):
+        self.assertEqual(AES().x_mix_columns(b"\xdb\x13\x53\x45" * 4), b"\x8e\x4d\xa1\xbc" * 4)
+        self.assertEqual(AES().x_inv_mix_columns(b"\x8e\x4d\xa1\xbc" * 4), b"\xdb\x13\x53\x45" * 4)
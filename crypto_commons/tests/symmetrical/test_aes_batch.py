@@ -0,0 +1,35 @@
+import os
+import unittest
+
+from crypto_commons.symmetrical.aes import AES
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+@unittest.skipUnless(numpy, "numpy is not installed")
+class TestAESBatch(unittest.TestCase):
+    def test_encrypt_decrypt_blocks(self):
+        from crypto_commons.symmetrical.aes_batch import blocks_from_bytes, blocks_to_bytes, round_keys_array, \
+            encrypt_blocks, decrypt_blocks
+        key = os.urandom(16)
+        aes = AES(key)
+        data = os.urandom(16 * 100)
+        round_keys = round_keys_array(key)
+        for rounds in (1, 3, 10):
+            ciphertext = blocks_to_bytes(encrypt_blocks(blocks_from_bytes(data), round_keys, rounds))
+            expected = b"".join(aes.encrypt(data[i:i + 16], rounds) for i in range(0, len(data), 16))
+            self.assertEqual(ciphertext, expected)
+            self.assertEqual(blocks_to_bytes(decrypt_blocks(blocks_from_bytes(ciphertext), round_keys, rounds)), data)
+
+    def test_round_functions(self):
+        from crypto_commons.symmetrical import aes_batch
+        aes = AES()
+        data = os.urandom(16 * 10)
+        states = aes_batch.blocks_from_bytes(data)
+        for name in ["sub_bytes", "inv_sub_bytes", "shift_rows", "inv_shift_rows", "mix_columns", "inv_mix_columns"]:
+            result = aes_batch.blocks_to_bytes(getattr(aes_batch, name)(states))
+            expected = b"".join(getattr(aes, "x_" + name)(data[i:i + 16]) for i in range(0, len(data), 16))
+            self.assertEqual(result, expected, name)
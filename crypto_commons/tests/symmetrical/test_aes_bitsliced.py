@@ -0,0 +1,37 @@
+import os
+import unittest
+
+from crypto_commons.symmetrical.aes import AES, Sbox
+from crypto_commons.symmetrical.aes_bitsliced import sbox_planes, encrypt_many, find_key, brute_aes_key, IntLanes, \
+    pack_blocks, unpack_blocks
+
+
+class TestAESBitsliced(unittest.TestCase):
+    def test_sbox_circuit(self):
+        lanes = IntLanes(256)
+        byte = pack_blocks([bytearray([value]) for value in range(256)], lanes)[0]
+        result = unpack_blocks([sbox_planes(byte, lanes.ones)], lanes)
+        self.assertEqual(bytearray(b"".join(result)), bytearray(Sbox))
+
+    def test_encrypt_many(self):
+        plaintext = os.urandom(16)
+        for key_size in (16, 24, 32):
+            keys = [os.urandom(key_size) for _ in range(50)]
+            self.assertEqual(encrypt_many(keys, plaintext), [AES(key).encrypt(plaintext) for key in keys])
+            self.assertEqual(encrypt_many(keys, plaintext, rounds=4), [AES(key).encrypt(plaintext, 4) for key in keys])
+
+    def test_find_key(self):
+        keys = [os.urandom(16) for _ in range(100)]
+        plaintext = os.urandom(16)
+        self.assertEqual(find_key(keys, plaintext, AES(keys[42]).encrypt(plaintext)), keys[42])
+        self.assertIsNone(find_key(keys, plaintext, os.urandom(16)))
+
+    def test_brute_aes_key(self):
+        key = os.urandom(16)
+        plaintext = os.urandom(16)
+        template = bytearray(key)
+        template[3] = template[11] = 0
+        result = brute_aes_key(plaintext, AES(key).encrypt(plaintext), bytes(template), [3, 11], processes=1, lanes=4096)
+        self.assertEqual(result, key)
+        self.assertRaises(ValueError, brute_aes_key, plaintext, AES(key).encrypt(plaintext), bytes(template), [3, 11],
+                          processes=1, lanes=3000)
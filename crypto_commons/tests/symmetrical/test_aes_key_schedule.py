@@ -0,0 +1,40 @@
+import codecs
+import os
+import unittest
+
+from crypto_commons.symmetrical.aes import AES
+from crypto_commons.symmetrical.aes_key_schedule import expand_key, master_key_from_round_keys
+
+
+class TestAESKeySchedule(unittest.TestCase):
+    def test_fips_197_last_round_key(self):
+        round_keys = expand_key(codecs.decode("2b7e151628aed2a6abf7158809cf4f3c", "hex"))
+        self.assertEqual(len(round_keys), 11)
+        self.assertEqual(codecs.encode(round_keys[10], "hex"), b"d014f9a8c9ee2589e13f0cc8b6630ca6")
+
+    def test_fips_197_vectors_for_all_key_sizes(self):
+        plaintext = codecs.decode("00112233445566778899aabbccddeeff", "hex")
+        expected = {
+            24: b"dda97ca4864cdfe06eaf70a0ec0d7191",
+            32: b"8ea2b7ca516745bfeafc49904b496089",
+        }
+        for key_size, ciphertext in expected.items():
+            aes = AES(bytes(bytearray(range(key_size))))
+            self.assertEqual(codecs.encode(aes.encrypt(plaintext), "hex"), ciphertext)
+            self.assertEqual(aes.decrypt(codecs.decode(ciphertext, "hex")), plaintext)
+
+    def test_master_key_from_round_keys(self):
+        for key_size, rounds in ((16, 10), (24, 12), (32, 14)):
+            for _ in range(10):
+                master_key = os.urandom(key_size)
+                round_keys = expand_key(master_key)
+                for first_round in (1, rounds // 2, rounds - 1):
+                    data = b"".join(round_keys[first_round:first_round + 2])
+                    self.assertEqual(master_key_from_round_keys(data, first_round, key_size), master_key)
+            if key_size == 16:
+                self.assertEqual(master_key_from_round_keys(round_keys[rounds], rounds), master_key)
+
+    def test_invalid_round_keys(self):
+        round_keys = expand_key(os.urandom(24))
+        self.assertRaises(ValueError, master_key_from_round_keys, round_keys[12], 12, 24)
+        self.assertRaises(ValueError, master_key_from_round_keys, b"".join(round_keys[11:13]), 12, 24)
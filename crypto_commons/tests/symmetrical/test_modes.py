@@ -0,0 +1,55 @@
+import codecs
+import os
+import unittest
+
+from crypto_commons.symmetrical.modes import ecb_encrypt, ecb_decrypt, cbc_encrypt, cbc_decrypt, ctr_encrypt, \
+    cbc_flip, pkcs7_pad, pkcs7_unpad
+from crypto_commons.symmetrical.symmetrical import set_cbc_payload_for_block
+
+KEY = codecs.decode("2b7e151628aed2a6abf7158809cf4f3c", "hex")
+PLAINTEXT = codecs.decode("6bc1bee22e409f96e93d7e117393172aae2d8a571e03ac9c9eb76fac45af8e51", "hex")
+
+
+class TestModes(unittest.TestCase):
+    def test_sp800_38a_vectors(self):
+        ecb = ecb_encrypt(KEY, PLAINTEXT)
+        self.assertEqual(codecs.encode(ecb[:16], "hex"), b"3ad77bb40d7a3660a89ecaf32466ef97")
+        self.assertEqual(ecb_decrypt(KEY, ecb), PLAINTEXT)
+        iv = bytes(bytearray(range(16)))
+        cbc = cbc_encrypt(KEY, iv, PLAINTEXT)
+        self.assertEqual(codecs.encode(cbc[:16], "hex"), b"7649abac8119b246cee98e9b12e9197d")
+        self.assertEqual(cbc_decrypt(KEY, iv, cbc), PLAINTEXT)
+        nonce = codecs.decode("f0f1f2f3f4f5f6f7", "hex")
+        ctr = ctr_encrypt(KEY, nonce, PLAINTEXT[:20], 0xf8f9fafbfcfdfeff)
+        self.assertEqual(codecs.encode(ctr[:16], "hex"), b"874d6191b620e3261bef6864990db6ce")
+        self.assertEqual(ctr_encrypt(KEY, nonce, ctr, 0xf8f9fafbfcfdfeff), PLAINTEXT[:20])
+
+    def test_pkcs7(self):
+        for length in range(33):
+            data = os.urandom(length)
+            padded = pkcs7_pad(data)
+            self.assertEqual(len(padded) % 16, 0)
+            self.assertEqual(pkcs7_unpad(padded), data)
+        self.assertRaises(ValueError, pkcs7_unpad, b"A" * 15 + b"\x02")
+        self.assertRaises(ValueError, pkcs7_unpad, b"A" * 15 + b"\x00")
+
+    def test_cbc_flip_many_blocks(self):
+        iv = os.urandom(16)
+        plaintext = os.urandom(16 * 8)
+        ciphertext = bytearray(iv + cbc_encrypt(KEY, iv, plaintext))
+        aligned_plaintext = b"\0" * 16 + plaintext
+        cbc_flip(ciphertext, aligned_plaintext, b";admin=true;", 16 + 36)
+        cbc_flip(ciphertext, aligned_plaintext, b"role=root", 16 + 96)
+        decrypted = cbc_decrypt(KEY, ciphertext[:16], bytes(ciphertext[16:]))
+        self.assertEqual(decrypted[36:48], b";admin=true;")
+        self.assertEqual(decrypted[96:105], b"role=root")
+        self.assertEqual(decrypted[:16], plaintext[:16])
+
+    def test_set_cbc_payload_for_block_str(self):
+        ciphertext = "".join(chr(c) for c in bytearray(os.urandom(48)))
+        plaintext = "B" * 48
+        result = set_cbc_payload_for_block(ciphertext, plaintext, "xyz", 2)
+        self.assertEqual(len(result), 48)
+        self.assertEqual(result[:16], ciphertext[:16])
+        self.assertEqual(ord(result[16]), ord(ciphertext[16]) ^ ord("B") ^ ord("x"))
+        self.assertEqual(result[19:], ciphertext[19:])
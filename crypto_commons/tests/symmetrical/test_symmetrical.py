@@ -0,0 +1,29 @@
+import os
+import unittest
+
+from crypto_commons.symmetrical.modes import ecb_encrypt, pkcs7_pad
+from crypto_commons.symmetrical.symmetrical import detect_block_size, detect_prefix_length, brute_ecb_suffix_batched
+
+
+class TestSymmetrical(unittest.TestCase):
+    def test_brute_ecb_suffix_batched(self):
+        key = os.urandom(16)
+        secret = b"flag{batched_blocks}\x00\xff"
+        for prefix_length in (0, 16, 27):
+            prefix = os.urandom(prefix_length)
+            calls = []
+
+            def encrypt(data):
+                calls.append(data)
+                return ecb_encrypt(key, pkcs7_pad(prefix + data + secret))
+
+            self.assertEqual(detect_block_size(encrypt), (16, prefix_length + len(secret)))
+            self.assertEqual(detect_prefix_length(encrypt), prefix_length)
+            del calls[:]
+            self.assertEqual(brute_ecb_suffix_batched(encrypt, 16, prefix_length, len(secret)), secret)
+            self.assertEqual(len(calls), len(secret))
+            self.assertEqual(brute_ecb_suffix_batched(encrypt), secret)
+
+    def test_detect_prefix_length_fails(self):
+        key = os.urandom(16)
+        self.assertRaises(ValueError, detect_prefix_length, lambda data: ecb_encrypt(key, pkcs7_pad(b"constant")))
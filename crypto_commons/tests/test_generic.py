@@ -0,0 +1,48 @@
+import unittest
+
+from crypto_commons.generic import integer_root, fermat_factors_sieved, hart_factors, xor, xor_bytes, xor_repeating, \
+    xor_string, xor_hex
+
+
+class TestGeneric(unittest.TestCase):
+    def test_integer_root(self):
+        for k in range(1, 8):
+            for x in [0, 1, 2, 3, 7, 8, 9, 26, 27, 28, 12345678901234567890 ** 7]:
+                root, exact = integer_root(x, k)
+                self.assertTrue(root ** k <= x < (root + 1) ** k)
+                self.assertEqual(exact, root ** k == x)
+
+    def test_integer_root_big(self):
+        value = 3 ** 1000 + 12345
+        self.assertEqual(integer_root(value ** 17, 17), (value, True))
+        self.assertEqual(integer_root(value ** 17 - 1, 17), (value - 1, False))
+
+    def test_fermat_factors_sieved(self):
+        self.assertEqual(fermat_factors_sieved(1000003 * 1000033), (1000033, 1000003))
+        self.assertEqual(fermat_factors_sieved(1009 * 1009), (1009, 1009))
+        self.assertIsNone(fermat_factors_sieved(1000003 * 2000003, iterations=1000))
+        self.assertEqual(fermat_factors_sieved(1000003 * 2000003, processes=2, chunk_size=100000), (2000003, 1000003))
+
+    def test_hart_factors(self):
+        self.assertEqual(hart_factors(1000003 * 3000017), (3000017, 1000003))
+
+    def test_xor_bytes(self):
+        a, b = b"alamakota", b"\x01\x02\x03\x04\x05"
+        expected = bytes(bytearray(x ^ y for x, y in zip(bytearray(a), bytearray(b))))
+        self.assertEqual(xor_bytes(a, b), expected)
+        self.assertEqual(xor(a, b), list(bytearray(expected)))
+        out = bytearray(5)
+        self.assertIs(xor_bytes(a, bytearray(b), out), out)
+        self.assertEqual(bytes(out), expected)
+        self.assertEqual(xor_string("abc", "\x01\x02\x03"), "```")
+        self.assertEqual(xor_hex("0102", "0303"), b"0201")
+
+    def test_xor_repeating(self):
+        data = b"some data to xor with a short key" * 100
+        key = b"KEY"
+        expected = xor_bytes(data, key * len(data))
+        self.assertEqual(xor_repeating(data, key), expected)
+        self.assertEqual(xor_repeating(data[5:], key, key_offset=5), expected[5:])
+        out = bytearray(len(data))
+        xor_repeating(data, key, out)
+        self.assertEqual(bytes(out), expected)
@@ -0,0 +1,25 @@
+import random
+import unittest
+
+from crypto_commons.generic import xor_bytes
+from crypto_commons.tests.xor.test_repeating_xor import TEXT
+from crypto_commons.xor.keystream_solver import ManyTimePadSolver
+
+
+class TestKeystreamSolver(unittest.TestCase):
+    def test_many_time_pad_solver(self):
+        rng = random.Random(1)
+        words = TEXT.split()
+        key = bytes(bytearray(rng.randrange(256) for _ in range(40)))
+
+        def ciphertexts(count):
+            for _ in range(count):
+                plaintext = b" ".join(rng.choice(words) for _ in range(10))[:rng.randint(20, 40)]
+                yield xor_bytes(plaintext, key)
+
+        solver = ManyTimePadSolver(max_length=32)
+        solver.feed(ciphertexts(500))
+        self.assertEqual(solver.keystream(), key[:32])
+        solver.feed(ciphertexts(10))
+        self.assertEqual(solver.keystream(), key[:32])
+        self.assertEqual(solver.ciphertexts_count, 510)
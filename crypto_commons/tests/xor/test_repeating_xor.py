@@ -0,0 +1,50 @@
+import unittest
+
+from crypto_commons.generic import xor_repeating, xor_bytes
+from crypto_commons.xor.repeating_xor import break_repeating_key_xor, guess_key_lengths, crib_drag, \
+    crib_drag_guesses, crib_drag_guesses_numpy, format_potential_key
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+TEXT = (b"Beautiful is better than ugly. Explicit is better than implicit. Simple is better than complex. "
+        b"Complex is better than complicated. Flat is better than nested. Sparse is better than dense. "
+        b"Readability counts. Special cases aren't special enough to break the rules. "
+        b"Although practicality beats purity. Errors should never pass silently. Unless explicitly silenced. "
+        b"In the face of ambiguity, refuse the temptation to guess. "
+        b"There should be one-- and preferably only one --obvious way to do it.")
+
+
+class TestRepeatingXor(unittest.TestCase):
+    def test_guess_key_lengths(self):
+        best_length, _ = guess_key_lengths(xor_repeating(TEXT, b"SECRET"), 2, 20)[0]
+        self.assertEqual(best_length % 6, 0)
+
+    def test_break_repeating_key_xor(self):
+        for key in [b"x", b"ICE", b"SuperSecretKey!", b"\x00\xff\x10\x99abc"]:
+            self.assertEqual(break_repeating_key_xor(xor_repeating(TEXT, key))[0][0], key)
+
+    def test_crib_drag(self):
+        key = bytes(bytearray((i * 73 + 41) % 256 for i in range(40)))
+        plaintexts = [TEXT[i * 40:(i + 1) * 40] for i in range(10)]
+        ciphertexts = [xor_bytes(plaintext, key) for plaintext in plaintexts]
+        best = crib_drag(ciphertexts, b"Complex is better", limit=1)[0]
+        self.assertEqual((best.score, best.ciphertext_index, best.offset), (9, 2, 16))
+        self.assertEqual(best.key, key[16:33])
+        self.assertEqual(best.plaintexts[0], plaintexts[0][16:33])
+
+    @unittest.skipUnless(numpy, "numpy is not installed")
+    def test_crib_drag_numpy(self):
+        key = bytes(bytearray((i * 73 + 41) % 256 for i in range(40)))
+        ciphertexts = [xor_bytes(TEXT[i * 37:i * 37 + 30 + i], key) for i in range(8)]
+        expected = list(crib_drag_guesses(ciphertexts, b"better than"))
+        result = list(crib_drag_guesses_numpy(ciphertexts, b"better than", numpy))
+        self.assertEqual([guess[:1] + guess[2:] for guess in result], [guess[:1] + guess[2:] for guess in expected])
+        for guess, expected_guess in zip(result, expected):
+            self.assertAlmostEqual(guess[1], expected_guess[1])
+
+    def test_format_potential_key(self):
+        ciphertexts = [xor_bytes(b"attack at dawn", b"K" * 14), xor_bytes(b"defend at dusk", b"K" * 14)]
+        self.assertEqual(format_potential_key(ciphertexts, 1, 10, 7, b"at"), "???????4b4b???")
@@ -0,0 +1,49 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from crypto_commons.generic import xor_bytes
+from crypto_commons.xor.stream_xor import xor_files, xor_file_with_key, xor_file_with_keystream, \
+    scan_known_plaintext_repeating_key
+
+
+class TestStreamXor(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def write(self, name, data):
+        path = os.path.join(self.directory, name)
+        with open(path, "wb") as f:
+            f.write(data)
+        return path
+
+    def read(self, name):
+        with open(os.path.join(self.directory, name), "rb") as f:
+            return f.read()
+
+    def test_xor_files(self):
+        data1, data2 = os.urandom(10007), os.urandom(9001)
+        written = xor_files(self.write("a", data1), self.write("b", data2), os.path.join(self.directory, "out"), 1000)
+        self.assertEqual(written, 9001)
+        self.assertEqual(self.read("out"), xor_bytes(data1, data2))
+
+    def test_xor_file_with_key_and_keystream(self):
+        data = os.urandom(10007)
+        path = self.write("a", data)
+        out = os.path.join(self.directory, "out")
+        xor_file_with_key(path, b"KEY", out, 1000)
+        self.assertEqual(self.read("out"), xor_bytes(data, b"KEY" * len(data)))
+        self.assertEqual(xor_file_with_keystream(path, iter([b"ab" * 1000, b"c" * 10]), out, 999), 2010)
+        self.assertEqual(self.read("out"), xor_bytes(data, b"ab" * 1000 + b"c" * 10))
+        self.assertEqual(xor_file_with_key(self.write("empty", b""), b"KEY", out), 0)
+
+    def test_scan_known_plaintext_repeating_key(self):
+        key = b"SECRETKEY"
+        plaintext = os.urandom(5003) + b"The quick brown fox jumps over the lazy dog" + os.urandom(300)
+        ciphertext = xor_bytes(plaintext, key * len(plaintext))
+        found = list(scan_known_plaintext_repeating_key(ciphertext, b"quick brown fox", len(key), chunk_size=1000))
+        self.assertEqual(found, [(5007, key)])
@@ -0,0 +1,76 @@
+"""
+Byte frequency models used for scoring candidate plaintexts.
+Scores are log-probabilities, so scores of separate bytes can be simply added up.
+"""
+
+import math
+import string
+
+ENGLISH_LETTER_FREQUENCIES = {
+    'a': 8.2, 'b': 1.5, 'c': 2.8, 'd': 4.3, 'e': 12.7, 'f': 2.2, 'g': 2.0, 'h': 6.1, 'i': 7.0,
+    'j': 0.15, 'k': 0.77, 'l': 4.0, 'm': 2.4, 'n': 6.7, 'o': 7.5, 'p': 1.9, 'q': 0.095, 'r': 6.0,
+    's': 6.3, 't': 9.1, 'u': 2.8, 'v': 0.98, 'w': 2.4, 'x': 0.15, 'y': 2.0, 'z': 0.074,
+}
+
+
+def english_byte_scores():
+    """
+    Log-probabilities of bytes in English text
+    :return: list of 256 scores, indexed by byte value
+    """
+    probabilities = [1e-6] * 256
+    for c in string.printable:
+        probabilities[ord(c)] = 5e-4
+    for c in string.digits:
+        probabilities[ord(c)] = 1e-3
+    for c in ".,'\"-\n":
+        probabilities[ord(c)] = 5e-3
+    probabilities[ord(' ')] = 0.15
+    for letter, frequency in ENGLISH_LETTER_FREQUENCIES.items():
+        probabilities[ord(letter)] = 0.75 * frequency / 100
+        probabilities[ord(letter.upper())] = 0.05 * frequency / 100
+    return [math.log(p) for p in probabilities]
+
+
+ENGLISH_BYTE_SCORES = english_byte_scores()
+
+
+def byte_histogram(data):
+    """
+    Count occurrences of every byte value
+    :param data: bytes
+    :return: list of 256 counts
+    """
+    from collections import Counter
+    histogram = [0] * 256
+    for value, count in Counter(bytearray(data)).items():
+        histogram[value] = count
+    return histogram
+
+
+def key_byte_scores(histogram, scores=ENGLISH_BYTE_SCORES):
+    """
+    Score every possible key byte for a column of data xored with a single key byte
+    :param histogram: list of 256 counts of ciphertext bytes in the column
+    :param scores: plaintext byte scores
+    :return: list of 256 scores, indexed by key byte
+    """
+    present = [(value, count) for value, count in enumerate(histogram) if count]
+    return [sum(count * scores[value ^ key] for value, count in present) for key in range(256)]
+
+
+def key_byte_scores_matrix(histograms, scores=ENGLISH_BYTE_SCORES):
+    """
+    Score every possible key byte for many columns at once.
+    Uses numpy if it's available.
+    :param histograms: list of column histograms, each with 256 counts
+    :param scores: plaintext byte scores
+    :return: list of lists of 256 scores, one per column
+    """
+    try:
+        import numpy
+    except ImportError:
+        return [key_byte_scores(histogram, scores) for histogram in histograms]
+    values = numpy.arange(256)
+    xor_scores = numpy.asarray(scores, dtype=numpy.float64)[values[:, None] ^ values[None, :]]
+    return (numpy.asarray(histograms, dtype=numpy.float64).reshape(-1, 256) @ xor_scores).tolist()
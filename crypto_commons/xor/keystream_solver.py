@@ -0,0 +1,105 @@
+"""
+Statistical solver for many ciphertexts encrypted with the same keystream (eg. stream cipher with reused nonce).
+Ciphertexts are consumed one by one and only per-column byte histograms are kept,
+so memory usage is O(keystream length * 256) regardless of the number of ciphertexts.
+"""
+
+from crypto_commons.generic import xor_bytes
+from crypto_commons.xor.frequency import ENGLISH_BYTE_SCORES, key_byte_scores_matrix
+
+
+class ManyTimePadSolver(object):
+    def __init__(self, max_length=None, scores=ENGLISH_BYTE_SCORES):
+        """
+        :param max_length: recover at most this many keystream bytes, longer ciphertexts are truncated
+        :param scores: plaintext byte scores, English text by default
+        """
+        self.max_length = max_length
+        self.scores = scores
+        self.histograms = []
+        self.key = bytearray()
+        self.dirty = set()
+        self.ciphertexts_count = 0
+
+    def update(self, ciphertext):
+        """
+        Add single ciphertext to the statistics
+        :param ciphertext: bytes
+        """
+        data = bytearray(ciphertext[:self.max_length] if self.max_length is not None else ciphertext)
+        while len(self.histograms) < len(data):
+            self.histograms.append([0] * 256)
+            self.key.append(0)
+        for position, value in enumerate(data):
+            self.histograms[position][value] += 1
+        self.dirty.update(range(len(data)))
+        self.ciphertexts_count += 1
+
+    def feed(self, ciphertexts):
+        """
+        Add many ciphertexts to the statistics
+        :param ciphertexts: iterable of bytes, eg. generator reading them from file
+        :return: self
+        """
+        for ciphertext in ciphertexts:
+            self.update(ciphertext)
+        return self
+
+    def keystream(self):
+        """
+        Best keystream guess for the data seen so far.
+        Only columns which got new data since the last call are recalculated.
+        :return: keystream bytes
+        """
+        columns = sorted(self.dirty)
+        column_scores = key_byte_scores_matrix([self.histograms[column] for column in columns], self.scores)
+        for column, scores in zip(columns, column_scores):
+            self.key[column] = max(range(256), key=scores.__getitem__)
+        self.dirty.clear()
+        return bytes(self.key)
+
+    def column_counts(self):
+        """
+        :return: number of ciphertext bytes seen in every column, columns with few samples are less reliable
+        """
+        return [sum(histogram) for histogram in self.histograms]
+
+    def decrypt(self, ciphertext):
+        """
+        Decrypt ciphertext with the current keystream guess
+        :param ciphertext: bytes
+        :return: plaintext guess, as long as the known part of keystream
+        """
+        return xor_bytes(ciphertext, self.keystream())
+
+
+def read_ciphertexts(path, encoding="hex"):
+    """
+    Read ciphertexts from file, one per line, lazily
+    :param path: path to the file
+    :param encoding: "hex", "base64" or None for raw lines
+    :return: generator of bytes
+    """
+    import base64
+    import binascii
+    with open(path, "rb") as f:
+        for line in f:
+            line = line.rstrip(b"\r\n")
+            if not line:
+                continue
+            if encoding == "hex":
+                yield binascii.unhexlify(line)
+            elif encoding == "base64":
+                yield base64.b64decode(line)
+            else:
+                yield line
+
+
+def solve_many_time_pad(ciphertexts, max_length=None):
+    """
+    Recover keystream shared by many ciphertexts
+    :param ciphertexts: iterable of bytes
+    :param max_length: recover at most this many keystream bytes
+    :return: keystream bytes
+    """
+    return ManyTimePadSolver(max_length).feed(ciphertexts).keystream()
@@ -1,40 +1,231 @@
-from crypto_commons.generic import xor_string, is_printable
+import string
+from collections import namedtuple
 
+from crypto_commons.generic import xor_bytes
 
-def repeating_key_xor(ciphertexts, printable=False):
+PRINTABLE_BYTES = string.printable.encode('utf-8')
+PRINTABLE_TABLE = bytes(bytearray(1 if chr(value) in string.printable else 0 for value in range(256)))
+
+CribMatch = namedtuple('CribMatch', ['score', 'language_score', 'ciphertext_index', 'offset', 'key', 'plaintexts'])
+
+
+def repeating_key_xor(ciphertexts, printable=False, limit=20):
     """
     Run interactive session of repeating key xor breaking.
     :param ciphertexts: list of ciphertexts xored with the same repeating key
+    :param printable: show only guesses which give printable plaintexts
+    :param limit: how many best guesses to show for every crib
     """
-    import itertools
-    xored_ciphertexts = [xor_string(first, second) for (first, second) in itertools.product(ciphertexts, repeat=2)]
-    interactive_hack(xored_ciphertexts, ciphertexts, printable)
+    from builtins import input
+    while True:
+        crib = input(">")
+        for match in crib_drag(ciphertexts, crib, printable, limit):
+            print('ct ' + str(match.ciphertext_index), 'offset ' + str(match.offset), 'score ' + str(match.score),
+                  'key=(' + format_key_fragment(ciphertexts, match) + ')')
+            for index, plaintext in sorted(match.plaintexts.items()):
+                print('    in ' + str(index), plaintext)
 
 
-def interactive_hack(xored, ciphertexts, printable=False):
-    from builtins import input, range
-    while True:
-        potential_plaintext_contents = input(">")
-        ciphertext_len = len(ciphertexts[0])
-        if len(potential_plaintext_contents) > ciphertext_len:
-            err = "Can't break more than a single block at a time! Taking prefix '%s'"
-            print(err % potential_plaintext_contents[:ciphertext_len])
-
-        max_missing_bytes = max(map(len, xored)) - len(potential_plaintext_contents) + 1
-        for start_position in set(range(max_missing_bytes)).union({0}):
-            for index, xored_ciphertext in enumerate(xored):
-                number_of_ciphertexts = len(ciphertexts)
-                first_xored_ct_index = index / number_of_ciphertexts
-                second_xored_ct_index = index % number_of_ciphertexts
-                if len(xored_ciphertext) > start_position and first_xored_ct_index != second_xored_ct_index:
-                    uncovered_content = xor_string(potential_plaintext_contents,
-                                                   xored_ciphertext[start_position:start_position + len(potential_plaintext_contents)])
-                    if (printable and is_printable(uncovered_content)) or not printable:
-                        print('in ' + str(first_xored_ct_index), 'ct ' + str(second_xored_ct_index), 'offset ' + str(start_position), uncovered_content,
-                              'key=(' + format_potential_key(ciphertexts, second_xored_ct_index, max_missing_bytes, start_position, uncovered_content) + ')')
+def interactive_hack(xored, ciphertexts, printable=False, limit=20):
+    """
+    Run interactive session of repeating key xor breaking, kept for compatibility, see repeating_key_xor
+    :param xored: not used, guesses are checked by crib_drag directly on ciphertexts
+    :param ciphertexts: list of ciphertexts xored with the same repeating key
+    :param printable: show only guesses which give printable plaintexts
+    :param limit: how many best guesses to show for every crib
+    """
+    repeating_key_xor(ciphertexts, printable, limit)
 
 
 def format_potential_key(ciphertexts, second_xored_ct_index, missing_bytes, start_position, uncovered_content):
-    return "?" * start_position + xor_string(uncovered_content,
-                                             ciphertexts[second_xored_ct_index][start_position:start_position + len(uncovered_content)]).encode(
-        "hex") + "?" * (missing_bytes - start_position)
+    """
+    Format key fragment recovered at given offset, kept for compatibility, see format_key_fragment
+    :param ciphertexts: list of ciphertexts xored with the same repeating key
+    :param second_xored_ct_index: index of ciphertext with the guessed plaintext
+    :param missing_bytes: number of unknown key bytes after start_position
+    :param start_position: offset of the fragment
+    :param uncovered_content: guessed plaintext at this offset
+    :return: hex key fragment, with ? for every unknown byte
+    """
+    import codecs
+    uncovered_content = ensure_bytes(uncovered_content)
+    ciphertext = ensure_bytes(ciphertexts[second_xored_ct_index])
+    key = xor_bytes(uncovered_content, ciphertext[start_position:start_position + len(uncovered_content)])
+    return "?" * start_position + codecs.encode(key, 'hex').decode('ascii') + "?" * (missing_bytes - start_position)
+
+
+def ensure_bytes(data):
+    if isinstance(data, (bytes, bytearray)):
+        return bytes(data)
+    return data.encode('latin-1')
+
+
+def crib_drag(ciphertexts, crib, printable=True, limit=None):
+    """
+    Crib dragging for many ciphertexts xored with the same key.
+    Crib is assumed to be the plaintext of every ciphertext at every offset, and for each such guess the keystream
+    fragment is used to decrypt all other ciphertexts at this offset.
+    Uses numpy to check all guesses for a given offset at once, if it's available.
+    :param ciphertexts: list of ciphertexts xored with the same key
+    :param crib: known plaintext fragment
+    :param printable: keep only guesses for which at least one other ciphertext decrypts to printable text
+    :param limit: how many best guesses to return, all by default
+    :return: list of CribMatch, sorted by number of other ciphertexts decrypting to printable text,
+    and then by English language score of those decryptions
+    """
+    ciphertexts = [ensure_bytes(ciphertext) for ciphertext in ciphertexts]
+    crib = ensure_bytes(crib)
+    try:
+        import numpy
+    except ImportError:
+        numpy = None
+    if numpy is not None:
+        guesses = crib_drag_guesses_numpy(ciphertexts, crib, numpy)
+    else:
+        guesses = crib_drag_guesses(ciphertexts, crib)
+    if printable:
+        guesses = [guess for guess in guesses if guess[0] > 0]
+    else:
+        guesses = list(guesses)
+    guesses.sort(key=lambda guess: (-guess[0], -guess[1], guess[3], guess[2]))
+    matches = []
+    for score, language_score, index, offset, printable_indices in guesses[:limit]:
+        key = xor_bytes(ciphertexts[index][offset:offset + len(crib)], crib)
+        plaintexts = {}
+        for other in (printable_indices if printable else range(len(ciphertexts))):
+            if other != index and len(ciphertexts[other]) >= offset + len(crib):
+                plaintexts[other] = xor_bytes(ciphertexts[other][offset:offset + len(crib)], key)
+        matches.append(CribMatch(score, language_score, index, offset, key, plaintexts))
+    return matches
+
+
+def crib_drag_guesses(ciphertexts, crib):
+    from crypto_commons.xor.frequency import ENGLISH_BYTE_SCORES
+    crib_length = len(crib)
+    crib_value = int.from_bytes(crib, 'big')
+    for offset in range(max(map(len, ciphertexts)) - crib_length + 1):
+        windows = [(index, int.from_bytes(ciphertext[offset:offset + crib_length], 'big'))
+                   for index, ciphertext in enumerate(ciphertexts) if len(ciphertext) >= offset + crib_length]
+        for index, window in windows:
+            key = window ^ crib_value
+            printable_indices = []
+            language_score = 0
+            for other, other_window in windows:
+                plaintext = (other_window ^ key).to_bytes(crib_length, 'big')
+                if other != index and not plaintext.translate(None, PRINTABLE_BYTES):
+                    printable_indices.append(other)
+                    language_score += sum(map(ENGLISH_BYTE_SCORES.__getitem__, bytearray(plaintext)))
+            yield len(printable_indices), language_score, index, offset, printable_indices
+
+
+def crib_drag_guesses_numpy(ciphertexts, crib, numpy):
+    from crypto_commons.xor.frequency import ENGLISH_BYTE_SCORES
+    crib_length = len(crib)
+    lengths = numpy.array([len(ciphertext) for ciphertext in ciphertexts])
+    matrix = numpy.zeros((len(ciphertexts), lengths.max()), dtype=numpy.uint8)
+    for index, ciphertext in enumerate(ciphertexts):
+        matrix[index, :len(ciphertext)] = numpy.frombuffer(ciphertext, dtype=numpy.uint8)
+    crib_row = numpy.frombuffer(crib, dtype=numpy.uint8)
+    printable_table = numpy.frombuffer(PRINTABLE_TABLE, dtype=numpy.uint8).astype(bool)
+    score_table = numpy.array(ENGLISH_BYTE_SCORES)
+    for offset in range(lengths.max() - crib_length + 1):
+        rows = numpy.nonzero(lengths >= offset + crib_length)[0]
+        windows = matrix[rows, offset:offset + crib_length]
+        keys = windows ^ crib_row
+        plaintexts = windows[None, :, :] ^ keys[:, None, :]
+        printable = printable_table[plaintexts].all(axis=2)
+        numpy.fill_diagonal(printable, False)
+        scores = printable.sum(axis=1)
+        language_scores = (score_table[plaintexts].sum(axis=2) * printable).sum(axis=1)
+        for position, index in enumerate(rows):
+            yield (int(scores[position]), float(language_scores[position]), int(index), offset,
+                   rows[printable[position]].tolist())
+
+
+def format_key_fragment(ciphertexts, match):
+    import codecs
+    length = max(map(len, ciphertexts))
+    key = codecs.encode(match.key, 'hex').decode('ascii')
+    return "?" * match.offset + key + "?" * (length - match.offset - len(match.key))
+
+
+def hamming_distance(data1, data2):
+    """
+    Count differing bits
+    :param data1: bytes
+    :param data2: bytes
+    :return: number of differing bits on the common length
+    """
+    return bin(int.from_bytes(xor_bytes(data1, data2), 'big')).count('1')
+
+
+def guess_key_lengths(ciphertext, min_length=1, max_length=40):
+    """
+    Rank repeating key lengths by normalized Hamming distance between ciphertext and ciphertext shifted by key length.
+    For the right length (and its multiples) key cancels out, and distance is the distance of plaintext bytes, which is lower than random.
+    :param ciphertext: bytes xored with repeating key
+    :param min_length: shortest key length to check
+    :param max_length: longest key length to check
+    :return: list of pairs (key length, average distance in bits per byte), best first
+    """
+    distances = []
+    for length in range(min_length, min(max_length, len(ciphertext) - 1) + 1):
+        distance = hamming_distance(ciphertext[:-length], ciphertext[length:])
+        distances.append((length, distance / float(len(ciphertext) - length)))
+    return sorted(distances, key=lambda pair: pair[1])
+
+
+def minimal_period(key):
+    for length in range(1, len(key)):
+        if len(key) % length == 0 and key[:length] * (len(key) // length) == key:
+            return key[:length]
+    return key
+
+
+def break_repeating_key_xor(ciphertext, min_length=1, max_length=40, key_lengths=3, scores=None):
+    """
+    Automatically break single ciphertext xored with repeating key.
+    Key length is estimated from normalized Hamming distances, then every key byte is chosen by scoring all 256 values
+    for the whole column at once against plaintext byte frequencies.
+    Each key byte costs log(256) of the score, otherwise multiples of the real key length would always win.
+    :param ciphertext: bytes xored with repeating key
+    :param min_length: shortest key length to check
+    :param max_length: longest key length to check
+    :param key_lengths: how many best key lengths to try
+    :param scores: plaintext byte scores, English text by default
+    :return: list of pairs (key, score), best first
+    """
+    import math
+    from crypto_commons.xor.frequency import ENGLISH_BYTE_SCORES, byte_histogram, key_byte_scores_matrix
+    if scores is None:
+        scores = ENGLISH_BYTE_SCORES
+    ciphertext = bytes(bytearray(ciphertext))
+    results = {}
+    for length, _ in guess_key_lengths(ciphertext, min_length, max_length)[:key_lengths]:
+        histograms = [byte_histogram(ciphertext[i::length]) for i in range(length)]
+        column_scores = key_byte_scores_matrix(histograms, scores)
+        key = bytes(bytearray(max(range(256), key=lambda k: column[k]) for column in column_scores))
+        key = minimal_period(key)
+        score = sum(max(column) for column in column_scores) - len(key) * math.log(256)
+        results[key] = max(score, results.get(key, score))
+    return sorted(results.items(), key=lambda pair: (-pair[1], len(pair[0])))
+
+
+def break_repeating_key_xor_worker(data):
+    ciphertext, min_length, max_length, key_lengths = data
+    return break_repeating_key_xor(ciphertext, min_length, max_length, key_lengths)
+
+
+def break_repeating_key_xor_batch(ciphertexts, min_length=1, max_length=40, key_lengths=3, processes=8):
+    """
+    Break many independent ciphertexts xored with repeating keys, in parallel
+    :param ciphertexts: list of bytes, each xored with its own repeating key
+    :param min_length: shortest key length to check
+    :param max_length: longest key length to check
+    :param key_lengths: how many best key lengths to try
+    :param processes: number of parallel processes
+    :return: list of results of break_repeating_key_xor, one per ciphertext
+    """
+    from crypto_commons.brute.brute import brute
+    data = [(ciphertext, min_length, max_length, key_lengths) for ciphertext in ciphertexts]
+    return brute(break_repeating_key_xor_worker, data, processes)
@@ -0,0 +1,204 @@
+"""
+XOR of data which doesn't fit comfortably in memory, eg. disk images or captured traffic.
+Input files are memory-mapped and processed in fixed-size chunks, output is written chunk by chunk.
+"""
+
+import contextlib
+import mmap
+
+from crypto_commons.generic import xor_bytes, xor_repeating
+
+STREAM_CHUNK_SIZE = 1 << 22
+
+
+@contextlib.contextmanager
+def mapped_file(path):
+    """
+    Memory-map file for reading
+    :param path: path to the file
+    :return: context manager giving read-only memoryview of file contents
+    """
+    with open(path, "rb") as f:
+        try:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:  # empty file can't be mapped
+            yield memoryview(b"")
+            return
+        try:
+            with memoryview(mapped) as view:
+                yield view
+        finally:
+            mapped.close()
+
+
+class KeystreamReader(object):
+    def __init__(self, keystream):
+        """
+        Read exact number of bytes from keystream given as iterable of byte chunks of any size
+        :param keystream: iterable of bytes
+        """
+        self.chunks = iter(keystream)
+        self.buffer = bytearray()
+
+    def read(self, size):
+        while len(self.buffer) < size:
+            try:
+                self.buffer += next(self.chunks)
+            except StopIteration:
+                break
+        data = bytes(self.buffer[:size])
+        del self.buffer[:size]
+        return data
+
+
+def iter_xor_with_keystream(data, keystream, chunk_size=STREAM_CHUNK_SIZE):
+    """
+    XOR data with keystream chunk by chunk.
+    Stops when either data or keystream ends.
+    Yielded chunk is a view of internal buffer, which is reused for the next chunk, so copy it if you need to keep it.
+    :param data: bytes-like object, eg. memory-mapped file
+    :param keystream: iterable of byte chunks of any size, eg. generator of cipher keystream
+    :param chunk_size: size of a single chunk
+    :return: generator of xored chunks
+    """
+    reader = KeystreamReader(keystream)
+    data = memoryview(data)
+    buffer = memoryview(bytearray(chunk_size))
+    for start in range(0, len(data), chunk_size):
+        size = min(chunk_size, len(data) - start)
+        key = reader.read(size)
+        if key:
+            yield xor_bytes(data[start:start + len(key)], key, buffer[:len(key)])
+        if len(key) < size:
+            return
+
+
+def iter_xor_with_key(data, key, chunk_size=STREAM_CHUNK_SIZE, key_offset=0):
+    """
+    XOR data with repeating key chunk by chunk.
+    Yielded chunk is a view of internal buffer, which is reused for the next chunk, so copy it if you need to keep it.
+    :param data: bytes-like object, eg. memory-mapped file
+    :param key: repeating key
+    :param chunk_size: size of a single chunk
+    :param key_offset: index of key byte to use for the first byte of data
+    :return: generator of xored chunks
+    """
+    data = memoryview(data)
+    buffer = memoryview(bytearray(chunk_size))
+    for start in range(0, len(data), chunk_size):
+        stop = min(start + chunk_size, len(data))
+        yield xor_repeating(data[start:stop], key, buffer[:stop - start], key_offset + start)
+
+
+def write_chunks(chunks, out_path):
+    """
+    Write chunks to a file
+    :param chunks: iterable of bytes-like objects
+    :param out_path: path to the output file
+    :return: number of bytes written
+    """
+    written = 0
+    with open(out_path, "wb") as out:
+        for data in chunks:
+            out.write(data)
+            written += len(data)
+    return written
+
+
+def xor_files(path1, path2, out_path, chunk_size=STREAM_CHUNK_SIZE):
+    """
+    XOR two files, result is as long as the shorter one
+    :param path1: path to the first file
+    :param path2: path to the second file
+    :param out_path: path to the output file
+    :param chunk_size: size of a single chunk
+    :return: number of bytes written
+    """
+    with mapped_file(path1) as data1, mapped_file(path2) as data2:
+        length = min(len(data1), len(data2))
+        buffer = memoryview(bytearray(chunk_size))
+        chunks = (xor_bytes(data1[start:start + chunk_size], data2[start:start + chunk_size],
+                            buffer[:min(chunk_size, length - start)])
+                  for start in range(0, length, chunk_size))
+        return write_chunks(chunks, out_path)
+
+
+def xor_file_with_key(path, key, out_path, chunk_size=STREAM_CHUNK_SIZE, key_offset=0):
+    """
+    XOR file with repeating key
+    :param path: path to the input file
+    :param key: repeating key
+    :param out_path: path to the output file
+    :param chunk_size: size of a single chunk
+    :param key_offset: index of key byte to use for the first byte of file
+    :return: number of bytes written
+    """
+    with mapped_file(path) as data:
+        return write_chunks(iter_xor_with_key(data, key, chunk_size, key_offset), out_path)
+
+
+def xor_file_with_keystream(path, keystream, out_path, chunk_size=STREAM_CHUNK_SIZE):
+    """
+    XOR file with generated keystream
+    :param path: path to the input file
+    :param keystream: iterable of byte chunks of any size
+    :param out_path: path to the output file
+    :param chunk_size: size of a single chunk
+    :return: number of bytes written
+    """
+    with mapped_file(path) as data:
+        return write_chunks(iter_xor_with_keystream(data, keystream, chunk_size), out_path)
+
+
+def scan_known_plaintext(data, crib, start=0, stop=None, predicate=None):
+    """
+    Try known plaintext at every offset of the data, and return keystream it would give.
+    :param data: bytes-like object, eg. memory-mapped file
+    :param crib: known plaintext fragment
+    :param start: first offset to check
+    :param stop: last offset to check (exclusive), by default end of data
+    :param predicate: function to filter keystream candidates, eg. is_printable
+    :return: generator of pairs (offset, keystream fragment)
+    """
+    data = memoryview(data)
+    if stop is None:
+        stop = len(data)
+    stop = min(stop, len(data) - len(crib) + 1)
+    for offset in range(start, stop):
+        keystream = xor_bytes(data[offset:offset + len(crib)], crib)
+        if predicate is None or predicate(keystream):
+            yield offset, keystream
+
+
+def scan_known_plaintext_repeating_key(data, crib, key_length, start=0, stop=None, chunk_size=STREAM_CHUNK_SIZE):
+    """
+    Find offsets where known plaintext fits data xored with repeating key of given length.
+    Crib has to be longer than the key.
+    At offset o the crib fits if data[o+i] ^ data[o+i+key_length] == crib[i] ^ crib[i+key_length],
+    so data is xored with itself shifted by key length, chunk by chunk, and the pattern is searched with bytes.find.
+    :param data: bytes-like object, eg. memory-mapped file
+    :param crib: known plaintext fragment
+    :param key_length: length of the repeating key
+    :param start: first offset to check
+    :param stop: last offset to check (exclusive), by default end of data
+    :param chunk_size: size of a single chunk
+    :return: generator of pairs (offset, key), with key rotated so that it starts at data offset 0
+    """
+    assert len(crib) > key_length, "crib has to be longer than the key"
+    data = memoryview(data)
+    pattern = xor_bytes(crib[:-key_length], crib[key_length:])
+    if stop is None:
+        stop = len(data)
+    stop = min(stop, len(data) - len(crib) + 1)
+    position = start
+    while position < stop:
+        window_end = min(position + chunk_size, stop) + len(pattern) - 1
+        shifted = xor_bytes(data[position:window_end], data[position + key_length:window_end + key_length])
+        found = shifted.find(pattern)
+        while found != -1 and position + found < stop:
+            offset = position + found
+            keystream = xor_bytes(data[offset:offset + key_length], crib)
+            phase = offset % key_length
+            yield offset, keystream[-phase:] + keystream[:-phase] if phase else keystream
+            found = shifted.find(pattern, found + 1)
+        position += chunk_size
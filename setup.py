@@ -12,6 +12,9 @@ setup(
     extras_require={
         ':python_version < "3.0"': [
             'future'
+        ],
+        'numpy': [
+            'numpy'
         ]
     },
     description="Small python module for common CTF crypto functions.",